@@ -15,3 +15,10 @@ INVALID_CONFIG_JSON_FILE = "INVALID_CONFIG_JSON_FILE"
 TABLE_NOT_PROVIDED = "TABLE_NOT_PROVIDED"
 TABLE_SCHEMA_NOT_EXIST = "TABLE_SCHEMA_NOT_EXIST"
 UPDATE_NOT_ALLOWED_ON_PK = "UPDATE_NOT_ALLOWED_ON_PK"
+INVALID_QUERY_OPTION = "INVALID_QUERY_OPTION"
+INVALID_QUERY = "INVALID_QUERY"
+SERVER_BUSY = "SERVER_BUSY"
+NO_ACTIVE_TRANSACTION = "NO_ACTIVE_TRANSACTION"
+TRANSACTION_ALREADY_ACTIVE = "TRANSACTION_ALREADY_ACTIVE"
+NOT_ALLOWED_IN_TRANSACTION = "NOT_ALLOWED_IN_TRANSACTION"
+TRANSACTION_CONFLICT = "TRANSACTION_CONFLICT"
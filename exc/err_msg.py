@@ -11,11 +11,33 @@ TABLE_NOT_PROVIDED = "Table is not provided for {action}"
 DATABASE_ALREADY_EXIST = "({db_name}) Database Already Exist."
 TABLE_ALREADY_EXIST = "({table}) Table Already Exist."
 INVALID_DATA = "Invalid data."
+SERVER_BUSY = "Server is busy, retry later."
+NO_ACTIVE_TRANSACTION = "No transaction is active, send BEGIN first."
+TRANSACTION_ALREADY_ACTIVE = "A transaction is already active on this connection."
+NOT_ALLOWED_IN_TRANSACTION = "({action}) is not allowed inside a transaction."
+TRANSACTION_OTHER_DATABASE = "The transaction is bound to the ({database}) database."
+TRANSACTION_CONFLICT = (
+    "({table}) was modified by another writer, the transaction was rolled back."
+)
+INVALID_BULK_PAYLOAD = "(payload) must be a list of rows."
+INVALID_BATCH_PAYLOAD = "(payload) must be a list of actions."
+NESTED_BATCH = "A BATCH cannot contain another BATCH."
+BULK_CREATE_FAILED = "{count} row(s) rejected, nothing was inserted."
 TABLE_SCHEMA_NOT_EXIST = "({table}) Schema does not exist."
 DATABASE_DOES_NOT_EXIST = "({db_name}) Database does not exist"
 TABLE_DOES_NOT_EXIST = "({table}) Table does not exist"
 CONFIG_FILE_NOT_FOUND = "Configuration file not found ({file_path})."
 UPDATE_NOT_ALLOWED_ON_PK = "Cannot update pk column."
+INVALID_QUERY_OPTION = "({option}) must be a non-negative integer."
+INVALID_PROJECTION = "(fields) must be a list of field names."
+INVALID_SORT = "(sort) must be a list of [field, 1 | -1] pairs."
+INVALID_QUERY = "(query) must be a dict of field conditions."
+UNSUPPORTED_OPERATOR = "({operator}) is not a supported query operator."
+INVALID_OPERATOR_VALUE = "({operator}) has an invalid value."
+INVALID_GROUP_BY = "(group_by) must be a list of field names."
+INVALID_AGGREGATE = (
+    "(aggregates) must map names to {$count | $sum | $avg | $min | $max: field}."
+)
 INVALID_CONFIG_JSON_FILE = (
     "Invalid JSON format in the configuration file ({file_path})."
 )
@@ -19,10 +19,36 @@ class Action:
         payload (dict, optional): Data to insert, update, or use in authentication.
         auth (dict, optional): Authentication metadata (e.g., token).
         table (str, optional): Name of the target table.
+        stream (bool): Whether a SELECT result should be sent in chunked frames.
+        limit (int, optional): Maximum number of rows a SELECT returns.
+        skip (int): Number of matching rows a SELECT skips before returning rows.
+        fields (list, optional): Projection, the only keys a SELECT returns per row.
+        sort (list, optional): SELECT ordering as `[field, 1 | -1]` pairs.
+        aggregates (dict, optional): AGGREGATE output name -> `{operator: field}`.
+        group_by (list, optional): Fields an AGGREGATE groups the rows by.
+        continue_on_error (bool): Whether a BULK_CREATE inserts the valid rows
+            when some are rejected (all-or-nothing otherwise).
+        request_id (Any, optional): Client-chosen id echoed in the response.
         user_db_conf (dict): User-specific database configuration (set post-authentication).
     """
 
-    def __init__(self, action, query=None, payload=None, auth=None, table=None):
+    def __init__(
+        self,
+        action,
+        query=None,
+        payload=None,
+        auth=None,
+        table=None,
+        stream=False,
+        limit=None,
+        skip=0,
+        fields=None,
+        sort=None,
+        aggregates=None,
+        group_by=None,
+        continue_on_error=False,
+        request_id=None,
+    ):
         """
         Initialize an Action object with details of the requested operation.
 
@@ -32,12 +58,31 @@ class Action:
             payload (dict, optional): Data for creation or update.
             auth (dict, optional): Authentication data.
             table (str, optional): Target table for the action.
+            stream (bool, optional): Send a SELECT result in chunked frames.
+            limit (int, optional): Maximum number of rows to return.
+            skip (int, optional): Number of matching rows to skip.
+            fields (list, optional): Keys to return for each row.
+            sort (list, optional): Ordering as `[field, 1 | -1]` pairs.
+            aggregates (dict, optional): Aggregates to compute.
+            group_by (list, optional): Fields to group by.
+            continue_on_error (bool, optional): Insert the valid rows of a
+                BULK_CREATE even if some are rejected.
+            request_id (Any, optional): Id echoed back in the response.
         """
         self.query = query
         self.table = table
         self.action = action
         self.payload = payload
         self.auth = auth or {}
+        self.stream = bool(stream)
+        self.limit = limit
+        self.skip = skip
+        self.fields = fields
+        self.sort = sort
+        self.aggregates = aggregates
+        self.group_by = group_by
+        self.continue_on_error = bool(continue_on_error)
+        self.request_id = request_id
         self.user_db_conf = {}
 
     def __str__(self):
@@ -49,6 +94,9 @@ class Action:
         """
         act = [self.action]
 
+        if self.request_id is not None:
+            act.append(f"request_id={json.dumps(self.request_id)}")
+
         if self.table:
             act.append(self.table)
 
@@ -58,6 +106,27 @@ class Action:
         if self.query:
             act.append(json.dumps(self.query))
 
+        if self.limit is not None:
+            act.append(f"limit={self.limit}")
+
+        if self.skip:
+            act.append(f"skip={self.skip}")
+
+        if self.fields:
+            act.append(f"fields={json.dumps(self.fields)}")
+
+        if self.sort:
+            act.append(f"sort={json.dumps(self.sort)}")
+
+        if self.aggregates:
+            act.append(f"aggregates={json.dumps(self.aggregates)}")
+
+        if self.group_by:
+            act.append(f"group_by={json.dumps(self.group_by)}")
+
+        if self.continue_on_error:
+            act.append("continue_on_error=True")
+
         if self.auth:
             act.append(json.dumps(self.auth))
 
@@ -0,0 +1,162 @@
+"""
+# File: async_server.py
+# Description: An asyncio TCP server speaking the same QUERY_LENGTH protocol as
+# the threaded server. Connections are served on the event loop, and the
+# blocking database work runs on the worker pool of the server, so idle
+# connections cost no thread.
+"""
+
+import json
+import asyncio
+
+from env import environment
+from exc import base
+from utils import log_msg, logging
+
+from .worker_pool import WorkerPool
+from .con_mgt import (
+    DELIMITER,
+    RequestProcessor,
+    parse_header,
+    encode_frame,
+    request_id_of,
+)
+
+
+class AsyncConnectionHandler(RequestProcessor):
+    """
+    Serves the requests of one client connection on the event loop.
+
+    Frames are read and answered in order, like with the threaded handler, so
+    pipelining, batches and streamed SELECTs behave the same. Each step of the
+    processing (which reads or writes table files) runs on the worker pool.
+
+    Attributes:
+        reader (asyncio.StreamReader): Reading side of the connection.
+        writer (asyncio.StreamWriter): Writing side of the connection.
+        worker_pool (WorkerPool): Pool running the blocking work.
+        client_address (tuple): Address of the client.
+    """
+
+    def __init__(self, reader, writer, worker_pool):
+        """
+        Initialize the handler of a connection.
+
+        Args:
+            reader (asyncio.StreamReader): Reading side of the connection.
+            writer (asyncio.StreamWriter): Writing side of the connection.
+            worker_pool (WorkerPool): Pool running the blocking work.
+        """
+        self.reader = reader
+        self.writer = writer
+        self.worker_pool = worker_pool
+        self.client_address = writer.get_extra_info("peername")
+
+    async def handle(self):
+        """
+        Serve the requests of the connection until the client disconnects.
+        """
+        try:
+            while True:
+                query_data = await self.read_frame()
+                if query_data is None:
+                    break
+
+                await self.send_action_to_db(query_data)
+
+        except ConnectionError:
+            pass
+        except Exception as exc:  # pylint: disable=broad-except
+            log_msg(logging.ERROR, "CONNECTION FAILED:", repr(exc))
+        finally:
+            log_msg(logging.DEBUG, f"CLOSING CONNECTION {self.client_address}")
+            self.close_transaction()
+            self.writer.close()
+
+    async def read_frame(self):
+        """
+        Read the next frame from the connection.
+
+        Returns:
+            str or None: Body of the frame, or None if the connection must be
+                closed (client disconnected or invalid header).
+        """
+        try:
+            header = await self.reader.readuntil(DELIMITER)
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            header = b""
+
+        query_length, error = parse_header(header[: -len(DELIMITER)].decode())
+        if error is not None:
+            await self.send(error.generate())
+            return None
+
+        try:
+            query_data = await self.reader.readexactly(query_length)
+        except asyncio.IncompleteReadError:
+            return None
+
+        return query_data.decode()
+
+    async def send(self, data: str):
+        """Send data to the client with QUERY_LENGTH header and delimiter."""
+        self.writer.write(encode_frame(data))
+        await self.writer.drain()
+
+    async def send_action_to_db(self, action):
+        """
+        Process a database action request on the worker pool and send its
+        response frames as they are produced. The request gets an ERROR
+        response at once if the pool is saturated.
+
+        Args:
+            action (str): JSON-encoded string representing the action to be executed.
+        """
+        request = json.loads(action)
+        frames = self.process(request)
+
+        try:
+            future = self.worker_pool.submit(next, frames)
+        except base.BaseExc as exc:
+            await self.send(self.error_response(exc, request_id_of(request)).generate())
+            return
+
+        while True:
+            frame, more = await asyncio.wrap_future(future)
+            await self.send(frame)
+            if not more:
+                return
+
+            future = self.worker_pool.submit(next, frames, admit=False)
+
+
+async def serve(host, port, worker_pool: WorkerPool):
+    """
+    Run the asyncio TCP server until cancelled.
+
+    `BACKLOG`, in the `ASYNC_SERVER` environment entry, is the size of the
+    queue of connections waiting to be accepted.
+
+    Args:
+        host (str): Address to listen on.
+        port (int): Port to listen on.
+        worker_pool (WorkerPool): Pool running the database work.
+    """
+    config: dict = environment["ASYNC_SERVER"]
+
+    async def on_connect(reader, writer):
+        await AsyncConnectionHandler(reader, writer, worker_pool).handle()
+
+    server = await asyncio.start_server(
+        on_connect,
+        host,
+        port,
+        reuse_address=True,
+        backlog=config.get("BACKLOG", 1024),
+    )
+
+    async with server:
+        log_msg(logging.DEBUG, f"PYDB RUNNING ON: [{host}:{port}] (asyncio)")
+        await server.serve_forever()
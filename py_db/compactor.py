@@ -0,0 +1,132 @@
+"""
+# File: compactor.py
+# Description: Background thread reclaiming the space taken by tombstones and
+# superseded row versions in the append-only table files.
+"""
+
+import threading
+
+from env import environment
+from utils import log_msg, logging
+
+from .storage import Storage
+
+
+class Compactor(threading.Thread):
+    """
+    Periodically compacts the tables whose data file carries too much garbage.
+
+    A table is compacted when its file is at least `MIN_SIZE` bytes and the
+    share of dead bytes (tombstones and superseded versions) reaches
+    `GARBAGE_RATIO`. Settings are read from the `COMPACTION` environment entry.
+
+    Attributes:
+        interval (float): Seconds between two checks.
+        garbage_ratio (float): Dead bytes / file size ratio triggering a compaction.
+        min_size (int): Smallest file size (in bytes) worth compacting.
+        reports (list): Reports of the compactions run so far (latest last).
+    """
+
+    def __init__(self, interval=300, garbage_ratio=0.5, min_size=1048576):
+        """
+        Initialize the compactor thread.
+
+        Args:
+            interval (float): Seconds between two checks.
+            garbage_ratio (float): Garbage ratio triggering a compaction.
+            min_size (int): Smallest file size worth compacting.
+        """
+        super().__init__(name="py_db_compactor", daemon=True)
+
+        self.interval = interval
+        self.garbage_ratio = garbage_ratio
+        self.min_size = min_size
+        self.reports = []
+
+        self._storage_engine = Storage()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        """
+        Check every loaded table each `interval` seconds until stopped.
+        """
+        while not self._stop_event.wait(self.interval):
+            self.run_once()
+
+    def stop(self):
+        """
+        Ask the compactor thread to stop after the current check.
+        """
+        self._stop_event.set()
+
+    def should_compact(self, database, table):
+        """
+        Check whether a table reached the compaction thresholds.
+
+        Args:
+            database (str): Database name.
+            table (str): Table name.
+
+        Returns:
+            bool: True if the table should be compacted.
+        """
+        stats = self._storage_engine.garbage_stats(database, table)
+        if not stats:
+            return False
+
+        file_size, live_bytes = stats
+        if file_size < self.min_size:
+            return False
+
+        return (file_size - live_bytes) / file_size >= self.garbage_ratio
+
+    def run_once(self):
+        """
+        Compact every loaded table that reached the thresholds.
+
+        Returns:
+            list: Reports of the compactions run during this check.
+        """
+        reports = []
+
+        for database, table in self._storage_engine.loaded_tables():
+            try:
+                if not self.should_compact(database, table):
+                    continue
+
+                reports.append(self._storage_engine.compact_table(database, table))
+            except Exception as exc:  # pylint: disable=broad-except
+                log_msg(
+                    logging.ERROR,
+                    f"COMPACTION FAILED {database}.{table}:",
+                    repr(exc),
+                )
+
+        self.reports.extend(reports)
+        del self.reports[:-100]
+
+        return reports
+
+
+def start_compactor():
+    """
+    Start the background compactor if it is enabled in the environment.
+
+    Returns:
+        Compactor or None: The running compactor thread, if enabled.
+    """
+    config: dict = environment["COMPACTION"]
+
+    if not config.get("ENABLED", True):
+        return None
+
+    compactor = Compactor(
+        interval=config.get("INTERVAL", 300),
+        garbage_ratio=config.get("GARBAGE_RATIO", 0.5),
+        min_size=config.get("MIN_SIZE", 1048576),
+    )
+    compactor.start()
+
+    log_msg(logging.DEBUG, f"COMPACTOR RUNNING EVERY {compactor.interval}s")
+
+    return compactor
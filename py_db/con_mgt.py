@@ -2,164 +2,484 @@
 #file: con_mgt.py
 # Description: This module contains the ConnectionHandler class,
 # which is responsible for handling incoming requests to
+# the database server, and the transport-independent RequestProcessor.
 """
 
 import json
 import socketserver
 
-from exc import err_msg, codes, base
+from exc import err_msg, codes, base, CommonPYDBException
 
 from .db import PyDB
 from .action import Action
-from .response import Response
+from .transaction import Transaction
+from .response import Response, StreamResponse
 from .auth import authentication
 from .constants import ActionEnum
 
 from utils import log_msg, logging
 
 
-class ConnectionHandler(socketserver.BaseRequestHandler):
-    """Handles incoming requests to the database server.
-    This class is responsible for processing client requests and sending responses"""
+DELIMITER = b"\r\n\r\n"
 
-    def handle(self):
-        """
-        Receives data from the socket, handling the custom header format.
-        The header is expected to be in the format:
-        QUERY_LENGTH: <length>\r\n\r\n
-        where <length> is the length of the query data that follows.
-        The body will be read until the specified length is reached.
-        If the header is not fully received, it will keep reading until it is.
-        If the body is not fully received, it will keep reading until the specified
-        length is reached.
-        """
-
-        buffer = b""
-        # Read initial chunk
-        chunk = self.request.recv(1024)
-        if not chunk:
-            log_msg(
-                logging.DEBUG,
-                f"CLOSING CONNECTION {self.client_address[0]}:{self.client_address[1]}",
-            ),
-            return
 
-        buffer += chunk
+def parse_header(header: str):
+    """
+    Read the body length announced by a frame header.
 
-        # Find the header delimiter
-        delimiter = b"\r\n\r\n"
-        header_end = buffer.find(delimiter)
-        if header_end == -1:
-            # Header not fully received yet, keep reading until we get it
-            while header_end == -1:
-                chunk = self.request.recv(1024)
-                if not chunk:
-                    return
-                buffer += chunk
-                header_end = buffer.find(delimiter)
+    The header is expected to hold a line in the format:
+    QUERY_LENGTH: <length>
 
-        # Extract header and body
-        header = buffer[:header_end].decode()
-        body = buffer[header_end + len(delimiter) :]
+    Args:
+        header (str): Header of the frame (without the delimiter).
 
-        # Parse query length from header
-        query_length = None
-        for line in header.splitlines():
-            if line.startswith("QUERY_LENGTH"):
-                try:
-                    query_length = int(line.split(":")[1].strip())
-                except (IndexError, ValueError):
-                    self.send(
-                        Response(
-                            act_type=ActionEnum.ERROR,
-                            resp_payload={
-                                "message": err_msg.QUERY_LENGTH,
-                                "code": codes.QUERY_LENGTH,
-                            },
-                        ).generate()
-                    )
-                    return
-                break
-
-        if query_length is None:
-            self.send(
-                Response(
+    Returns:
+        tuple: `(query_length, None)`, or `(None, error)` where `error` is the
+            ERROR response to send before closing the connection.
+    """
+    for line in header.splitlines():
+        if line.startswith("QUERY_LENGTH"):
+            try:
+                return int(line.split(":")[1].strip()), None
+            except (IndexError, ValueError):
+                return None, Response(
                     act_type=ActionEnum.ERROR,
                     resp_payload={
-                        "message": err_msg.MISSING_QUERY_LENGTH,
+                        "message": err_msg.QUERY_LENGTH,
                         "code": codes.QUERY_LENGTH,
                     },
-                ).generate()
+                )
+
+    return None, Response(
+        act_type=ActionEnum.ERROR,
+        resp_payload={
+            "message": err_msg.MISSING_QUERY_LENGTH,
+            "code": codes.QUERY_LENGTH,
+        },
+    )
+
+
+def encode_frame(data: str):
+    """
+    Encode a response with the QUERY_LENGTH header and delimiter.
+
+    Args:
+        data (str): JSON-encoded response.
+
+    Returns:
+        bytes: Frame to write to the socket.
+    """
+    header = f"QUERY_LENGTH: {len(data)}\r\n\r\n"
+    return (header + data).encode()
+
+
+def request_id_of(request):
+    """
+    Get the id of a decoded action, if the client sent one.
+
+    Args:
+        request (Any): Decoded action object.
+
+    Returns:
+        Any: Request id, or None.
+    """
+    return request.get("request_id") if isinstance(request, dict) else None
+
+
+class RequestProcessor:
+    """
+    Runs the actions received on a connection, independently of the transport.
+
+    Responses echo the `request_id` of their action. A `BATCH` action carries
+    several actions in one frame and gets all their responses back in one
+    frame. Used by both the threaded handler and the asyncio server, which
+    run the processing steps on the worker pool of the server.
+
+    BEGIN opens a transaction tied to the connection: the row actions that
+    follow run inside it until COMMIT or ROLLBACK, and it is rolled back if
+    the connection closes first.
+
+    Attributes:
+        transaction (Transaction or None): Transaction open on the connection.
+    """
+
+    transaction = None
+
+    # Actions allowed while a transaction is open.
+    TRANSACTION_ACTIONS = (
+        ActionEnum.PING,
+        ActionEnum.CREATE,
+        ActionEnum.BULK_CREATE,
+        ActionEnum.UPDATE,
+        ActionEnum.DELETE,
+        ActionEnum.SELECT,
+        ActionEnum.AGGREGATE,
+    )
+
+    def error_response(self, exc: base.BaseExc, request_id=None):
+        """
+        Build the ERROR response describing an exception.
+
+        Args:
+            exc (base.BaseExc): Raised exception.
+            request_id (Any, optional): Id of the request that failed.
+
+        Returns:
+            Response: Error response.
+        """
+        return Response(
+            act_type=ActionEnum.ERROR,
+            resp_payload={
+                "code": exc.code,
+                "message": exc.message,
+                "ref_data": exc.ref_data,
+            },
+            request_id=request_id,
+        )
+
+    def run_action(self, request: dict):
+        """
+        Authenticate and run a single action.
+
+        Args:
+            request (dict): Decoded action object.
+
+        Returns:
+            Response: Response of the action, tagged with its request id.
+
+        Raises:
+            base.BaseExc: If the action fails.
+        """
+        action = Action(**request)
+
+        user_db_conf = authentication.is_authenticated(action)
+        action.user_db_conf = user_db_conf
+
+        if action.action in (ActionEnum.BEGIN, ActionEnum.COMMIT, ActionEnum.ROLLBACK):
+            response = self.run_transaction_action(action)
+        else:
+            self.check_transaction_action(action)
+            py_db = PyDB(action=action, transaction=self.transaction)
+            try:
+                response: Response = py_db.run()
+            except base.BaseExc as exc:
+                # The transaction lost its snapshot: it cannot go on.
+                if exc.code == codes.TRANSACTION_CONFLICT:
+                    self.close_transaction()
+                raise
+
+        response.request_id = action.request_id
+
+        return response
+
+    def run_transaction_action(self, action: Action):
+        """
+        Run a BEGIN, COMMIT or ROLLBACK action.
+
+        COMMIT and ROLLBACK end the transaction whatever their outcome: a
+        COMMIT rejected because of a conflict leaves nothing written.
+
+        Args:
+            action (Action): Authenticated action.
+
+        Returns:
+            Response: `database` of the new transaction for BEGIN, `count` of
+                rows written for COMMIT, an empty payload for ROLLBACK.
+
+        Raises:
+            CommonPYDBException: If BEGIN is sent while a transaction is
+                open, or COMMIT / ROLLBACK while none is, or if the COMMIT
+                conflicts with another writer.
+        """
+        log_msg(logging.DEBUG, str(action))
+
+        if action.action == ActionEnum.BEGIN:
+            if self.transaction is not None:
+                raise CommonPYDBException(
+                    code=codes.TRANSACTION_ALREADY_ACTIVE,
+                    message=err_msg.TRANSACTION_ALREADY_ACTIVE,
+                )
+
+            self.transaction = Transaction(action.user_db_conf["NAME"])
+            return Response(
+                act_type=ActionEnum.BEGIN,
+                resp_payload={"database": self.transaction.database},
+            )
+
+        if self.transaction is None:
+            raise CommonPYDBException(
+                code=codes.NO_ACTIVE_TRANSACTION,
+                message=err_msg.NO_ACTIVE_TRANSACTION,
+            )
+
+        transaction, self.transaction = self.transaction, None
+
+        if action.action == ActionEnum.COMMIT:
+            return Response(
+                act_type=ActionEnum.COMMIT,
+                resp_payload={"count": transaction.commit()},
             )
+
+        transaction.rollback()
+        return Response(act_type=ActionEnum.ROLLBACK, resp_payload={})
+
+    def check_transaction_action(self, action: Action):
+        """
+        Check that an action may run in the transaction open on the
+        connection, if any.
+
+        Args:
+            action (Action): Authenticated action.
+
+        Raises:
+            CommonPYDBException: If the action is not a row operation, or
+                targets another database than the transaction.
+        """
+        if self.transaction is None:
             return
 
-        # Read the rest of the body if not fully received
-        while len(body) < query_length:
-            chunk = self.request.recv(1024)
-            if not chunk:
-                break
-            body += chunk
+        if action.action not in self.TRANSACTION_ACTIONS:
+            raise CommonPYDBException(
+                code=codes.NOT_ALLOWED_IN_TRANSACTION,
+                message=err_msg.NOT_ALLOWED_IN_TRANSACTION.format(
+                    action=action.action
+                ),
+            )
 
-        # Now body contains the full data of length query_length
-        query_data = body[:query_length]
+        if action.user_db_conf["NAME"] != self.transaction.database:
+            raise CommonPYDBException(
+                code=codes.NOT_ALLOWED_IN_TRANSACTION,
+                message=err_msg.TRANSACTION_OTHER_DATABASE.format(
+                    database=self.transaction.database
+                ),
+            )
 
-        # Example: echo back the received data length
-        query_data = query_data.decode()
-        self.send_action_to_db(query_data)
+    def close_transaction(self):
+        """
+        Roll back the transaction left open on the connection, if any.
+        """
+        if self.transaction is not None:
+            self.transaction.rollback()
+            self.transaction = None
 
-    def send(self, data: str):
-        """Send data to the client with QUERY_LENGTH header and delimiter."""
-        header = f"QUERY_LENGTH: {len(data)}\r\n\r\n"
-        self.request.sendall((header + data).encode())
-
-    def handle_exc(self, exc: base.BaseExc):
-
-        self.send(
-            Response(
-                act_type=ActionEnum.ERROR,
-                resp_payload={
-                    "code": exc.code,
-                    "message": exc.message,
-                    "ref_data": exc.ref_data,
-                },
-            ).generate()
-        )
+    def run_batch(self, batch: dict):
+        """
+        Run the actions of a BATCH frame in order and collect their responses.
 
-        self.handle()
+        Each action gets its own response (an ERROR one if it fails, without
+        stopping the others); actions without `auth` use the batch's.
 
-    def send_action_to_db(self, action):
+        Args:
+            batch (dict): Decoded BATCH action, with the actions in `payload`.
+
+        Returns:
+            Response: BATCH response whose payload lists the responses.
+
+        Raises:
+            CommonPYDBException: If the payload is not a list of actions.
+        """
+        requests = batch.get("payload")
+        if not isinstance(requests, list) or not all(
+            isinstance(request, dict) for request in requests
+        ):
+            raise CommonPYDBException(
+                code=codes.INVALID_DATA,
+                message=err_msg.INVALID_BATCH_PAYLOAD,
+            )
+
+        responses = []
+        for request in requests:
+            if "auth" not in request and "auth" in batch:
+                request = {**request, "auth": batch["auth"]}
+
+            try:
+                if request.get("action") == ActionEnum.BATCH:
+                    raise CommonPYDBException(
+                        code=codes.INVALID_DATA,
+                        message=err_msg.NESTED_BATCH,
+                    )
+
+                responses.append(self.run_action(request).to_dict())
+            except base.BaseExc as exc:
+                responses.append(
+                    self.error_response(exc, request.get("request_id")).to_dict()
+                )
+
+        return Response(
+            act_type=ActionEnum.BATCH,
+            resp_payload=responses,
+            request_id=batch.get("request_id"),
+        )
+
+    def process(self, request):
         """
-        Parse, authenticate, and process a database action request.
+        Authenticate and process a database action request.
 
         Steps:
-        - Parse the incoming JSON string into an Action object.
-        - Authenticate the action using the provided token.
-        - Execute the action using the PyDB engine.
-        - Send the generated response back to the client.
-        - Reinvoke the handler loop to wait for the next message.
+        - Build an Action object from the request (or run every action of a
+          BATCH frame).
+        - Authenticate the request and execute it via PyDB.
+        - Yield the response (in chunked frames for a streamed SELECT).
 
         Args:
-            action (str): JSON-encoded string representing the action to be executed.
+            request (Any): Decoded action object.
+
+        Yields:
+            tuple: `(frame, more)` for each JSON-encoded response frame, to
+                send in order; `more` is False on the last one. Database or
+                system-level exceptions are turned into an ERROR frame.
+        """
+        try:
+
+            if isinstance(request, dict) and request.get("action") == ActionEnum.BATCH:
+                response = self.run_batch(request)
+            else:
+                response = self.run_action(request)
+
+            if isinstance(response, StreamResponse):
+                chunks = response.generate_chunks()
+                frame = next(chunks)
+                for following in chunks:
+                    yield frame, True
+                    frame = following
+                yield frame, False
+            else:
+                yield response.generate(), False
+
+        except base.BaseExc as exc:
+            yield self.error_response(exc, request_id_of(request)).generate(), False
+
+
+class ConnectionHandler(RequestProcessor, socketserver.BaseRequestHandler):
+    """Handles incoming requests to the database server.
+    This class is responsible for processing client requests and sending responses
+
+    Clients may pipeline requests (send several frames before reading any
+    response): bytes received past the end of a frame are kept for the next
+    one, and responses are sent in request order, each echoing the
+    `request_id` of its action. A `BATCH` action carries several actions in
+    one frame and gets all their responses back in one frame."""
 
-        Exceptions:
-            base.BaseExc: Catches and delegates any database or system-level exceptions
-                          to the exception handler method.
+    # Size of the reusable receive buffer: a single recv call can bring in
+    # several pipelined frames or a large part of a big one.
+    RECV_SIZE = 65536
+
+    def setup(self):
+        """Initialize the receive buffers of the connection."""
+        self._buffer = bytearray()
+        self._recv_buffer = bytearray(self.RECV_SIZE)
+        self._recv_view = memoryview(self._recv_buffer)
+
+    def finish(self):
+        """Release the receive buffers and any transaction left open."""
+        self._recv_view.release()
+        self.close_transaction()
+
+    def handle(self):
         """
+        Serve the requests of the connection until the client disconnects.
 
+        Frames are read and processed one after the other in a loop, so a
+        long-lived connection uses constant stack depth and memory.
+        """
+        while True:
+            query_data = self.read_frame()
+            if query_data is None:
+                log_msg(
+                    logging.DEBUG,
+                    f"CLOSING CONNECTION {self.client_address[0]}:{self.client_address[1]}",
+                )
+                return
+
+            self.send_action_to_db(query_data)
+
+    def _receive(self):
+        """
+        Receive the next bytes from the socket into the frame buffer.
+
+        Returns:
+            bool: False if the client closed the connection.
+        """
         try:
+            received = self.request.recv_into(self._recv_view)
+        except ConnectionError:
+            return False
+
+        if not received:
+            return False
+
+        self._buffer += self._recv_view[:received]
+        return True
+
+    def read_frame(self):
+        """
+        Read the next frame from the socket, handling the custom header format.
+        The header is expected to be in the format:
+        QUERY_LENGTH: <length>\r\n\r\n
+        where <length> is the length of the query data that follows.
+        If the header or the body is not fully received, it keeps reading
+        until it is. Bytes received past the end of the frame (pipelined
+        frames) stay in the buffer for the next call.
+
+        Returns:
+            str or None: Body of the frame, or None if the connection must be
+                closed (client disconnected or invalid header).
+        """
+        # Find the header delimiter, reading until we get it
+        header_end = self._buffer.find(DELIMITER)
+        while header_end == -1:
+            # Only the new bytes (and a possibly split delimiter) need a search
+            searched = max(0, len(self._buffer) - len(DELIMITER) + 1)
+            if not self._receive():
+                return None
+            header_end = self._buffer.find(DELIMITER, searched)
+
+        # Parse query length from header
+        query_length, error = parse_header(self._buffer[:header_end].decode())
+        if error is not None:
+            self.send(error.generate())
+            return None
+
+        # Read the rest of the body if not fully received
+        body_start = header_end + len(DELIMITER)
+        body_end = body_start + query_length
+        while len(self._buffer) < body_end:
+            if not self._receive():
+                return None
 
-            action = Action(**json.loads(action))
+        query_data = self._buffer[body_start:body_end].decode()
+        del self._buffer[:body_end]
 
-            user_db_conf = authentication.is_authenticated(action)
-            action.user_db_conf = user_db_conf
+        return query_data
 
-            py_db = PyDB(action=action)
+    def send(self, data: str):
+        """Send data to the client with QUERY_LENGTH header and delimiter."""
+        self.request.sendall(encode_frame(data))
 
-            response: Response = py_db.run()
+    def send_action_to_db(self, action):
+        """
+        Process a database action request and send its response frames.
 
-            self.send(response.generate())
+        Each frame is produced by a task of the server worker pool; the
+        request gets an ERROR response at once if the pool is saturated.
 
-            self.handle()
+        Args:
+            action (str): JSON-encoded string representing the action to be executed.
+        """
+        request = json.loads(action)
+        frames = self.process(request)
+        worker_pool = self.server.worker_pool
 
+        try:
+            future = worker_pool.submit(next, frames)
         except base.BaseExc as exc:
-            self.handle_exc(exc)
+            self.send(self.error_response(exc, request_id_of(request)).generate())
+            return
+
+        while True:
+            frame, more = future.result()
+            self.send(frame)
+            if not more:
+                return
+
+            future = worker_pool.submit(next, frames, admit=False)
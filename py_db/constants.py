@@ -5,16 +5,25 @@ class ActionEnum:
     PING = "PING"
 
     CREATE = "CREATE"
+    BULK_CREATE = "BULK_CREATE"
     UPDATE = "UPDATE"
     DELETE = "DELETE"
     SELECT = "SELECT"
+    AGGREGATE = "AGGREGATE"
 
     CREATE_TABLE = "CREATE_TABLE"
     CREATE_DATABASE = "CREATE_DATABASE"
 
     DROP_TABLE = "DROP_TABLE"
+    COMPACT_TABLE = "COMPACT_TABLE"
+    CACHE_STATS = "CACHE_STATS"
     # DROP_DATABASE = "DROP_DATABASE"
 
+    BEGIN = "BEGIN"
+    COMMIT = "COMMIT"
+    ROLLBACK = "ROLLBACK"
+
+    BATCH = "BATCH"
     ERROR = "ERROR"
 
     LOGIN = authentication.add_exclude_action("LOGIN")
@@ -11,12 +11,13 @@ running queries, and authenticating users.
 Responses are returned using a consistent `Response` object structure.
 """
 
+from env import environment
 from utils import log_msg, logging
 from exc import AuthenticationException, CommonPYDBException, err_msg, codes
 
 from .action import Action
 from .storage import Storage
-from .response import Response
+from .response import Response, StreamResponse
 from .constants import ActionEnum
 from .auth import authentication
 
@@ -29,15 +30,17 @@ class PyDB:
     and executing corresponding logic using the underlying storage engine.
     """
 
-    def __init__(self, action: Action):
+    def __init__(self, action: Action, transaction=None):
         """
         Initialize PyDB with an action to process.
 
         Args:
             action (Action): Parsed action object containing command, data, and metadata.
+            transaction (Transaction, optional): Transaction open on the
+                connection; row operations then run inside it.
         """
         self._action = action
-        self._storage_engine = Storage()
+        self._storage_engine = transaction or Storage()
 
         log_msg(logging.DEBUG, str(self._action))
 
@@ -56,8 +59,12 @@ class PyDB:
                 return self.create_table()
             case ActionEnum.CREATE:
                 return self.create()
+            case ActionEnum.BULK_CREATE:
+                return self.bulk_create()
             case ActionEnum.SELECT:
                 return self.select()
+            case ActionEnum.AGGREGATE:
+                return self.aggregate()
             case ActionEnum.UPDATE:
                 return self.update()
             case ActionEnum.DELETE:
@@ -68,6 +75,10 @@ class PyDB:
                 return self.login()
             case ActionEnum.DROP_TABLE:
                 return self.drop_table()
+            case ActionEnum.COMPACT_TABLE:
+                return self.compact_table()
+            case ActionEnum.CACHE_STATS:
+                return self.cache_stats()
 
         return Response(
             ActionEnum.ERROR,
@@ -122,6 +133,35 @@ class PyDB:
             act_type=ActionEnum.CREATE,
         )
 
+    def bulk_create(self):
+        """
+        Handle the BULK_CREATE action to insert a list of rows at once.
+
+        Returns:
+            Response: Number of inserted rows, their pks and the rejected rows.
+
+        Raises:
+            CommonPYDBException: If table is not provided.
+        """
+        if not self._action.table:
+            raise CommonPYDBException(
+                code=codes.TABLE_NOT_PROVIDED,
+                message=err_msg.TABLE_NOT_PROVIDED.format(action=self._action.action),
+            )
+
+        result = self._storage_engine.bulk_insert(
+            table=self._action.table,
+            rows=self._action.payload,
+            database=self._action.user_db_conf["NAME"],
+            continue_on_error=self._action.continue_on_error,
+        )
+        result["table"] = self._action.table
+
+        return Response(
+            resp_payload=result,
+            act_type=ActionEnum.BULK_CREATE,
+        )
+
     def update(self):
         """
         Handle the UPDATE action to modify existing rows.
@@ -162,13 +202,36 @@ class PyDB:
         """
         Handle the SELECT action to retrieve matching rows from a table.
 
+        When the action asks for streaming, rows are read lazily and sent in
+        chunked frames of `STREAM_CHUNK_SIZE` rows.
+
         Returns:
             Response: List of rows matching the query.
         """
+        if self._action.stream:
+            rows = self._storage_engine.stream(
+                table=self._action.table,
+                query=self._action.query,
+                database=self._action.user_db_conf["NAME"],
+                limit=self._action.limit,
+                skip=self._action.skip,
+                fields=self._action.fields,
+                sort=self._action.sort,
+            )
+            return StreamResponse(
+                act_type=ActionEnum.SELECT,
+                resp_payload=rows,
+                chunk_size=environment["STREAM_CHUNK_SIZE"],
+            )
+
         results = self._storage_engine.read(
             table=self._action.table,
             query=self._action.query,
             database=self._action.user_db_conf["NAME"],
+            limit=self._action.limit,
+            skip=self._action.skip,
+            fields=self._action.fields,
+            sort=self._action.sort,
         )
 
         return Response(
@@ -176,6 +239,27 @@ class PyDB:
             resp_payload=results,
         )
 
+    def aggregate(self):
+        """
+        Handle the AGGREGATE action to compute counts, sums, averages,
+        minimums and maximums over the rows matching a query.
+
+        Returns:
+            Response: One row per group with its aggregate values.
+        """
+        results = self._storage_engine.aggregate(
+            table=self._action.table,
+            query=self._action.query,
+            database=self._action.user_db_conf["NAME"],
+            aggregates=self._action.aggregates,
+            group_by=self._action.group_by,
+        )
+
+        return Response(
+            act_type=ActionEnum.AGGREGATE,
+            resp_payload=results,
+        )
+
     def create_database(self):
         """
         Handle the CREATE_DATABASE action.
@@ -206,6 +290,37 @@ class PyDB:
             resp_payload={},
         )
 
+    def compact_table(self):
+        """
+        Handle the COMPACT_TABLE action to reclaim the space of dead rows now.
+
+        Returns:
+            Response: Compaction report (bytes reclaimed, time taken).
+        """
+        report = self._storage_engine.compact_table(
+            table=self._action.table,
+            database=self._action.user_db_conf["NAME"],
+        )
+        return Response(
+            act_type=ActionEnum.COMPACT_TABLE,
+            resp_payload=report,
+        )
+
+    def cache_stats(self):
+        """
+        Handle the CACHE_STATS action to report the hits and misses of the
+        result cache.
+
+        Returns:
+            Response: Result cache statistics (None when it is disabled).
+        """
+        return Response(
+            act_type=ActionEnum.CACHE_STATS,
+            resp_payload={
+                "result_cache": self._storage_engine.result_cache_stats(),
+            },
+        )
+
     def login(self):
         """
         Handle the LOGIN action by validating credentials and issuing a token.
@@ -0,0 +1,912 @@
+"""
+Defines the in-memory index structures used by the Storage engine.
+
+Indexes are kept per table and map field values to the primary keys (`pk`)
+of the rows holding them, so lookups such as uniqueness checks or point
+queries no longer need to scan the whole `.data` file. Each table also keeps
+a persistent primary-key index with the byte location of every row, so
+candidate rows can be fetched directly.
+"""
+
+import os
+import json
+import bisect
+
+from .locks import ReadWriteLock
+
+RANGE_OPERATORS = ("$gt", "$gte", "$lt", "$lte")
+
+# Key marking a tombstone record, written to the data file when a row is deleted.
+TOMBSTONE_KEY = "$deleted"
+
+
+def index_key(value):
+    """
+    Convert a field value into a hashable index key.
+
+    Args:
+        value: Field value taken from a row or a query.
+
+    Returns:
+        The value itself if hashable, else a canonical JSON string.
+    """
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return json.dumps(value, sort_keys=True)
+
+
+def batch_conflict(batch_values, data):
+    """
+    Find the first unique value of a row already taken by an earlier row of
+    the same batch.
+
+    Args:
+        batch_values (dict): Unique field -> index keys claimed by the batch.
+        data (dict): Row values.
+
+    Returns:
+        tuple or None: `(field, value)` of the conflict, else None.
+    """
+    for field, values in batch_values.items():
+        if field in data and index_key(data[field]) in values:
+            return field, data[field]
+
+    return None
+
+
+def claim_values(batch_values, data):
+    """
+    Record the unique values of a row accepted in a batch.
+
+    Args:
+        batch_values (dict): Unique field -> index keys claimed by the batch.
+        data (dict): Row values.
+    """
+    for field, values in batch_values.items():
+        if field in data:
+            values.add(index_key(data[field]))
+
+
+class HashIndex:
+    """
+    Hash index mapping the values of a single field to a set of row pks.
+
+    Attributes:
+        field (str): Name of the indexed field.
+    """
+
+    def __init__(self, field):
+        """
+        Initialize an empty hash index.
+
+        Args:
+            field (str): Name of the field to index.
+        """
+        self.field = field
+        self._entries = {}
+
+    def add(self, row: dict):
+        """
+        Register a row in the index.
+
+        Args:
+            row (dict): Row containing at least `pk`.
+        """
+        if self.field not in row:
+            return
+
+        key = index_key(row[self.field])
+        self._entries.setdefault(key, set()).add(row["pk"])
+
+    def remove(self, row: dict):
+        """
+        Remove a row from the index.
+
+        Args:
+            row (dict): Row previously registered with `add`.
+        """
+        if self.field not in row:
+            return
+
+        key = index_key(row[self.field])
+        pks = self._entries.get(key)
+        if pks is None:
+            return
+
+        pks.discard(row["pk"])
+        if not pks:
+            del self._entries[key]
+
+    def lookup(self, value) -> set:
+        """
+        Return the pks of rows whose field equals the given value.
+
+        Args:
+            value: Value to look up.
+
+        Returns:
+            set: Matching pks (must not be modified by the caller).
+        """
+        return self._entries.get(index_key(value), set())
+
+
+class SortedIndex:
+    """
+    Sorted index over a single field, used to answer range queries.
+
+    Entries are kept as an ordered list of `(value, pk)` tuples; rows whose
+    value is missing or None are not indexed.
+
+    Attributes:
+        field (str): Name of the indexed field.
+    """
+
+    def __init__(self, field):
+        """
+        Initialize an empty sorted index.
+
+        Args:
+            field (str): Name of the field to index.
+        """
+        self.field = field
+        self._entries = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def pks(self, reverse=False):
+        """
+        Return the indexed pks ordered by field value.
+
+        Args:
+            reverse (bool): Whether to return them in descending order.
+
+        Returns:
+            list: pks in index order (a copy, safe to iterate).
+        """
+        pks = [pk for _, pk in self._entries]
+        if reverse:
+            pks.reverse()
+        return pks
+
+    def add(self, row: dict):
+        """
+        Register a row in the index.
+
+        Args:
+            row (dict): Row containing at least `pk`.
+        """
+        if row.get(self.field) is None:
+            return
+
+        try:
+            bisect.insort(self._entries, (row[self.field], row["pk"]))
+        except TypeError:
+            # Values that cannot be ordered against the others are left out,
+            # range queries on them fall back to a scan.
+            return
+
+    def add_many(self, rows: list):
+        """
+        Register a batch of rows in the index.
+
+        The new entries are merged with a single sort (linear on the already
+        sorted run) instead of one `insort` per row.
+
+        Args:
+            rows (list): Rows containing at least `pk`.
+        """
+        entries = [
+            (row[self.field], row["pk"])
+            for row in rows
+            if row.get(self.field) is not None
+        ]
+
+        try:
+            self._entries = sorted(self._entries + entries)
+        except TypeError:
+            for row in rows:
+                self.add(row)
+
+    def remove(self, row: dict):
+        """
+        Remove a row from the index.
+
+        Args:
+            row (dict): Row previously registered with `add`.
+        """
+        if row.get(self.field) is None:
+            return
+
+        entry = (row[self.field], row["pk"])
+        try:
+            position = bisect.bisect_left(self._entries, entry)
+        except TypeError:
+            return
+
+        if position < len(self._entries) and self._entries[position] == entry:
+            del self._entries[position]
+
+    def range(self, condition: dict):
+        """
+        Return the pks of rows matching the range operators of a condition.
+
+        Args:
+            condition (dict): Condition holding `$gt`, `$gte`, `$lt` or `$lte`.
+
+        Returns:
+            set or None: Matching pks, or None if the values cannot be compared.
+        """
+        start, end = 0, len(self._entries)
+
+        def value_of(entry):
+            return entry[0]
+
+        try:
+            for op, cond_val in condition.items():
+                if op == "$gt":
+                    position = bisect.bisect_right(
+                        self._entries, cond_val, key=value_of
+                    )
+                    start = max(start, position)
+                elif op == "$gte":
+                    position = bisect.bisect_left(
+                        self._entries, cond_val, key=value_of
+                    )
+                    start = max(start, position)
+                elif op == "$lt":
+                    position = bisect.bisect_left(
+                        self._entries, cond_val, key=value_of
+                    )
+                    end = min(end, position)
+                elif op == "$lte":
+                    position = bisect.bisect_right(
+                        self._entries, cond_val, key=value_of
+                    )
+                    end = min(end, position)
+        except TypeError:
+            return None
+
+        return {pk for _, pk in self._entries[start:end]}
+
+    def prefix(self, prefix: str):
+        """
+        Return the pks of rows whose string value starts with a prefix.
+
+        Strings sharing a prefix are contiguous in the index: they sort
+        between the prefix itself and the prefix with its last character
+        bumped by one code point.
+
+        Args:
+            prefix (str): Non-empty prefix.
+
+        Returns:
+            set or None: Matching pks, or None if the values are not strings.
+        """
+        if not prefix or prefix[-1] == chr(0x10FFFF):
+            return None
+
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+        def value_of(entry):
+            return entry[0]
+
+        try:
+            start = bisect.bisect_left(self._entries, prefix, key=value_of)
+            end = bisect.bisect_left(self._entries, upper, key=value_of)
+        except TypeError:
+            return None
+
+        return {pk for _, pk in self._entries[start:end]}
+
+
+class PrimaryKeyIndex:
+    """
+    Persistent map of each row pk to its `(offset, length)` in the data file.
+
+    The map is stored as an append-only text file next to `<table>.data`
+    (`<table>.idx`). Each entry line is `<pk> <offset> <length>`; a
+    `-<pk> <offset> <length>` entry records a tombstone and a `@ <size>` line
+    records how many bytes of the data file the index covers. On load the file is checked against the data
+    file and repaired from the uncovered tail, or rebuilt when it is unusable.
+
+    Attributes:
+        data_path (str): Path to the table data file.
+        index_path (str): Path to the persisted index file.
+        live_bytes (int): Total size of the live rows in the data file.
+    """
+
+    HEADER = "PYDB_IDX 1\n"
+
+    def __init__(self, data_path, index_path):
+        """
+        Initialize an empty primary-key index.
+
+        Args:
+            data_path (str): Path to the table data file.
+            index_path (str): Path to the persisted index file.
+        """
+        self.data_path = data_path
+        self.index_path = index_path
+        self._locations = {}
+        self.live_bytes = 0
+
+    def __contains__(self, pk):
+        return pk in self._locations
+
+    def __getitem__(self, pk):
+        return self._locations[pk]
+
+    def __len__(self):
+        return len(self._locations)
+
+    def get(self, pk, default=None):
+        """Return the location of a pk, or `default` if unknown."""
+        return self._locations.get(pk, default)
+
+    def items(self):
+        """Return the `(pk, (offset, length))` pairs of the index."""
+        return self._locations.items()
+
+    def locate(self, pk, offset, length):
+        """
+        Record the location of a row and persist the entry.
+
+        Args:
+            pk (str): Row pk.
+            offset (int): Byte offset of the row in the data file.
+            length (int): Length of the row in bytes, newline included.
+        """
+        self.apply([(pk, offset, length, False)])
+
+    def apply(self, entries):
+        """
+        Record a batch of row versions and tombstones, persisting them in one write.
+
+        Args:
+            entries (list): `(pk, offset, length, deleted)` tuples, where
+                `offset` and `length` locate the appended record and `deleted`
+                marks a tombstone.
+        """
+        lines = []
+        for pk, offset, length, deleted in entries:
+            previous = self._locations.pop(pk, None)
+            if previous is not None:
+                self.live_bytes -= previous[1]
+
+            if deleted:
+                lines.append(f"-{pk} {offset} {length}\n")
+            else:
+                self._locations[pk] = (offset, length)
+                self.live_bytes += length
+                lines.append(f"{pk} {offset} {length}\n")
+
+        with open(self.index_path, "a") as index_file:
+            index_file.write("".join(lines))
+
+    def rewrite(self, locations: dict, covered: int):
+        """
+        Replace the whole index, in memory and on disk.
+
+        Args:
+            locations (dict): New pk to `(offset, length)` map.
+            covered (int): Size of the data file described by `locations`.
+        """
+        self._locations = locations
+        self.live_bytes = sum(length for _, length in locations.values())
+
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as index_file:
+            index_file.write(self.HEADER)
+            # Entries are written in file order so that any prefix of the
+            # index still describes a prefix of the data file.
+            for pk, (offset, length) in sorted(
+                locations.items(), key=lambda item: item[1][0]
+            ):
+                index_file.write(f"{pk} {offset} {length}\n")
+            index_file.write(f"@ {covered}\n")
+
+        os.replace(tmp_path, self.index_path)
+
+    def rebuild(self):
+        """
+        Rebuild the whole index from a scan of the data file, e.g. after the
+        file was changed outside the server.
+        """
+        self.rewrite(*self._scan({}, 0))
+
+    def load(self):
+        """
+        Load the persisted index, repairing or rebuilding it if it is out of date.
+
+        Returns:
+            str: `"loaded"`, `"repaired"` or `"rebuilt"`.
+        """
+        locations, covered = self._read_index_file()
+        size = os.path.getsize(self.data_path)
+
+        if (
+            locations is None
+            or covered > size
+            or not self._is_consistent(locations, covered)
+        ):
+            locations, covered = self._scan({}, 0)
+            self.rewrite(locations, covered)
+            return "rebuilt"
+
+        if covered < size:
+            locations, covered = self._scan(locations, covered)
+            self.rewrite(locations, covered)
+            return "repaired"
+
+        self._locations = locations
+        self.live_bytes = sum(length for _, length in locations.values())
+        return "loaded"
+
+    def _read_index_file(self):
+        """
+        Parse the persisted index file.
+
+        Returns:
+            tuple: `(locations, covered)`, with `locations` None if the file is
+            missing or malformed.
+        """
+        locations = {}
+        covered = 0
+
+        try:
+            with open(self.index_path, "r") as index_file:
+                if index_file.readline() != self.HEADER:
+                    return None, 0
+
+                for line in index_file:
+                    if not line.endswith("\n"):
+                        # Partially written trailing entry, ignored.
+                        break
+
+                    key, *values = line.split()
+                    if key == "@":
+                        covered = max(covered, int(values[0]))
+                        continue
+
+                    offset, length = int(values[0]), int(values[1])
+                    if key.startswith("-"):
+                        locations.pop(key[1:], None)
+                    else:
+                        locations[key] = (offset, length)
+                    covered = max(covered, offset + length)
+        except FileNotFoundError:
+            return None, 0
+        except (ValueError, IndexError):
+            return None, 0
+
+        return locations, covered
+
+    def _is_consistent(self, locations: dict, covered: int):
+        """
+        Spot-check a loaded index against the data file.
+
+        The covered size must fall right after a complete line, and the last
+        indexed row must hold the pk it is indexed under; this catches a data
+        file that was rewritten (e.g. compacted) without its index.
+
+        Args:
+            locations (dict): Loaded pk to `(offset, length)` map.
+            covered (int): Size of the data file described by the index.
+
+        Returns:
+            bool: True if the index matches the data file.
+        """
+        with open(self.data_path, "rb") as data_file:
+            if covered:
+                data_file.seek(covered - 1)
+                if data_file.read(1) != b"\n":
+                    return False
+
+            if not locations:
+                return True
+
+            pk, (offset, length) = max(locations.items(), key=lambda item: item[1][0])
+            data_file.seek(offset)
+            try:
+                return json.loads(data_file.read(length)).get("pk") == pk
+            except ValueError:
+                return False
+
+    def _scan(self, locations: dict, start: int):
+        """
+        Index the rows of the data file starting at a given offset.
+
+        Args:
+            locations (dict): Locations already known before `start`.
+            start (int): Byte offset to start scanning from.
+
+        Returns:
+            tuple: `(locations, covered)` after the scan.
+        """
+        offset = start
+        with open(self.data_path, "rb") as data_file:
+            data_file.seek(start)
+            for line in data_file:
+                if not line.endswith(b"\n"):
+                    break
+
+                if line.strip():
+                    json_data = json.loads(line)
+                    if json_data.get(TOMBSTONE_KEY):
+                        locations.pop(json_data["pk"], None)
+                    else:
+                        locations[json_data["pk"]] = (offset, len(line))
+                offset += len(line)
+
+        return locations, offset
+
+
+class TableIndex:
+    """
+    Groups all the indexes of a single table.
+
+    The primary-key locations are always loaded; the value indexes (unique,
+    hash and sorted) are only built when a lookup needs them, so pk-only
+    traffic never has to decode the data file.
+
+    Attributes:
+        unique_fields (list): Fields declared unique in the schema.
+        unique (dict): Maps unique field names (other than `pk`) to their `HashIndex`.
+        hash (dict): Maps every hash-indexed field (unique or declared with
+            `"index": true`) to its `HashIndex`.
+        sorted (dict): Maps fields declared with `"index": true` to their `SortedIndex`.
+        locations (PrimaryKeyIndex): Maps each row pk to its location in the data file.
+        values_loaded (bool): Whether the value indexes have been built.
+        lock (ReadWriteLock): Guards the table. Readers hold it in shared
+            mode while they resolve candidates and snapshot row locations;
+            writers hold it in exclusive mode for their whole
+            check-then-write sequence (uniqueness checks, appends to the
+            data file and index changes), and the compactor to swap the file.
+    """
+
+    def __init__(self, locations, unique_fields=None, indexed_fields=None):
+        """
+        Initialize the indexes for a table.
+
+        Args:
+            locations (PrimaryKeyIndex): Loaded primary-key index of the table.
+            unique_fields (list, optional): Fields declared unique in the schema.
+            indexed_fields (list, optional): Fields declared with `"index": true`.
+        """
+        self.unique_fields = list(unique_fields or [])
+        self.locations = locations
+        self.lock = ReadWriteLock()
+
+        self._indexed_fields = [
+            field for field in indexed_fields or [] if field != "pk"
+        ]
+        self._reset_values()
+
+    def _reset_values(self):
+        """
+        Create empty value indexes, to be built on their next use.
+        """
+        self.unique = {
+            field: HashIndex(field) for field in self.unique_fields if field != "pk"
+        }
+        self.hash = dict(self.unique)
+        self.sorted = {}
+        self.values_loaded = False
+
+        for field in self._indexed_fields:
+            self.hash.setdefault(field, HashIndex(field))
+            self.sorted[field] = SortedIndex(field)
+
+    def rebuild(self):
+        """
+        Re-index a table whose data file was changed outside the server: the
+        primary-key locations are rebuilt from the file, and the value indexes
+        dropped until their next use. The caller must hold the lock in write
+        mode.
+        """
+        self.locations.rebuild()
+        self._reset_values()
+
+    @staticmethod
+    def is_pk_lookup(query: dict):
+        """
+        Check whether a query selects rows by pk equality or `$in`.
+
+        Args:
+            query (dict): Query filters.
+
+        Returns:
+            bool: True if the pk index alone can resolve the candidates.
+        """
+        if not isinstance(query, dict):
+            return False
+
+        condition = query.get("pk")
+        if condition is None:
+            return False
+
+        if not isinstance(condition, dict):
+            return True
+
+        return "$eq" in condition or isinstance(condition.get("$in"), (list, tuple))
+
+    def add(self, row: dict, location=None):
+        """
+        Register a row in every index of the table.
+
+        Args:
+            row (dict): Row to add.
+            location (tuple, optional): `(offset, length)` of the row in the
+                data file, persisted in the primary-key index when given.
+        """
+        if self.values_loaded:
+            self.add_values(row)
+
+        if location is not None:
+            self.locations.locate(row["pk"], *location)
+
+    def add_many(self, rows: list, locations: list):
+        """
+        Register a batch of newly appended rows in every index of the table.
+
+        Args:
+            rows (list): Rows to add.
+            locations (list): `(offset, length)` of each row in the data file,
+                persisted in the primary-key index in one write.
+        """
+        if self.values_loaded:
+            for index in self.hash.values():
+                for row in rows:
+                    index.add(row)
+
+            for index in self.sorted.values():
+                index.add_many(rows)
+
+        self.locations.apply(
+            [
+                (row["pk"], offset, length, False)
+                for row, (offset, length) in zip(rows, locations)
+            ]
+        )
+
+    def add_values(self, row: dict):
+        """
+        Register a row in the value indexes only.
+
+        Args:
+            row (dict): Row to add.
+        """
+        for index in self.hash.values():
+            index.add(row)
+
+        for index in self.sorted.values():
+            index.add(row)
+
+    def remove(self, row: dict, location=None):
+        """
+        Remove a row from every index of the table.
+
+        Args:
+            row (dict): Row to remove.
+            location (tuple, optional): `(offset, length)` of the row's
+                tombstone, persisted in the primary-key index when given.
+        """
+        if self.values_loaded:
+            for index in self.hash.values():
+                index.remove(row)
+
+            for index in self.sorted.values():
+                index.remove(row)
+
+        if location is not None:
+            self.locations.apply([(row["pk"], *location, True)])
+
+    def offset_pks(self):
+        """
+        Build the reverse mapping of `locations`.
+
+        Returns:
+            dict: Maps row offsets in the data file to their pk.
+        """
+        return {location[0]: pk for pk, location in self.locations.items()}
+
+    def candidates(self, query: dict):
+        """
+        Narrow down the rows that may match a query using the available indexes.
+
+        The returned pks are a superset of the matching rows; callers must still
+        evaluate the query against each candidate.
+
+        Args:
+            query (dict): Query filters.
+
+        Returns:
+            set or None: Candidate pks, or None if no index applies to the query.
+        """
+        if not isinstance(query, dict):
+            return None
+
+        result = None
+
+        for field, condition in query.items():
+            if field == "$and":
+                pks = self._all_candidates(condition)
+            elif field == "$or":
+                pks = self._any_candidates(condition)
+            else:
+                pks = self._field_candidates(field, condition)
+            if pks is None:
+                continue
+
+            result = pks if result is None else result & pks
+            if not result:
+                break
+
+        return result
+
+    def _all_candidates(self, queries):
+        """
+        Resolve the candidate pks of an `$and` of sub-queries.
+
+        Args:
+            queries (list): Sub-queries.
+
+        Returns:
+            set or None: Intersection of the sub-queries' candidates, or None
+                if no index applies to any of them.
+        """
+        if not isinstance(queries, list):
+            return None
+
+        result = None
+        for query in queries:
+            if not isinstance(query, dict):
+                return None
+
+            pks = self.candidates(query)
+            if pks is None:
+                continue
+
+            result = pks if result is None else result & pks
+            if not result:
+                break
+
+        return result
+
+    def _any_candidates(self, queries):
+        """
+        Resolve the candidate pks of an `$or` of sub-queries.
+
+        Args:
+            queries (list): Sub-queries.
+
+        Returns:
+            set or None: Union of the sub-queries' candidates, or None if one
+                of them cannot be answered by an index.
+        """
+        if not isinstance(queries, list) or not queries:
+            return None
+
+        result = set()
+        for query in queries:
+            if not isinstance(query, dict):
+                return None
+
+            pks = self.candidates(query)
+            if pks is None:
+                return None
+
+            result |= pks
+
+        return result
+
+    def _pk_candidates(self, condition):
+        """
+        Resolve the candidate pks for a condition on the `pk` field.
+
+        Args:
+            condition: pk condition (plain value or operator dict).
+
+        Returns:
+            set or None: Candidate pks, or None if the pk index cannot answer it.
+        """
+        if not isinstance(condition, dict):
+            values = [condition]
+        elif "$eq" in condition:
+            values = [condition["$eq"]]
+        elif isinstance(condition.get("$in"), (list, tuple)):
+            values = condition["$in"]
+        else:
+            return None
+
+        return {
+            value
+            for value in values
+            if isinstance(value, str) and value in self.locations
+        }
+
+    def _field_candidates(self, field, condition):
+        """
+        Resolve the candidate pks for a single query field.
+
+        Args:
+            field (str): Queried field.
+            condition: Field condition (plain value or operator dict).
+
+        Returns:
+            set or None: Candidate pks, or None if no index can answer it.
+        """
+        if field == "pk":
+            return self._pk_candidates(condition)
+
+        if not self.values_loaded:
+            return None
+
+        hash_index = self.hash.get(field)
+
+        if not isinstance(condition, dict):
+            return set(hash_index.lookup(condition)) if hash_index else None
+
+        if hash_index:
+            if "$eq" in condition:
+                return set(hash_index.lookup(condition["$eq"]))
+
+            if isinstance(condition.get("$in"), (list, tuple)):
+                pks = set()
+                for value in condition["$in"]:
+                    pks |= hash_index.lookup(value)
+                return pks
+
+        sorted_index = self.sorted.get(field)
+        if not sorted_index:
+            return None
+
+        result = None
+        if any(op in condition for op in RANGE_OPERATORS):
+            result = sorted_index.range(
+                {op: val for op, val in condition.items() if op in RANGE_OPERATORS}
+            )
+
+        if isinstance(condition.get("$prefix"), str):
+            pks = sorted_index.prefix(condition["$prefix"])
+            if pks is not None:
+                result = pks if result is None else result & pks
+
+        return result
+
+    def find_unique_conflict(
+        self, row: dict, fields=None, exclude_pk=None, exclude_pks=None
+    ):
+        """
+        Find the first unique field whose value is already used by another row.
+
+        Args:
+            row (dict): Candidate row values.
+            fields (list, optional): Unique fields to check, defaults to all.
+            exclude_pk (str, optional): pk of the row being updated, if any.
+            exclude_pks (set, optional): pks of other rows being rewritten,
+                whose current values do not count.
+
+        Returns:
+            tuple or None: `(field, value)` of the conflict, else None.
+        """
+        for field in fields or self.unique_fields:
+            if field not in row:
+                continue
+
+            if field == "pk":
+                pks = self._pk_candidates(row[field]) or set()
+            elif field in self.unique:
+                pks = self.unique[field].lookup(row[field])
+            else:
+                continue
+
+            if exclude_pks:
+                pks = pks - exclude_pks
+            if pks and (exclude_pk is None or pks - {exclude_pk}):
+                return field, row[field]
+
+        return None
@@ -0,0 +1,66 @@
+"""
+# File: locks.py
+# Description: Reader/writer lock used to guard each table, so reads run in
+# parallel while writes are serialized.
+"""
+
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    """
+    Lock shared by any number of readers or held by a single writer.
+
+    Writers are preferred: once a writer waits, new readers wait too, so a
+    steady flow of reads cannot starve the writes. The lock is not
+    reentrant; a thread holding it must not acquire it again.
+    """
+
+    def __init__(self):
+        """
+        Initialize an unlocked lock.
+        """
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        """
+        Hold the lock in shared mode for the duration of the block.
+        """
+        with self._condition:
+            while self._writing or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        """
+        Hold the lock in exclusive mode for the duration of the block.
+        """
+        with self._condition:
+            self._waiting_writers += 1
+            try:
+                while self._writing or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writing = True
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
@@ -0,0 +1,438 @@
+"""
+# File: query.py
+# Description: Compiles MongoDB-like query filters into plans of Python
+# closures, so a query is parsed once and then evaluated against every row.
+"""
+
+import re
+import json
+from functools import lru_cache
+
+from exc import CommonPYDBException, codes, err_msg
+
+# Evaluation order of the predicates: equalities reject most rows for the
+# least work, negations reject the fewest, so they run last.
+OPERATOR_RANK = {
+    "$eq": 0,
+    "$in": 1,
+    "$gt": 2,
+    "$gte": 2,
+    "$lt": 2,
+    "$lte": 2,
+    "$prefix": 2,
+    "$regex": 3,
+    "$exists": 3,
+    "$ne": 4,
+    "$nin": 5,
+    "$not": 6,
+}
+
+LOGICAL_OPERATORS = ("$and", "$or", "$not")
+
+REGEX_FLAGS = {"i": re.IGNORECASE, "m": re.MULTILINE, "s": re.DOTALL, "x": re.VERBOSE}
+
+_MISSING = object()
+
+
+def _invalid(operator, value):
+    """
+    Build the error raised for a malformed operator.
+
+    Args:
+        operator (str): Operator name.
+        value: Operand sent by the client.
+
+    Returns:
+        CommonPYDBException: Error to raise.
+    """
+    return CommonPYDBException(
+        code=codes.INVALID_QUERY,
+        message=err_msg.INVALID_OPERATOR_VALUE.format(operator=operator),
+        ref_data={operator: value},
+    )
+
+
+def _rank(key, condition):
+    """
+    Estimate how selective a query entry is (lower is more selective).
+
+    Args:
+        key (str): Field name or top-level logical operator.
+        condition: Field condition or logical operand.
+
+    Returns:
+        int: Rank of the entry's most selective operator.
+    """
+    if key == "$and" and isinstance(condition, list):
+        return min(
+            (
+                _rank(*item)
+                for sub in condition
+                if isinstance(sub, dict)
+                for item in sub.items()
+            ),
+            default=0,
+        )
+
+    if key in LOGICAL_OPERATORS:
+        return OPERATOR_RANK["$not"]
+
+    if not isinstance(condition, dict):
+        return OPERATOR_RANK["$eq"]
+
+    return min(
+        (OPERATOR_RANK.get(op, len(OPERATOR_RANK)) for op in condition),
+        default=len(OPERATOR_RANK),
+    )
+
+
+def _membership(cond_val):
+    """
+    Build a membership test for `$in` / `$nin`.
+
+    Lists are turned into a frozenset for O(1) lookups; the original sequence
+    is kept for unhashable row values (lists, dicts) and for lists holding
+    unhashable items.
+
+    Args:
+        cond_val: Values of the `$in` / `$nin` condition.
+
+    Returns:
+        callable: Function telling whether a value is one of `cond_val`.
+    """
+    if isinstance(cond_val, (list, tuple, set, frozenset)):
+        fallback = tuple(cond_val)
+        try:
+            members = frozenset(fallback)
+        except TypeError:
+            return fallback.__contains__
+
+        def contains(value):
+            try:
+                return value in members
+            except TypeError:
+                return value in fallback
+
+        return contains
+
+    return lambda value: value in cond_val
+
+
+def _compile_regex(pattern, options):
+    """
+    Precompile the pattern of a `$regex` condition.
+
+    Args:
+        pattern (str): Regular expression.
+        options (str): Flags among `i`, `m`, `s` and `x`.
+
+    Returns:
+        re.Pattern: Compiled pattern.
+
+    Raises:
+        CommonPYDBException: If the pattern or the options are invalid.
+    """
+    if not isinstance(pattern, str):
+        raise _invalid("$regex", pattern)
+
+    if not isinstance(options, str) or any(
+        flag not in REGEX_FLAGS for flag in options
+    ):
+        raise _invalid("$options", options)
+
+    flags = 0
+    for flag in options:
+        flags |= REGEX_FLAGS[flag]
+
+    try:
+        return re.compile(pattern, flags)
+    except re.error:
+        raise _invalid("$regex", pattern) from None
+
+
+def _compile_operator(op, cond_val, options=""):
+    """
+    Compile a single operator into a predicate over a field value.
+
+    Args:
+        op (str): Operator name (e.g. `$gt`).
+        cond_val: Operand of the operator.
+        options (str, optional): `$options` given next to a `$regex`.
+
+    Returns:
+        tuple: Predicate taking the field value (or `_MISSING`), and whether
+            the field must be present for the predicate to hold.
+
+    Raises:
+        CommonPYDBException: If the operator is not supported or malformed.
+    """
+    if op == "$eq":
+        return (lambda value: value == cond_val), True
+    if op == "$ne":
+        return (lambda value: value != cond_val), True
+    if op == "$gt":
+        return (lambda value: value > cond_val), True
+    if op == "$gte":
+        return (lambda value: value >= cond_val), True
+    if op == "$lt":
+        return (lambda value: value < cond_val), True
+    if op == "$lte":
+        return (lambda value: value <= cond_val), True
+    if op == "$in":
+        return _membership(cond_val), True
+    if op == "$nin":
+        contains = _membership(cond_val)
+        return (lambda value: not contains(value)), True
+
+    if op == "$prefix":
+        if not isinstance(cond_val, str):
+            raise _invalid(op, cond_val)
+        return (
+            lambda value: isinstance(value, str) and value.startswith(cond_val)
+        ), True
+
+    if op == "$regex":
+        search = _compile_regex(cond_val, options).search
+        return (
+            lambda value: isinstance(value, str) and search(value) is not None
+        ), True
+
+    if op == "$exists":
+        if not isinstance(cond_val, bool):
+            raise _invalid(op, cond_val)
+        return (lambda value: (value is not _MISSING) is cond_val), False
+
+    if op == "$not":
+        inner, inner_needs_value = _compile_condition(cond_val)
+
+        def negate(value):
+            if value is _MISSING and inner_needs_value:
+                return True
+            return not inner(value)
+
+        return negate, False
+
+    raise CommonPYDBException(
+        code=codes.INVALID_QUERY,
+        message=err_msg.UNSUPPORTED_OPERATOR.format(operator=op),
+        ref_data={op: cond_val},
+    )
+
+
+def _compile_condition(condition):
+    """
+    Compile a field condition into a predicate over the field value.
+
+    A dict condition is an AND of operators, checked most selective first and
+    stopping at the first one that fails; any other value is an equality.
+
+    Args:
+        condition (dict or value): Field condition.
+
+    Returns:
+        tuple: Predicate taking the field value (or `_MISSING`), and whether
+            the field must be present for the condition to hold.
+    """
+    if not isinstance(condition, dict):
+        return (lambda value: value == condition), True
+
+    options = condition.get("$options", "")
+    if "$options" in condition and "$regex" not in condition:
+        raise _invalid("$options", options)
+
+    compiled = [
+        _compile_operator(op, cond_val, options)
+        for op, cond_val in sorted(
+            condition.items(), key=lambda item: OPERATOR_RANK.get(item[0], 0)
+        )
+        if op != "$options"
+    ]
+
+    needs_value = any(op_needs_value for _, op_needs_value in compiled)
+    checks = [check for check, _ in compiled]
+
+    if len(checks) == 1:
+        return checks[0], needs_value
+
+    def check_all(value):
+        for check in checks:
+            if not check(value):
+                return False
+        return True
+
+    return check_all, needs_value
+
+
+def compile_condition(condition):
+    """
+    Compile a field condition into a predicate over a present field value.
+
+    Args:
+        condition (dict or value): Field condition.
+
+    Returns:
+        callable: Predicate taking the field value.
+
+    Raises:
+        CommonPYDBException: If the condition is malformed.
+    """
+    return _compile_condition(condition)[0]
+
+
+def _compile_logical(op, operand):
+    """
+    Compile a top-level `$and`, `$or` or `$not` into a row predicate.
+
+    `$and` stops at the first sub-query that fails and `$or` at the first
+    one that matches.
+
+    Args:
+        op (str): Logical operator.
+        operand: List of sub-queries (`$and`, `$or`) or a sub-query (`$not`).
+
+    Returns:
+        callable: Predicate taking a row.
+
+    Raises:
+        CommonPYDBException: If the operand is malformed.
+    """
+    if op == "$not":
+        if not isinstance(operand, dict):
+            raise _invalid(op, operand)
+
+        inner = _compile(operand)
+        return lambda row: not inner(row)
+
+    if not (
+        isinstance(operand, list)
+        and operand
+        and all(isinstance(sub, dict) for sub in operand)
+    ):
+        raise _invalid(op, operand)
+
+    if op == "$and":
+        return _compile(_merge(operand))
+
+    branches = [_compile(sub) for sub in operand]
+
+    def any_branch(row):
+        for branch in branches:
+            if branch(row):
+                return True
+        return False
+
+    return any_branch
+
+
+def _merge(queries):
+    """
+    Flatten the sub-queries of an `$and` into a single plan input.
+
+    A field queried by several sub-queries keeps one entry per sub-query, so
+    no condition is lost.
+
+    Args:
+        queries (list): Sub-queries.
+
+    Returns:
+        list: `(key, condition)` entries.
+    """
+    entries = []
+    for sub in queries:
+        entries.extend(sub.items())
+    return entries
+
+
+def _compile(query):
+    """
+    Compile a query into a row predicate.
+
+    Args:
+        query (dict or list): Query filters, or `(key, condition)` entries.
+
+    Returns:
+        callable: Predicate taking a row.
+
+    Raises:
+        CommonPYDBException: If the query is malformed.
+    """
+    entries = query.items() if isinstance(query, dict) else query
+    if not entries:
+        return lambda row: True
+
+    plan = []
+    for key, condition in sorted(entries, key=lambda item: _rank(*item)):
+        if key in LOGICAL_OPERATORS:
+            plan.append((None, _compile_logical(key, condition), False))
+        else:
+            check, needs_value = _compile_condition(condition)
+            plan.append((key, check, needs_value))
+
+    def matches(row):
+        for field, check, needs_value in plan:
+            if field is None:
+                if not check(row):
+                    return False
+                continue
+
+            value = row.get(field, _MISSING)
+            if value is _MISSING:
+                if needs_value or not check(value):
+                    return False
+            elif not check(value):
+                return False
+        return True
+
+    return matches
+
+
+@lru_cache(maxsize=256)
+def _compile_cached(query_text):
+    """
+    Compile a query given as canonical JSON, caching the plan.
+
+    Args:
+        query_text (str): Query encoded with sorted keys.
+
+    Returns:
+        callable: Predicate taking a row.
+    """
+    return _compile(json.loads(query_text))
+
+
+def compile_query(query):
+    """
+    Compile a query into a predicate telling whether a row matches it.
+
+    Top-level entries are field conditions, all of which must hold, and the
+    logical operators `$and` / `$or` (lists of sub-queries) and `$not` (a
+    sub-query). A field condition is a value (equality) or a dict of
+    operators: `$eq`, `$ne`, `$gt`, `$gte`, `$lt`, `$lte`, `$in`, `$nin`,
+    `$prefix`, `$regex` (with optional `$options`), `$exists` and `$not`.
+    A missing field only satisfies `$exists: false` and `$not`.
+
+    Plans are cached by the normalized query text, so repeated queries are
+    only compiled once.
+
+    Args:
+        query (dict): Query filters.
+
+    Returns:
+        callable: Predicate taking a row.
+
+    Raises:
+        CommonPYDBException: If the query uses an unsupported or malformed operator.
+    """
+    if query is not None and not isinstance(query, dict):
+        raise CommonPYDBException(
+            code=codes.INVALID_QUERY,
+            message=err_msg.INVALID_QUERY,
+            ref_data={"query": query},
+        )
+
+    try:
+        query_text = json.dumps(query, sort_keys=True)
+    except (TypeError, ValueError):
+        return _compile(query)
+
+    return _compile_cached(query_text)
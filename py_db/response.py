@@ -2,7 +2,8 @@
 Defines the Response class used to generate standardized JSON responses
 for communication between the database server and client.
 
-Each response includes an action type and an associated payload.
+Each response includes an action type and an associated payload, plus the
+`request_id` of the action it answers when the client sent one.
 """
 
 import json
@@ -15,18 +16,47 @@ class Response:
     Attributes:
         act_type (str): The type of action (e.g., CREATE, SELECT, ERROR).
         resp_payload (Any): The response data or message to include.
+        request_id (Any): Id of the request being answered, echoed back to
+            the client so pipelined responses can be matched.
     """
 
-    def __init__(self, act_type, resp_payload):
+    def __init__(self, act_type, resp_payload, request_id=None):
         """
         Initialize the Response object.
 
         Args:
             act_type (str): The type of action or result.
             resp_payload (Any): The payload or content of the response.
+            request_id (Any, optional): Id of the request being answered.
         """
         self.act_type = act_type
         self.resp_payload = resp_payload
+        self.request_id = request_id
+
+    def _envelope(self, payload, **extra):
+        """
+        Build the response object sent to the client.
+
+        Args:
+            payload (Any): Payload to send.
+            **extra: Additional keys (e.g. stream frame markers).
+
+        Returns:
+            dict: Response object.
+        """
+        response = {"action_type": self.act_type, "payload": payload, **extra}
+        if self.request_id is not None:
+            response["request_id"] = self.request_id
+        return response
+
+    def to_dict(self):
+        """
+        Return the response as a JSON-serializable dict.
+
+        Returns:
+            dict: Response object.
+        """
+        return self._envelope(self.resp_payload)
 
     def generate(self):
         """
@@ -35,4 +65,87 @@ class Response:
         Returns:
             str: JSON-formatted response string.
         """
-        return json.dumps({"action_type": self.act_type, "payload": self.resp_payload})
+        return json.dumps(self.to_dict())
+
+
+class StreamResponse(Response):
+    """
+    Response whose payload is a (possibly large) iterator of rows, sent to the
+    client as a sequence of frames instead of a single JSON document.
+
+    Each frame is a regular response object (with the `request_id`, if any)
+    with two extra keys: `chunk` (0-based frame number) and `more` (False on
+    the last frame). The payload of
+    each frame holds at most `chunk_size` rows, so only one chunk is kept in
+    memory at a time.
+
+    Attributes:
+        act_type (str): The type of action (e.g., SELECT).
+        resp_payload (Iterator): Rows to send.
+        chunk_size (int): Maximum number of rows per frame.
+    """
+
+    def __init__(self, act_type, resp_payload, chunk_size=1000, request_id=None):
+        """
+        Initialize the StreamResponse object.
+
+        Args:
+            act_type (str): The type of action or result.
+            resp_payload (Iterator): Rows to send.
+            chunk_size (int): Maximum number of rows per frame.
+            request_id (Any, optional): Id of the request being answered.
+        """
+        super().__init__(act_type, resp_payload, request_id)
+        self.chunk_size = max(1, chunk_size)
+
+    def _chunks(self):
+        """
+        Group the payload rows into lists of at most `chunk_size` rows.
+
+        Yields:
+            list: Rows of one frame.
+        """
+        chunk = []
+        for row in self.resp_payload:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+
+        if chunk:
+            yield chunk
+
+    def generate_chunks(self):
+        """
+        Generate the JSON string of each frame of the response.
+
+        The next chunk is always read ahead so the `more` flag of the current
+        frame is known; an empty result still produces one (empty) frame.
+
+        Yields:
+            str: JSON-formatted frame.
+        """
+        chunks = self._chunks()
+        current = next(chunks, [])
+        number = 0
+
+        while True:
+            following = next(chunks, None)
+            yield json.dumps(
+                self._envelope(current, chunk=number, more=following is not None)
+            )
+
+            if following is None:
+                return
+
+            current = following
+            number += 1
+
+    def to_dict(self):
+        """
+        Return the whole response, with every row, as a JSON-serializable dict.
+
+        Returns:
+            dict: Response object.
+        """
+        return self._envelope(list(self.resp_payload))
@@ -0,0 +1,168 @@
+"""
+# File: result_cache.py
+# Description: Cache of SELECT results keyed by the normalized query. Every
+# table has a version counter bumped by each write, and a result is only
+# served while the version it was computed at is still the current one.
+"""
+
+import json
+import time
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    Least-recently-used cache of SELECT results, bounded in size and age.
+
+    A result is keyed by its table and the normalized options of the SELECT
+    (query with sorted keys, projection, limit, skip and sort). It is stored
+    with the version of its table at the time it was computed; any write to
+    the table bumps the version, so stale results are never served. Entries
+    also expire `ttl` seconds after being stored.
+
+    Attributes:
+        ttl (float): Seconds a result stays valid.
+        max_entries (int): Number of results kept.
+        max_rows (int): Largest result (in rows) worth caching.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups that had to run the query.
+    """
+
+    def __init__(self, ttl=30.0, max_entries=1024, max_rows=1000):
+        """
+        Initialize an empty cache.
+
+        Args:
+            ttl (float): Seconds a result stays valid.
+            max_entries (int): Number of results kept.
+            max_rows (int): Largest result (in rows) worth caching.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(table_path, query, fields=None, limit=None, skip=0, sort=None):
+        """
+        Build the cache key of a SELECT.
+
+        Args:
+            table_path (str): Path to the table data file.
+            query (dict): Query filters.
+            fields (list, optional): Projection.
+            limit (int, optional): Maximum number of rows.
+            skip (int, optional): Number of rows skipped.
+            sort (list, optional): Ordering.
+
+        Returns:
+            tuple: Hashable key; equal for queries differing only in key order.
+        """
+        return (
+            table_path,
+            json.dumps(query, sort_keys=True),
+            json.dumps(fields),
+            limit,
+            skip or 0,
+            json.dumps(sort),
+        )
+
+    def version(self, table_path):
+        """
+        Return the current version of a table.
+
+        Args:
+            table_path (str): Path to the table data file.
+
+        Returns:
+            int: Version counter of the table.
+        """
+        return self._versions.get(table_path, 0)
+
+    def bump(self, table_path):
+        """
+        Record a write to a table, making its cached results stale. The
+        caller must hold the table lock in write mode.
+
+        Args:
+            table_path (str): Path to the table data file.
+        """
+        with self._lock:
+            self._versions[table_path] = self._versions.get(table_path, 0) + 1
+
+    def get(self, key):
+        """
+        Look up a result.
+
+        Args:
+            key (tuple): Key built by `make_key`.
+
+        Returns:
+            list or None: Cached rows, or None on a miss.
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None:
+                version, expires_at, rows = entry
+                if version == self._versions.get(key[0], 0) and expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return rows
+
+                del self._entries[key]
+
+            self.misses += 1
+
+        return None
+
+    def put(self, key, version, rows):
+        """
+        Store a result, evicting the least recently used ones past `max_entries`.
+
+        Args:
+            key (tuple): Key built by `make_key`.
+            version (int): Table version read before the query ran.
+            rows (list): Result rows.
+        """
+        if len(rows) > self.max_rows:
+            return
+
+        with self._lock:
+            if version != self._versions.get(key[0], 0):
+                return
+
+            self._entries[key] = (version, time.monotonic() + self.ttl, rows)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """
+        Describe the cache usage.
+
+        Returns:
+            dict: Hits, misses, hit ratio and number of entries, with the
+                configured bounds.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "max_rows": self.max_rows,
+                "ttl": self.ttl,
+            }
@@ -4,17 +4,24 @@ based on user-defined table definitions.
 
 This module provides methods to:
 - Load a schema class dynamically
+- Generate the field specs of the fast-path validator (see `validator.py`)
+- Cache schema classes, instances and validators per table (`SchemaRegistry`)
 - Remove schema files
 - Generate Marshmallow field definitions with validations
 - Write schema classes to Python files at runtime
 """
 
 import os
+import sys
+import threading
 import marshmallow
-from importlib import import_module
+from importlib import import_module, invalidate_caches
 
 from exc import TableSchemaNotExist
 
+from ..singleton import SingletonMeta
+from .validator import compile_fast_validator
+
 
 class Schema:
     """
@@ -47,12 +54,25 @@ class Schema:
         """
         try:
             return getattr(
-                import_module(self.import_path.format(database=database, table=table)),
+                import_module(self.get_module_name(database, table)),
                 table.title(),
             )
         except ImportError as exe:
             raise TableSchemaNotExist(table) from exe
 
+    def get_module_name(self, database, table):
+        """
+        Return the import path of the schema module of a table.
+
+        Args:
+            database (str): Name of the database.
+            table (str): Name of the table.
+
+        Returns:
+            str: Dotted module path.
+        """
+        return self.import_path.format(database=database, table=table)
+
     def remove(self, database, table):
         """
         Delete the schema file for a specific table.
@@ -141,22 +161,55 @@ class Schema:
 
     def generate_validators(self, schema_def):
         """
-        Generate code for the `get_unique` method based on schema uniqueness constraints.
+        Generate code for the `get_unique` and `get_index` methods based on
+        schema uniqueness and index constraints.
 
         Args:
             schema_def (dict): Schema field definitions.
 
         Returns:
-            list[str]: Lines of Python code defining the get_unique method.
+            list[str]: Lines of Python code defining the get_unique and get_index methods.
         """
         lines = []
         unique_fields = []
+        index_fields = []
         for field_name, spec in schema_def.items():
             if spec.get("unique", False):
                 unique_fields.append(f"'{field_name}'")
+            if spec.get("index", False):
+                index_fields.append(f"'{field_name}'")
         lines.append(f"    def get_unique(self):")
         lines.append(f"        return [{', '.join(unique_fields)}]")
+        lines.append("")
+        lines.append(f"    def get_index(self):")
+        lines.append(f"        return [{', '.join(index_fields)}]")
+
+        return lines
+
+    def generate_fast_spec(self, schema_def):
+        """
+        Generate code for the `get_fast_spec` method, which hands the field
+        specs to the fast-path validator.
+
+        Specs are emitted in declaration order (the order Marshmallow dumps
+        fields in); `callable_default` is emitted as the callable itself.
+
+        Args:
+            schema_def (dict): Schema field definitions.
+
+        Returns:
+            list[str]: Lines of Python code defining the get_fast_spec method.
+        """
+        lines = ["    def get_fast_spec(self):", "        return ["]
 
+        for field_name, spec in schema_def.items():
+            items = [
+                f"{key!r}: {value if key == 'callable_default' else repr(value)}"
+                for key, value in spec.items()
+            ]
+            lines.append(f"            ({field_name!r}, {{{', '.join(items)}}}),")
+
+        lines.append("        ]")
         return lines
 
     def write_schema_class_to_file(self, class_name, schema_def, database, table):
@@ -194,8 +247,120 @@ class Schema:
             lines.append("")
             lines.extend(validator_lines)
 
+        lines.append("")
+        lines.extend(self.generate_fast_spec(schema_def))
+
         with open(file_path, "w") as f:
             f.write("\n".join(lines))
 
         with open(self.init_file.format(database=database, table=table), "w") as f:
             f.write("")
+
+
+class SchemaRegistry(metaclass=SingletonMeta):
+    """
+    Per-(database, table) cache of schema classes, reusable schema instances
+    and fast-path validators.
+
+    Loading a schema goes through `import_module` and building a Marshmallow
+    schema is costly, so each table's schema is loaded and instantiated once
+    and reused by every insert, update and read. Entries must be invalidated
+    when a table is created or dropped.
+    """
+
+    def __init__(self):
+        self._schemas = {}
+        self._lock = threading.Lock()
+
+    def _get(self, database, table):
+        """
+        Return the cached `(class, instance, validator)` of a table, loading it
+        if needed.
+
+        Args:
+            database (str): Name of the database.
+            table (str): Name of the table.
+
+        Returns:
+            tuple: Schema class, a reusable instance of it and its fast-path
+                validator (or None).
+
+        Raises:
+            TableSchemaNotExist: If the schema file or class does not exist.
+        """
+        key = (database, table)
+
+        entry = self._schemas.get(key)
+        if entry is None:
+            with self._lock:
+                entry = self._schemas.get(key)
+                if entry is None:
+                    schema_class = Schema().get_schema(database=database, table=table)
+                    schema_obj = schema_class()
+
+                    get_fast_spec = getattr(schema_obj, "get_fast_spec", None)
+                    validator = (
+                        compile_fast_validator(get_fast_spec())
+                        if callable(get_fast_spec)
+                        else None
+                    )
+
+                    entry = self._schemas[key] = (schema_class, schema_obj, validator)
+
+        return entry
+
+    def get_class(self, database, table) -> type[marshmallow.Schema]:
+        """
+        Return the schema class of a table.
+
+        Args:
+            database (str): Name of the database.
+            table (str): Name of the table.
+
+        Returns:
+            Type[marshmallow.Schema]: The schema class for the table.
+        """
+        return self._get(database, table)[0]
+
+    def get_instance(self, database, table) -> marshmallow.Schema:
+        """
+        Return the shared schema instance of a table.
+
+        Args:
+            database (str): Name of the database.
+            table (str): Name of the table.
+
+        Returns:
+            marshmallow.Schema: Reusable schema instance.
+        """
+        return self._get(database, table)[1]
+
+    def get_validator(self, database, table):
+        """
+        Return the fast-path validator of a table.
+
+        Args:
+            database (str): Name of the database.
+            table (str): Name of the table.
+
+        Returns:
+            callable or None: Validator returning the row to store, or None
+                when the table's schema is not supported by the fast path.
+        """
+        return self._get(database, table)[2]
+
+    def invalidate(self, database, table):
+        """
+        Forget the cached schema of a table.
+
+        The schema module is also dropped from `sys.modules`, so a table
+        created again under the same name loads its new schema file.
+
+        Args:
+            database (str): Name of the database.
+            table (str): Name of the table.
+        """
+        with self._lock:
+            self._schemas.pop((database, table), None)
+            sys.modules.pop(Schema().get_module_name(database, table), None)
+            invalidate_caches()
@@ -0,0 +1,305 @@
+"""
+Builds fast-path row validators from the field specs of a CREATE_TABLE
+definition, as returned by the generated `get_fast_spec` schema method.
+
+A fast validator checks and converts a row with plain Python and returns
+exactly what `schema.dump(schema.load(row))` would. Whenever a value is not
+trivially valid (wrong type, out of range, unknown or missing field, ...) it
+returns None instead, and the caller falls back to Marshmallow, which either
+coerces the value or raises the usual validation error. The fast path only
+ever accepts rows Marshmallow accepts, so error messages stay the same.
+"""
+
+import re
+import math
+import uuid
+import datetime
+
+# Keys of a field spec that the fast path understands, per field type.
+SUPPORTED_KEYS = {
+    "str": {"min_length", "max_length", "pattern", "enum"},
+    "int": {"min", "max", "enum"},
+    "float": {"min", "max", "enum"},
+    "bool": set(),
+    "date": set(),
+    "datetime": {"format"},
+    "uuid": set(),
+}
+COMMON_KEYS = {
+    "type",
+    "required",
+    "allow_none",
+    "default",
+    "callable_default",
+    "unique",
+    "index",
+}
+
+# Python type a `default` must have to be stored as is by Marshmallow.
+DEFAULT_TYPES = {"str": (str,), "int": (int,), "float": (float,), "bool": (bool,)}
+
+_MISSING = object()
+
+
+def _check_str(spec):
+    """
+    Build the converter of a `str` field.
+
+    Args:
+        spec (dict): Field spec.
+
+    Returns:
+        callable: Converter returning the stored value, or `_MISSING` if invalid.
+    """
+    min_length = spec.get("min_length", 0)
+    max_length = spec.get("max_length")
+    match = re.compile(spec["pattern"]).match if "pattern" in spec else None
+    choices = spec.get("enum")
+
+    def convert(value):
+        if type(value) is not str:
+            return _MISSING
+        if len(value) < min_length or (
+            max_length is not None and len(value) > max_length
+        ):
+            return _MISSING
+        if match is not None and match(value) is None:
+            return _MISSING
+        if choices is not None and value not in choices:
+            return _MISSING
+        return value
+
+    return convert
+
+
+def _check_number(spec, to_float):
+    """
+    Build the converter of an `int` or `float` field.
+
+    Args:
+        spec (dict): Field spec.
+        to_float (bool): Whether the field is a `float`.
+
+    Returns:
+        callable: Converter returning the stored value, or `_MISSING` if invalid.
+    """
+    minimum = spec.get("min")
+    maximum = spec.get("max")
+    choices = spec.get("enum")
+    accepted = (int, float) if to_float else (int,)
+
+    def convert(value):
+        if type(value) not in accepted:
+            return _MISSING
+        if to_float:
+            try:
+                value = float(value)
+            except OverflowError:
+                return _MISSING
+            if not math.isfinite(value):
+                return _MISSING
+        if minimum is not None and value < minimum:
+            return _MISSING
+        if maximum is not None and value > maximum:
+            return _MISSING
+        if choices is not None and value not in choices:
+            return _MISSING
+        return value
+
+    return convert
+
+
+def _check_bool(spec):
+    """
+    Build the converter of a `bool` field.
+
+    Args:
+        spec (dict): Field spec.
+
+    Returns:
+        callable: Converter returning the stored value, or `_MISSING` if invalid.
+    """
+    return lambda value: value if type(value) is bool else _MISSING
+
+
+def _check_iso(parse):
+    """
+    Build the converter of a `date` or ISO `datetime` field.
+
+    Only strings already in the canonical `isoformat()` form are accepted,
+    since they are stored unchanged.
+
+    Args:
+        parse (callable): `fromisoformat` of `date` or `datetime`.
+
+    Returns:
+        callable: Converter returning the stored value, or `_MISSING` if invalid.
+    """
+
+    def convert(value):
+        if type(value) is not str:
+            return _MISSING
+        try:
+            if parse(value).isoformat() != value:
+                return _MISSING
+        except ValueError:
+            return _MISSING
+        return value
+
+    return convert
+
+
+def _check_uuid(spec):
+    """
+    Build the converter of a `uuid` field.
+
+    Args:
+        spec (dict): Field spec.
+
+    Returns:
+        callable: Converter returning the canonical UUID string, or `_MISSING`.
+    """
+
+    def convert(value):
+        if type(value) is not str:
+            return _MISSING
+        try:
+            return str(uuid.UUID(value))
+        except ValueError:
+            return _MISSING
+
+    return convert
+
+
+def _is_supported(spec):
+    """
+    Check whether the fast path can handle a field spec.
+
+    Args:
+        spec (dict): Field spec.
+
+    Returns:
+        bool: True if the spec only uses supported types and options.
+    """
+    field_type = spec.get("type")
+    if field_type not in SUPPORTED_KEYS:
+        return False
+
+    if set(spec) - COMMON_KEYS - SUPPORTED_KEYS[field_type]:
+        return False
+
+    if field_type == "datetime" and spec.get("format", "iso") != "iso":
+        return False
+
+    if spec.get("default") is not None and (
+        field_type not in DEFAULT_TYPES
+        or type(spec["default"]) not in DEFAULT_TYPES[field_type]
+    ):
+        return False
+
+    if spec.get("callable_default") is not None and field_type != "uuid":
+        return False
+
+    return True
+
+
+def _compile_field(spec):
+    """
+    Build the converter of a field from its spec.
+
+    Args:
+        spec (dict): Supported field spec.
+
+    Returns:
+        callable: Converter returning the stored value, or `_MISSING` if invalid.
+    """
+    field_type = spec["type"]
+
+    if field_type == "str":
+        convert = _check_str(spec)
+    elif field_type in ("int", "float"):
+        convert = _check_number(spec, to_float=field_type == "float")
+    elif field_type == "bool":
+        convert = _check_bool(spec)
+    elif field_type == "date":
+        convert = _check_iso(datetime.date.fromisoformat)
+    elif field_type == "datetime":
+        convert = _check_iso(datetime.datetime.fromisoformat)
+    else:
+        convert = _check_uuid(spec)
+
+    if not spec.get("allow_none", False):
+        return convert
+
+    def convert_or_none(value):
+        return None if value is None else convert(value)
+
+    return convert_or_none
+
+
+def compile_fast_validator(fast_spec):
+    """
+    Build the fast-path validator of a table.
+
+    Args:
+        fast_spec (list): `(field, spec)` pairs in declaration order, as
+            returned by the generated `get_fast_spec` schema method.
+
+    Returns:
+        callable or None: Function taking a row and returning the row to
+            store, or None when Marshmallow must handle it. None is returned
+            instead of a function when a field spec is not supported.
+    """
+    if not fast_spec:
+        return None
+
+    plan = []
+    for field, spec in fast_spec:
+        if not isinstance(spec, dict) or not _is_supported(spec):
+            return None
+
+        try:
+            convert = _compile_field(spec)
+        except re.error:
+            return None
+
+        plan.append(
+            (
+                field,
+                convert,
+                bool(spec.get("required", False)),
+                spec.get("default"),
+                spec.get("callable_default"),
+            )
+        )
+
+    known_fields = frozenset(field for field, *_ in plan)
+
+    def validate(data):
+        if not isinstance(data, dict) or not known_fields.issuperset(data):
+            return None
+
+        row = {}
+        for field, convert, required, default, callable_default in plan:
+            value = data.get(field, _MISSING)
+
+            if value is _MISSING:
+                if callable_default is not None:
+                    value = convert(callable_default())
+                elif default is not None:
+                    value = default
+                elif required:
+                    return None
+                else:
+                    continue
+            else:
+                value = convert(value)
+
+            if value is _MISSING:
+                return None
+
+            row[field] = value
+
+        return row
+
+    return validate
@@ -2,15 +2,21 @@
 # File: server.py
 # Description: A simple threaded TCP server that handles requests from clients.
 # This server listens for incoming connections and processes requests using a request handler.
-# It is designed to handle multiple clients concurrently using threading.
+# It is designed to handle multiple clients concurrently using threading, or
+# on an asyncio event loop when SERVER_MODE is "asyncio".
 """
 
+import asyncio
 import socketserver
 
 from env import environment
 from utils import log_msg, logging
 
+from .storage import Storage
+from .compactor import start_compactor
+from .worker_pool import start_worker_pool
 from .con_mgt import ConnectionHandler
+from .async_server import serve
 
 
 class ThreadedTCPServer(socketserver.ThreadingTCPServer):
@@ -23,8 +29,13 @@ class ThreadedTCPServer(socketserver.ThreadingTCPServer):
 
 def run_server():
     """
-    Run the threaded TCP server.
+    Run the TCP server.
     This function initializes the server and starts listening for incoming connections.
+    The `SERVER_MODE` environment entry selects the threaded server (one
+    thread per connection) or the asyncio one (connections on an event loop,
+    database work in a bounded pool of threads). In both modes the database
+    work runs on a fixed pool of workers, which rejects requests with a
+    "server busy" error when its queue is full.
     It will run until interrupted by a keyboard signal (Ctrl+C).
     It logs the server's status and handles shutdown gracefully.
     """
@@ -33,7 +44,17 @@ def run_server():
         host = environment["HOST"]
         port = environment["PORT"]
 
+        Storage().recover()
+        Storage().load_indexes()
+        start_compactor()
+        worker_pool = start_worker_pool()
+
+        if environment["SERVER_MODE"] == "asyncio":
+            asyncio.run(serve(host, port, worker_pool))
+            return
+
         with ThreadedTCPServer((host, port), ConnectionHandler) as server:
+            server.worker_pool = worker_pool
             log_msg(logging.DEBUG, f"PYDB RUNNING ON: [{host}:{port}]")
             server.serve_forever()
 
@@ -9,8 +9,16 @@ It follows a singleton pattern to ensure consistent state and configuration.
 
 import os
 import json
+import time
+import heapq
+import tempfile
+import threading
+from functools import cmp_to_key
+from contextlib import ExitStack, suppress
+from itertools import islice
 
 from env import environment
+from utils import log_msg, logging
 from exc import (
     DatabaseAlreadyExist,
     TableDoesNotExist,
@@ -18,13 +26,28 @@ from exc import (
     TableAlreadyExist,
     DataIsNotValid,
     UniqueValueFound,
+    TableSchemaNotExist,
     CommonPYDBException,
     err_msg,
     codes,
 )
 
 from .schema_gen import schema
+from .query import compile_query, compile_condition
+from .index import (
+    TableIndex,
+    PrimaryKeyIndex,
+    TOMBSTONE_KEY,
+    index_key,
+    batch_conflict,
+    claim_values,
+)
 from .singleton import SingletonMeta
+from .wal import WriteAheadLog, DURABILITY_MODES
+from .table_cache import TableCache
+from .result_cache import ResultCache
+
+AGGREGATE_OPERATORS = ("$count", "$sum", "$avg", "$min", "$max")
 
 
 class Storage(metaclass=SingletonMeta):
@@ -32,6 +55,12 @@ class Storage(metaclass=SingletonMeta):
     Handles all file-based storage operations for the custom database engine.
     Supports database/table creation, record-level operations, schema validation,
     uniqueness enforcement, and basic query matching.
+
+    Besides the actions, it exposes the building blocks `Transaction` runs its
+    statements with, so both apply the same rules: `validate_row` and
+    `check_updated_row`, `bulk_error` / `bulk_failed`, `matching_rows`,
+    `validate_read_options` and `page_rows`, `parse_aggregates` and
+    `aggregate_rows`, and `append_many` / `wait_durable` for atomic writes.
     """
 
     def __init__(self):
@@ -39,6 +68,28 @@ class Storage(metaclass=SingletonMeta):
         Initialize the storage manager by retrieving the configured data folder path.
         """
         self._data_folder = environment["DATA_FOLDER"]
+        self._indexes = {}
+        self._indexes_lock = threading.Lock()
+        self._wals = {}
+        self._compaction_locks = {}
+
+        cache_config: dict = environment["TABLE_CACHE"]
+        self._table_cache = (
+            TableCache(max_bytes=cache_config.get("MAX_BYTES", 16777216))
+            if cache_config.get("ENABLED", False)
+            else None
+        )
+
+        result_cache_config: dict = environment["RESULT_CACHE"]
+        self._result_cache = (
+            ResultCache(
+                ttl=result_cache_config.get("TTL", 30.0),
+                max_entries=result_cache_config.get("MAX_ENTRIES", 1024),
+                max_rows=result_cache_config.get("MAX_ROWS", 1000),
+            )
+            if result_cache_config.get("ENABLED", False)
+            else None
+        )
 
     def get_table_path(self, database_path, table, schema_path=False):
         """
@@ -55,6 +106,18 @@ class Storage(metaclass=SingletonMeta):
         ext = ".py" if schema_path else ".data"
         return database_path + "/" + table + ext
 
+    def get_index_path(self, table_path):
+        """
+        Construct the path of the primary-key index stored next to a table file.
+
+        Args:
+            table_path (str): Path to the table data file.
+
+        Returns:
+            str: Path to the table's `.idx` file.
+        """
+        return os.path.splitext(table_path)[0] + ".idx"
+
     def is_table_exist(self, database_path, table):
         """
         Check if a table file exists.
@@ -73,6 +136,275 @@ class Storage(metaclass=SingletonMeta):
 
         return False
 
+    def _get_schema_fields(self, table_schema_obj, method):
+        """
+        Call a field-list method (e.g. `get_unique`) on a table schema instance.
+
+        Args:
+            table_schema_obj (marshmallow.Schema): Schema instance of the table.
+            method (str): Name of the generated method to call.
+
+        Returns:
+            list: Field names returned by the method, or an empty list.
+        """
+        fields = getattr(table_schema_obj, method, None)
+        if callable(fields):
+            fields = fields()
+
+        if fields and isinstance(fields, list):
+            return fields
+
+        return []
+
+    def get_unique_fields(self, table_schema_obj):
+        """
+        Return the unique fields declared by a table schema instance.
+
+        Args:
+            table_schema_obj (marshmallow.Schema): Schema instance of the table.
+
+        Returns:
+            list: Names of the unique fields.
+        """
+        return self._get_schema_fields(table_schema_obj, "get_unique")
+
+    def get_indexed_fields(self, table_schema_obj):
+        """
+        Return the fields declared with `"index": true` by a table schema instance.
+
+        Args:
+            table_schema_obj (marshmallow.Schema): Schema instance of the table.
+
+        Returns:
+            list: Names of the indexed fields.
+        """
+        return self._get_schema_fields(table_schema_obj, "get_index")
+
+    def get_table_index(
+        self, database, table, table_path, table_schema_obj, load_values=True
+    ):
+        """
+        Return the indexes of a table, loading them on first use.
+
+        The persisted primary-key index is loaded (and repaired if needed) the
+        first time the table is accessed. The value indexes are only built when
+        `load_values` is set. A table held by the table cache whose data file
+        changed outside the server is re-indexed first. Must not be called
+        while holding the table lock.
+
+        Args:
+            database (str): Database name.
+            table (str): Table name.
+            table_path (str): Path to the table data file.
+            table_schema_obj (marshmallow.Schema): Schema instance of the table.
+            load_values (bool): Whether the value indexes are needed.
+
+        Returns:
+            TableIndex: Indexes of the table.
+        """
+        key = (database, table)
+        table_index = self._indexes.get(key)
+
+        if table_index is None:
+            with self._indexes_lock:
+                table_index = self._indexes.get(key)
+
+                if table_index is None:
+                    locations = PrimaryKeyIndex(
+                        table_path, self.get_index_path(table_path)
+                    )
+                    status = locations.load()
+                    if status != "loaded":
+                        log_msg(
+                            logging.INFO,
+                            f"PK INDEX {status.upper()}: {database}.{table}",
+                        )
+
+                    table_index = TableIndex(
+                        locations,
+                        unique_fields=self.get_unique_fields(table_schema_obj),
+                        indexed_fields=self.get_indexed_fields(table_schema_obj),
+                    )
+                    self._indexes[key] = table_index
+
+        if self._table_cache is not None and self._table_cache.is_stale(table_path):
+            with table_index.lock.write():
+                if self._table_cache.is_stale(table_path):
+                    log_msg(
+                        logging.WARNING,
+                        f"TABLE CHANGED OUTSIDE THE SERVER, RE-INDEXED: {table_path}",
+                    )
+                    table_index.rebuild()
+                    self._table_changed(table_path)
+
+        if load_values and not table_index.values_loaded:
+            with table_index.lock.write():
+                if not table_index.values_loaded:
+                    self._load_index_values(table_path, table_index)
+
+        return table_index
+
+    def _load_index_values(self, table_path, table_index):
+        """
+        Build the value indexes of a table with a single scan of its data file.
+        The caller must hold the table lock in write mode.
+
+        Args:
+            table_path (str): Path to the table data file.
+            table_index (TableIndex): Indexes of the table.
+        """
+        with open(table_path, "rb") as table_file:
+            offset = 0
+            for line in table_file:
+                if line.strip():
+                    json_data = json.loads(line)
+                    if table_index.locations.get(json_data["pk"]) == (
+                        offset,
+                        len(line),
+                    ):
+                        table_index.add_values(json_data)
+                offset += len(line)
+
+        table_index.values_loaded = True
+
+    def get_wal(self, db_path):
+        """
+        Return the write-ahead log of a database, opening it on first use.
+
+        Settings are read from the `WAL` environment entry.
+
+        Args:
+            db_path (str): Path to the database folder.
+
+        Returns:
+            WriteAheadLog: Log of the database.
+        """
+        wal = self._wals.get(db_path)
+        if wal is not None:
+            return wal
+
+        with self._indexes_lock:
+            wal = self._wals.get(db_path)
+            if wal is None:
+                config: dict = environment["WAL"]
+
+                durability = config.get("DURABILITY", "batch")
+                if durability not in DURABILITY_MODES:
+                    log_msg(
+                        logging.WARNING,
+                        f"UNKNOWN WAL DURABILITY {durability!r}, USING 'batch'",
+                    )
+                    durability = "batch"
+
+                wal = WriteAheadLog(
+                    db_path,
+                    durability=durability,
+                    group_commit_delay=config.get("GROUP_COMMIT_DELAY", 0.0),
+                    max_size=config.get("MAX_SIZE", 67108864),
+                )
+                self._wals[db_path] = wal
+
+        return wal
+
+    def recover(self):
+        """
+        Bring every table back to a consistent state after a crash. Meant to
+        be called at server startup, before `load_indexes`.
+
+        The write-ahead log of each database is replayed, then any table
+        still ending with a partially written record is truncated after its
+        last complete one.
+        """
+        if not os.path.exists(self._data_folder):
+            return
+
+        for database in sorted(os.listdir(self._data_folder)):
+            db_path = self.get_db_path(database)
+            if not os.path.isdir(db_path):
+                continue
+
+            replayed = self.get_wal(db_path).replay()
+            if replayed:
+                log_msg(logging.INFO, f"WAL REPLAYED {replayed} APPEND(S): {database}")
+
+            for file_name in sorted(os.listdir(db_path)):
+                if os.path.splitext(file_name)[1] == ".data":
+                    self._truncate_torn_tail(os.path.join(db_path, file_name))
+
+    @staticmethod
+    def _truncate_torn_tail(table_path):
+        """
+        Drop the partially written record at the end of a data file, if any.
+
+        Args:
+            table_path (str): Path to the table data file.
+        """
+        with open(table_path, "r+b") as table_file:
+            end = table_file.seek(0, os.SEEK_END)
+            position = end
+
+            while position > 0:
+                start = max(0, position - 65536)
+                table_file.seek(start)
+                block = table_file.read(position - start)
+
+                newline = block.rfind(b"\n")
+                if newline != -1:
+                    position = start + newline + 1
+                    break
+                position = start
+
+            if position != end:
+                table_file.truncate(position)
+                log_msg(
+                    logging.WARNING,
+                    f"TORN RECORD TRUNCATED: {table_path} ({end - position} bytes)",
+                )
+
+    def load_indexes(self):
+        """
+        Load the primary-key index of every table, repairing or rebuilding the
+        ones that are out of date. Meant to be called at server startup.
+        """
+        if not os.path.exists(self._data_folder):
+            return
+
+        for database in sorted(os.listdir(self._data_folder)):
+            db_path = self.get_db_path(database)
+            if not os.path.isdir(db_path):
+                continue
+
+            for file_name in sorted(os.listdir(db_path)):
+                table, ext = os.path.splitext(file_name)
+                if ext != ".data":
+                    continue
+
+                try:
+                    table_schema_obj = schema.SchemaRegistry().get_instance(
+                        database=database, table=table
+                    )
+                except TableSchemaNotExist:
+                    log_msg(logging.WARNING, f"SCHEMA NOT FOUND: {database}.{table}")
+                    continue
+
+                self.get_table_index(
+                    database,
+                    table,
+                    self.get_table_path(db_path, table),
+                    table_schema_obj,
+                    load_values=False,
+                )
+
+    def drop_table_index(self, database, table):
+        """
+        Forget the in-memory indexes of a table.
+
+        Args:
+            database (str): Database name.
+            table (str): Table name.
+        """
+        self._indexes.pop((database, table), None)
+
     def create_table(self, database: str, table: str, schema_def):
         """
         Create a new table and its schema in a given database.
@@ -101,12 +433,20 @@ class Storage(metaclass=SingletonMeta):
         with open(table_path, "w") as file:
             pass
 
+        self.drop_table_index(database, table)
+        self._table_changed(table_path)
+
+        index_path = self.get_index_path(table_path)
+        if os.path.exists(index_path):
+            os.remove(index_path)
+
         schema.Schema().write_schema_class_to_file(
             class_name=table.title(),
             schema_def=schema_def,
             table=table,
             database=database,
         )
+        schema.SchemaRegistry().invalidate(database=database, table=table)
 
         return table_path
 
@@ -137,32 +477,201 @@ class Storage(metaclass=SingletonMeta):
         if not table_path:
             raise TableDoesNotExist(table)
 
-        table_schema_obj = schema.Schema().get_schema(database=database, table=table)()
+        table_schema_obj = schema.SchemaRegistry().get_instance(
+            database=database, table=table
+        )
 
-        try:
-            data = table_schema_obj.load(data)
-        except Exception as e:
-            raise DataIsNotValid(e.messages) from e
+        data = self.validate_row(database, table, data)
 
-        unique_fields = getattr(table_schema_obj, "get_unique", None)
-        data = table_schema_obj.dump(data)
+        table_index = self.get_table_index(
+            database, table, table_path, table_schema_obj
+        )
 
-        if callable(unique_fields):
-            unique_fields = unique_fields()
+        with table_index.lock.write():
+            conflict = table_index.find_unique_conflict(data)
+            if conflict:
+                raise UniqueValueFound(field=conflict[0], value=conflict[1])
 
-        if unique_fields and isinstance(unique_fields, list):
-            for field in unique_fields:
-                result = self.read(
-                    table=table, database=database, query={field: data[field]}
-                )
-                if result:
-                    raise UniqueValueFound(field=field, value=data[field])
+            (location,), lsn = self._append_rows(table_path, [data])
+            table_index.add(data, location)
 
-        with open(table_path, "a") as file:
-            file.write(json.dumps(data) + "\n")
+        self.wait_durable(table_path, lsn)
 
         return data
 
+    def bulk_insert(self, database, table, rows, continue_on_error=False):
+        """
+        Validate and insert a batch of rows into the specified table.
+
+        Rows are validated as a batch, checked for uniqueness against the
+        table and against the earlier rows of the batch in one pass, then
+        appended with a single write and registered in the indexes at once.
+
+        By default the batch is all-or-nothing: if any row is invalid nothing
+        is written. With `continue_on_error`, the valid rows are inserted and
+        the rejected ones are reported.
+
+        Args:
+            database (str): Database name.
+            table (str): Table name.
+            rows (list): Records to insert.
+            continue_on_error (bool): Insert the valid rows even if some fail.
+
+        Returns:
+            dict: `count` of inserted rows, their `pks` (in batch order) and
+                the `errors` of the rejected rows (with their `index`).
+
+        Raises:
+            CommonPYDBException: If `rows` is not a list of records, or if a
+                row is rejected and `continue_on_error` is False (`ref_data`
+                holds the errors of every rejected row).
+            DatabaseNotExist: If the database doesn't exist.
+            TableDoesNotExist: If the table doesn't exist.
+        """
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise CommonPYDBException(
+                code=codes.INVALID_DATA,
+                message=err_msg.INVALID_BULK_PAYLOAD,
+            )
+
+        db_path = self.is_db_exist(database)
+        if not db_path:
+            raise DatabaseNotExist(database)
+
+        table_path = self.is_table_exist(db_path, table)
+        if not table_path:
+            raise TableDoesNotExist(table)
+
+        table_index = self.get_table_index(
+            database,
+            table,
+            table_path,
+            schema.SchemaRegistry().get_instance(database=database, table=table),
+        )
+
+        valid_rows = []
+        errors = []
+
+        for position, data in enumerate(rows):
+            try:
+                valid_rows.append((position, self.validate_row(database, table, data)))
+            except DataIsNotValid as exc:
+                errors.append(self.bulk_error(position, exc))
+
+        accepted = []
+
+        with table_index.lock.write():
+            batch_values = {field: set() for field in table_index.unique_fields}
+
+            for position, data in valid_rows:
+                conflict = table_index.find_unique_conflict(
+                    data
+                ) or batch_conflict(batch_values, data)
+
+                if conflict:
+                    errors.append(
+                        self.bulk_error(
+                            position,
+                            UniqueValueFound(field=conflict[0], value=conflict[1]),
+                        )
+                    )
+                    continue
+
+                claim_values(batch_values, data)
+                accepted.append(data)
+
+            if errors and not continue_on_error:
+                raise self.bulk_failed(errors)
+
+            if accepted:
+                locations, lsn = self._append_rows(table_path, accepted)
+                table_index.add_many(accepted, locations)
+
+        if accepted:
+            self.wait_durable(table_path, lsn)
+
+        errors.sort(key=lambda error: error["index"])
+
+        return {
+            "count": len(accepted),
+            "pks": [data["pk"] for data in accepted],
+            "errors": errors,
+        }
+
+    @staticmethod
+    def bulk_error(position, exc):
+        """
+        Describe why a row of a bulk insert was rejected.
+
+        Args:
+            position (int): Index of the row in the batch.
+            exc (BaseExc): Error raised for the row.
+
+        Returns:
+            dict: Row index with the error code, message and reference data.
+        """
+        return {
+            "index": position,
+            "code": exc.code,
+            "message": exc.message,
+            "ref_data": exc.ref_data,
+        }
+
+    @staticmethod
+    def bulk_failed(errors):
+        """
+        Build the error raised when an all-or-nothing bulk insert is rejected.
+
+        Args:
+            errors (list): Errors of the rejected rows.
+
+        Returns:
+            CommonPYDBException: Error to raise.
+        """
+        errors.sort(key=lambda error: error["index"])
+
+        return CommonPYDBException(
+            code=codes.INVALID_DATA,
+            message=err_msg.BULK_CREATE_FAILED.format(count=len(errors)),
+            ref_data={"errors": errors},
+        )
+
+    def validate_row(self, database, table, data):
+        """
+        Validate a new row and convert it to the form stored in the data file.
+
+        The table's fast-path validator is tried first; rows it cannot vouch
+        for go through Marshmallow (`load` then `dump`), which coerces them or
+        raises the validation error.
+
+        Args:
+            database (str): Database name.
+            table (str): Table name.
+            data (dict): Record data sent by the client.
+
+        Returns:
+            dict: Row to store.
+
+        Raises:
+            DataIsNotValid: If the data does not match the table schema.
+        """
+        registry = schema.SchemaRegistry()
+
+        validator = registry.get_validator(database=database, table=table)
+        if validator is not None:
+            row = validator(data)
+            if row is not None:
+                return row
+
+        table_schema_obj = registry.get_instance(database=database, table=table)
+
+        try:
+            data = table_schema_obj.load(data)
+        except Exception as e:
+            raise DataIsNotValid(e.messages) from e
+
+        return table_schema_obj.dump(data)
+
     def get_db_path(self, db_name):
         """
         Construct full path to a database folder.
@@ -257,42 +766,15 @@ class Storage(metaclass=SingletonMeta):
         Returns:
             bool: Whether the condition matches.
         """
-        if isinstance(condition, dict):
-            for op, cond_val in condition.items():
-                if op == "$eq":
-                    if value != cond_val:
-                        return False
-                elif op == "$ne":
-                    if value == cond_val:
-                        return False
-                elif op == "$gt":
-                    if value <= cond_val:
-                        return False
-                elif op == "$gte":
-                    if value < cond_val:
-                        return False
-                elif op == "$lt":
-                    if value >= cond_val:
-                        return False
-                elif op == "$lte":
-                    if value > cond_val:
-                        return False
-                elif op == "$in":
-                    if value not in cond_val:
-                        return False
-                elif op == "$nin":
-                    if value in cond_val:
-                        return False
-                else:
-                    raise ValueError(f"Unsupported operator: {op}")
-            return True
-        else:
-            return value == condition
+        return compile_condition(condition)(value)
 
     def query(self, row: dict, query: dict) -> bool:
         """
         Match a row against a query using MongoDB-like filtering.
 
+        The query is compiled into a plan (see `py_db.query`); scans compile
+        it once with `compile_query` rather than calling this per row.
+
         Args:
             row (dict): The row to evaluate.
             query (dict): Query filters.
@@ -300,63 +782,112 @@ class Storage(metaclass=SingletonMeta):
         Returns:
             bool: True if the row matches the query, else False.
         """
-        if not query:
-            return True
-
-        for key, condition in query.items():
-            if key not in row:
-                return False
-
-            if not self.match_condition(row[key], condition):
-                return False
+        return compile_query(query)(row)
 
-        return True
-
-    def read(self, database, table, query):
+    def read(
+        self, database, table, query, limit=None, skip=0, fields=None, sort=None
+    ):
         """
         Read and return all rows from a table that match a query.
 
+        When the result cache is enabled, the result of a previous identical
+        read is returned as long as the table was not written since.
+
         Args:
             database (str): Database name.
             table (str): Table name.
             query (dict): Query filters.
+            limit (int, optional): Maximum number of rows to return.
+            skip (int, optional): Number of matching rows to skip first.
+            fields (list, optional): Keys to keep in each returned row.
+            sort (list, optional): Ordering as `[field, 1 | -1]` pairs.
 
         Returns:
             list: List of matching rows.
+
+        Raises:
+            CommonPYDBException: If `limit` or `skip` is not a non-negative
+                integer, `fields` is not a list of field names or `sort` is
+                malformed.
         """
-        db_path = self.is_db_exist(database)
-        if not db_path:
-            raise DatabaseNotExist(database)
+        if self._result_cache is None:
+            return list(
+                self.stream(
+                    database=database,
+                    table=table,
+                    query=query,
+                    limit=limit,
+                    skip=skip,
+                    fields=fields,
+                    sort=sort,
+                )
+            )
 
-        table_path = self.is_table_exist(db_path, table)
-        if not table_path:
-            raise TableDoesNotExist(table)
+        # Validated before building the key: an unhashable option must not
+        # break the lookup, nor `true` share the cached result of `1`.
+        self.validate_read_options(limit, skip, fields, sort)
+
+        table_path = self.get_table_path(self.get_db_path(database), table)
+        key = ResultCache.make_key(table_path, query, fields, limit, skip, sort)
+
+        rows = self._result_cache.get(key)
+        if rows is None:
+            # Read first: a write racing with the query makes the result stale.
+            version = self._result_cache.version(table_path)
+            rows = list(
+                self.stream(
+                    database=database,
+                    table=table,
+                    query=query,
+                    limit=limit,
+                    skip=skip,
+                    fields=fields,
+                    sort=sort,
+                )
+            )
+            self._result_cache.put(key, version, rows)
 
-        results = []
-        with open(table_path, "r") as table:
-            for line in table.readlines():
-                if not line:
-                    continue
+        return list(rows)
 
-                json_data = json.loads(line)
-                if not self.query(json_data, query):
-                    continue
+    def stream(
+        self, database, table, query, limit=None, skip=0, fields=None, sort=None
+    ):
+        """
+        Lazily iterate over the rows of a table that match a query.
 
-                results.append(json_data)
+        The table and its indexes are resolved immediately, so errors such as a
+        missing table are raised by this call; rows are then read from the
+        data file one at a time as the iterator is consumed. The scan stops as
+        soon as `skip + limit` rows have matched.
 
-        return results
+        With `sort`, rows are ordered server-side: a single-field sort backed
+        by a sorted index walks the index in order, a sort with a limit keeps
+        only the top `skip + limit` rows in a bounded heap, and any other sort
+        orders the matching rows in memory.
 
-    def drop_table(self, database, table):
-        """
-        Remove a table and its associated schema.
+        The rows to read are resolved under the table read lock, so the result
+        is a consistent snapshot of the table: rows written afterwards are not
+        seen, even while the iterator is still being consumed.
 
         Args:
             database (str): Database name.
             table (str): Table name.
+            query (dict): Query filters.
+            limit (int, optional): Maximum number of rows to return.
+            skip (int, optional): Number of matching rows to skip first.
+            fields (list, optional): Keys to keep in each returned row.
+            sort (list, optional): Ordering as `[field, 1 | -1]` pairs.
 
         Returns:
-            bool: True on successful deletion.
+            Iterator[dict]: Matching rows, in file order unless sorted.
+
+        Raises:
+            CommonPYDBException: If `limit` or `skip` is not a non-negative
+                integer, `fields` is not a list of field names or `sort` is
+                malformed.
         """
+        self.validate_read_options(limit, skip, fields, sort)
+
         db_path = self.is_db_exist(database)
         if not db_path:
             raise DatabaseNotExist(database)
@@ -365,29 +896,120 @@ class Storage(metaclass=SingletonMeta):
         if not table_path:
             raise TableDoesNotExist(table)
 
-        os.remove(table_path)
-        schema.Schema().remove(database=database, table=table)
+        table_index = self.get_table_index(
+            database,
+            table,
+            table_path,
+            schema.SchemaRegistry().get_instance(database=database, table=table),
+            load_values=bool(sort) or not TableIndex.is_pk_lookup(query),
+        )
 
-        return True
+        with table_index.lock.read():
+            ordered_pks = self._index_order(table_index, query, sort) if sort else None
+            rows = self.matching_rows(
+                table_path, table_index, query, ordered_pks=ordered_pks
+            )
 
-    def update(self, query, database, table, update_data):
+        return self.page_rows(
+            rows, limit, skip, fields, sort=sort if ordered_pks is None else None
+        )
+
+    def validate_read_options(self, limit=None, skip=0, fields=None, sort=None):
         """
-        Update matching rows with new data.
+        Check the options of a SELECT.
+
+        Args:
+            limit: Maximum number of rows sent by the client.
+            skip: Number of rows to skip sent by the client.
+            fields: Projection sent by the client.
+            sort: Sort spec sent by the client.
+
+        Raises:
+            CommonPYDBException: If `limit` or `skip` is not a non-negative
+                integer, `fields` is not a list of field names or `sort` is
+                malformed.
+        """
+        self._validate_query_option("limit", limit, allow_none=True)
+        self._validate_query_option("skip", skip, allow_none=True)
+        self._validate_projection(fields)
+        self._validate_sort(sort)
+
+    def page_rows(self, rows, limit=None, skip=0, fields=None, sort=None):
+        """
+        Apply the ordering, pagination and projection of a SELECT to the
+        matching rows. With a limit, sorting only keeps the top `skip + limit`
+        rows in a bounded heap.
+
+        Args:
+            rows (Iterator[dict]): Matching rows.
+            limit (int, optional): Maximum number of rows to return.
+            skip (int, optional): Number of rows to skip first.
+            fields (list, optional): Keys to keep in each returned row.
+            sort (list, optional): Ordering to apply, if the rows are not
+                already in result order.
+
+        Returns:
+            Iterator[dict]: Rows of the requested page.
+        """
+        if sort:
+            rows = self._sort_rows(
+                rows, sort, None if limit is None else (skip or 0) + limit
+            )
+
+        if limit is None:
+            rows = islice(rows, skip or 0, None)
+        else:
+            rows = islice(rows, skip or 0, (skip or 0) + limit)
+
+        if fields:
+            return self._project(rows, fields)
+
+        return rows
+
+    def _project(self, rows, fields):
+        """
+        Keep only the requested keys of each row.
+
+        Args:
+            rows (Iterator[dict]): Rows to project.
+            fields (list): Keys to keep; keys missing from a row are left out.
+
+        Yields:
+            dict: Projected rows.
+        """
+        for json_data in rows:
+            yield {field: json_data[field] for field in fields if field in json_data}
+
+    def aggregate(self, database, table, query, aggregates, group_by=None):
+        """
+        Compute aggregates over the rows matching a query in a single pass.
+
+        Rows are streamed from the indexes or the data file exactly as for a
+        SELECT and folded into per-group accumulators, so only one row is
+        decoded at a time whatever the table size.
+
+        `aggregates` maps each output name to one operator and a field:
+        `{"$count": "*"}` counts rows, `{"$count": field}` counts rows where
+        the field is set, `$sum` / `$avg` only consider numbers and
+        `$min` / `$max` ignore missing and None values.
 
         Args:
-            query (dict): Query filter to find target rows.
             database (str): Database name.
             table (str): Table name.
-            update_data (dict): Data to update in matched rows.
+            query (dict): Query filters.
+            aggregates (dict): Output name -> `{operator: field}`.
+            group_by (list, optional): Fields to group the rows by.
 
         Returns:
-            int: Number of rows updated.
+            list: One dict per group (group fields and aggregate values), in
+                order of first appearance; a single dict without `group_by`.
 
         Raises:
-            CommonPYDBException: If trying to update the primary key.
-            UniqueValueFound: If new values violate unique constraints.
-            DataIsNotValid: If updated data fails schema validation.
+            CommonPYDBException: If `aggregates` or `group_by` is malformed.
         """
+        metrics = self.parse_aggregates(aggregates, group_by)
+        group_by = group_by or []
+
         db_path = self.is_db_exist(database)
         if not db_path:
             raise DatabaseNotExist(database)
@@ -396,8 +1018,774 @@ class Storage(metaclass=SingletonMeta):
         if not table_path:
             raise TableDoesNotExist(table)
 
-        if "pk" in update_data:
-            raise CommonPYDBException(
+        table_index = self.get_table_index(
+            database,
+            table,
+            table_path,
+            schema.SchemaRegistry().get_instance(database=database, table=table),
+            load_values=not TableIndex.is_pk_lookup(query),
+        )
+
+        with table_index.lock.read():
+            rows = self.matching_rows(table_path, table_index, query)
+
+        return self.aggregate_rows(rows, metrics, group_by)
+
+    def aggregate_rows(self, rows, metrics, group_by):
+        """
+        Fold rows into per-group accumulators and return the group results.
+
+        Args:
+            rows (Iterator[dict]): Rows to aggregate.
+            metrics (list): Parsed `(name, operator, field)` aggregates.
+            group_by (list): Fields to group the rows by.
+
+        Returns:
+            list: One dict per group, in order of first appearance.
+        """
+        groups = {}
+        if not group_by:
+            groups[()] = self._new_group({}, metrics)
+
+        for json_data in rows:
+            key = tuple(index_key(json_data.get(field)) for field in group_by)
+
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = self._new_group(
+                    {field: json_data.get(field) for field in group_by}, metrics
+                )
+
+            states = group[1]
+            for position, (_, operator, field) in enumerate(metrics):
+                value = json_data.get(field) if field != "*" else True
+                if value is None:
+                    continue
+
+                if operator == "$count":
+                    states[position] += 1
+                elif operator in ("$sum", "$avg"):
+                    if isinstance(value, (int, float)) and not isinstance(
+                        value, bool
+                    ):
+                        states[position][0] += value
+                        states[position][1] += 1
+                else:
+                    current = states[position]
+                    if current is None:
+                        states[position] = value
+                    elif operator == "$min":
+                        if self._sort_value(value) < self._sort_value(current):
+                            states[position] = value
+                    elif self._sort_value(value) > self._sort_value(current):
+                        states[position] = value
+
+        return [
+            self._finish_group(group_values, states, metrics)
+            for group_values, states in groups.values()
+        ]
+
+    @staticmethod
+    def _new_group(group_values, metrics):
+        """
+        Create the accumulators of a new aggregation group.
+
+        Args:
+            group_values (dict): Group-by field values of the group.
+            metrics (list): Parsed `(name, operator, field)` aggregates.
+
+        Returns:
+            tuple: Group values and the list of accumulator states.
+        """
+        states = []
+        for _, operator, _ in metrics:
+            if operator == "$count":
+                states.append(0)
+            elif operator in ("$sum", "$avg"):
+                states.append([0, 0])
+            else:
+                states.append(None)
+
+        return group_values, states
+
+    @staticmethod
+    def _finish_group(group_values, states, metrics):
+        """
+        Turn the accumulators of a group into its result row.
+
+        Args:
+            group_values (dict): Group-by field values of the group.
+            states (list): Accumulator states.
+            metrics (list): Parsed `(name, operator, field)` aggregates.
+
+        Returns:
+            dict: Group values and aggregate results.
+        """
+        result = dict(group_values)
+
+        for (name, operator, _), state in zip(metrics, states):
+            if operator == "$sum":
+                result[name] = state[0]
+            elif operator == "$avg":
+                result[name] = state[0] / state[1] if state[1] else None
+            else:
+                result[name] = state
+
+        return result
+
+    def parse_aggregates(self, aggregates, group_by=None):
+        """
+        Validate the spec of an AGGREGATE.
+
+        Args:
+            aggregates: Output name -> `{operator: field}` mapping sent by the client.
+            group_by: Group-by spec sent by the client.
+
+        Returns:
+            list: `(name, operator, field)` tuples, to pass to `aggregate_rows`.
+
+        Raises:
+            CommonPYDBException: If `aggregates` or `group_by` is malformed.
+        """
+        metrics = self._parse_aggregates(aggregates)
+        self._validate_group_by(group_by)
+
+        return metrics
+
+    def _parse_aggregates(self, aggregates):
+        """
+        Validate an aggregation spec and flatten it.
+
+        Args:
+            aggregates: Output name -> `{operator: field}` mapping sent by the client.
+
+        Returns:
+            list: `(name, operator, field)` tuples, in the order given.
+
+        Raises:
+            CommonPYDBException: If the spec is invalid.
+        """
+        metrics = []
+
+        if isinstance(aggregates, dict) and aggregates:
+            for name, spec in aggregates.items():
+                if not (isinstance(spec, dict) and len(spec) == 1):
+                    break
+
+                (operator, field), = spec.items()
+                if operator not in AGGREGATE_OPERATORS or not isinstance(field, str):
+                    break
+
+                if field == "*" and operator != "$count":
+                    break
+
+                metrics.append((name, operator, field))
+            else:
+                return metrics
+
+        raise CommonPYDBException(
+            code=codes.INVALID_QUERY_OPTION,
+            message=err_msg.INVALID_AGGREGATE,
+            ref_data={"aggregates": aggregates},
+        )
+
+    def _validate_group_by(self, group_by):
+        """
+        Check that a group-by spec is a list of field names.
+
+        Args:
+            group_by: Group-by fields sent by the client.
+
+        Raises:
+            CommonPYDBException: If the spec is invalid.
+        """
+        if group_by is None:
+            return
+
+        if isinstance(group_by, list) and all(isinstance(f, str) for f in group_by):
+            return
+
+        raise CommonPYDBException(
+            code=codes.INVALID_QUERY_OPTION,
+            message=err_msg.INVALID_GROUP_BY,
+            ref_data={"group_by": group_by},
+        )
+
+    def _sort_rows(self, rows, sort, top=None):
+        """
+        Order rows in memory.
+
+        Args:
+            rows (Iterator[dict]): Rows to order.
+            sort (list): Ordering as `[field, 1 | -1]` pairs.
+            top (int, optional): Number of leading rows needed, if bounded.
+
+        Returns:
+            Iterator[dict]: Sorted rows.
+        """
+        key = self._sort_key(sort)
+
+        if top is not None:
+            return iter(heapq.nsmallest(top, rows, key=key))
+
+        return iter(sorted(rows, key=key))
+
+    def _index_order(self, table_index, query, sort):
+        """
+        Return every pk in sort order when a sorted index can replace sorting.
+
+        The index is used for a single-field sort when the query would scan
+        the whole table anyway and every live row holds a value for the field
+        (rows without one are not indexed). The caller must hold the table
+        lock.
+
+        Args:
+            table_index (TableIndex): Indexes of the table.
+            query (dict): Query filters.
+            sort (list): Ordering as `[field, 1 | -1]` pairs.
+
+        Returns:
+            list or None: Ordered pks, or None if the index cannot be used.
+        """
+        if len(sort) != 1:
+            return None
+
+        field, direction = sort[0]
+        sorted_index = table_index.sorted.get(field)
+        if not sorted_index or not table_index.values_loaded:
+            return None
+
+        if table_index.candidates(query) is not None:
+            return None
+
+        if len(sorted_index) != len(table_index.locations):
+            return None
+
+        return sorted_index.pks(reverse=direction == -1)
+
+    @staticmethod
+    def _sort_value(value):
+        """
+        Map a field value to a key comparable across types.
+
+        Missing and None values sort first, then numbers, strings and any
+        other value (compared by its JSON encoding).
+
+        Args:
+            value: Field value.
+
+        Returns:
+            tuple: Comparable key.
+        """
+        if value is None:
+            return (0, 0)
+        if isinstance(value, (int, float)):
+            return (1, value)
+        if isinstance(value, str):
+            return (2, value)
+        return (3, json.dumps(value, sort_keys=True))
+
+    def _sort_key(self, sort):
+        """
+        Build a sort key function for `sorted` / `heapq` from a sort spec.
+
+        Args:
+            sort (list): Ordering as `[field, 1 | -1]` pairs.
+
+        Returns:
+            callable: Key function taking a row.
+        """
+
+        def compare(row_a, row_b):
+            for field, direction in sort:
+                value_a = self._sort_value(row_a.get(field))
+                value_b = self._sort_value(row_b.get(field))
+                if value_a < value_b:
+                    return -direction
+                if value_a > value_b:
+                    return direction
+            return 0
+
+        return cmp_to_key(compare)
+
+    def _validate_sort(self, sort):
+        """
+        Check that a sort spec is a list of `[field, 1 | -1]` pairs.
+
+        Args:
+            sort: Sort spec sent by the client.
+
+        Raises:
+            CommonPYDBException: If the sort spec is invalid.
+        """
+        if sort is None:
+            return
+
+        if isinstance(sort, list) and all(
+            isinstance(pair, list)
+            and len(pair) == 2
+            and isinstance(pair[0], str)
+            and pair[1] in (1, -1)
+            and not isinstance(pair[1], bool)
+            for pair in sort
+        ):
+            return
+
+        raise CommonPYDBException(
+            code=codes.INVALID_QUERY_OPTION,
+            message=err_msg.INVALID_SORT,
+            ref_data={"sort": sort},
+        )
+
+    def _validate_projection(self, fields):
+        """
+        Check that a projection is a list of field names.
+
+        Args:
+            fields: Projection sent by the client.
+
+        Raises:
+            CommonPYDBException: If the projection is invalid.
+        """
+        if fields is None:
+            return
+
+        if isinstance(fields, list) and all(isinstance(f, str) for f in fields):
+            return
+
+        raise CommonPYDBException(
+            code=codes.INVALID_QUERY_OPTION,
+            message=err_msg.INVALID_PROJECTION,
+            ref_data={"fields": fields},
+        )
+
+    def _validate_query_option(self, option, value, allow_none=False):
+        """
+        Check that a pagination option is a non-negative integer.
+
+        Args:
+            option (str): Option name, used in the error message.
+            value: Value sent by the client.
+            allow_none (bool): Whether None (no value) is accepted.
+
+        Raises:
+            CommonPYDBException: If the value is invalid.
+        """
+        if value is None and allow_none:
+            return
+
+        if isinstance(value, int) and not isinstance(value, bool) and value >= 0:
+            return
+
+        raise CommonPYDBException(
+            code=codes.INVALID_QUERY_OPTION,
+            message=err_msg.INVALID_QUERY_OPTION.format(option=option),
+            ref_data={option: value},
+        )
+
+    def matching_rows(self, table_path, table_index, query, ordered_pks=None):
+        """
+        Iterate over the live rows of a table matching a query, in file order.
+
+        Candidate rows are fetched through the indexes when possible,
+        otherwise the whole data file is scanned. Rows whose raw line cannot
+        satisfy the query (see `_raw_filters`) are rejected before being decoded.
+
+        Tables held by the table cache are served from their decoded rows,
+        and a table fitting the cache is loaded into it on first read.
+
+        The caller must hold the table lock during this call only: the rows
+        to read are resolved right away, and the data file, being append-only,
+        can then be read without the lock.
+
+        Args:
+            table_path (str): Path to the table data file.
+            table_index (TableIndex): Indexes of the table.
+            query (dict): Query filters.
+            ordered_pks (list, optional): pks to fetch, in the order rows must
+                be yielded (e.g. the order of a sorted index).
+
+        Returns:
+            Iterator[dict]: Matching rows.
+        """
+        matches = compile_query(query)
+        raw_filters = self._raw_filters(query)
+
+        candidates = table_index.candidates(query)
+        cached = self._cached_rows(table_path, table_index)
+
+        if cached is not None:
+            if ordered_pks is not None:
+                rows = [cached[pk] for pk in ordered_pks if pk in cached]
+            elif candidates is not None:
+                rows = sorted(
+                    (cached[pk] for pk in candidates if pk in cached),
+                    key=lambda json_data: table_index.locations[json_data["pk"]][0],
+                )
+            else:
+                rows = list(cached.values())
+        elif ordered_pks is not None:
+            rows = self._fetch_rows(
+                table_path, table_index, ordered_pks, raw_filters, in_order=True
+            )
+        elif candidates is not None:
+            rows = self._fetch_rows(table_path, table_index, candidates, raw_filters)
+        else:
+            rows = self._scan_rows(table_path, table_index, raw_filters)
+
+        return filter(matches, rows)
+
+    def _cached_rows(self, table_path, table_index):
+        """
+        Return the decoded rows of a table from the table cache, loading
+        them if the table fits. The caller must hold the table lock.
+
+        Args:
+            table_path (str): Path to the table data file.
+            table_index (TableIndex): Indexes of the table.
+
+        Returns:
+            dict or None: pk -> row in file order, or None if the cache is
+                disabled or the table too large for it.
+        """
+        if self._table_cache is None:
+            return None
+
+        cached = self._table_cache.get(table_path)
+        if cached is None and not self._table_cache.is_stale(table_path):
+            cached = self._table_cache.load(table_path, table_index.locations)
+
+        return cached
+
+    def _table_changed(self, table_path):
+        """
+        Forget the cached rows and results of a table that was created,
+        dropped or changed outside the server.
+
+        Args:
+            table_path (str): Path to the table data file.
+        """
+        if self._table_cache is not None:
+            self._table_cache.discard(table_path)
+
+        if self._result_cache is not None:
+            self._result_cache.bump(table_path)
+
+    def result_cache_stats(self):
+        """
+        Describe the usage of the result cache.
+
+        Returns:
+            dict or None: Hits, misses and size of the cache, or None if it
+                is disabled.
+        """
+        if self._result_cache is None:
+            return None
+
+        return self._result_cache.stats()
+
+    def _raw_filters(self, query):
+        """
+        Build byte strings that must appear in the raw line of any matching row.
+
+        A row whose field equals a string holds that string in its line. A
+        line missing one of these needles can be rejected without decoding it.
+        Only string equalities are used: other types have several encodings
+        that compare equal (e.g. `1`, `1.0` and `true`). So do strings that
+        JSON may escape: `json.dumps` writes non-ASCII text as `\\u` escapes,
+        while rows written outside the server may hold it literally. Only
+        printable ASCII strings without quotes or backslashes, which JSON
+        encoders write as is, give a needle. Equalities nested in `$and`
+        count too; `$or` and `$not` branches do not.
+
+        Args:
+            query (dict): Query filters.
+
+        Returns:
+            list[bytes]: Needles to look for in each raw line.
+        """
+        needles = []
+
+        for field, condition in (query or {}).items():
+            if field == "$and" and isinstance(condition, list):
+                for sub_query in condition:
+                    if isinstance(sub_query, dict):
+                        needles.extend(self._raw_filters(sub_query))
+                continue
+
+            if field.startswith("$"):
+                continue
+
+            if isinstance(condition, dict):
+                condition = condition.get("$eq")
+
+            if (
+                isinstance(condition, str)
+                and condition.isascii()
+                and condition.isprintable()
+                and '"' not in condition
+                and "\\" not in condition
+            ):
+                needles.append(f'"{condition}"'.encode())
+
+        return needles
+
+    def _fetch_rows(
+        self, table_path, table_index, pks, raw_filters=(), in_order=False
+    ):
+        """
+        Read the given rows directly from their byte location, in file order.
+        The caller must hold the table lock during this call only.
+
+        Args:
+            table_path (str): Path to the table data file.
+            table_index (TableIndex): Indexes of the table.
+            pks (Iterable): pks of the rows to fetch.
+            raw_filters (list[bytes], optional): Needles every returned line must hold.
+            in_order (bool): Keep the order of `pks` instead of the file order.
+
+        Returns:
+            Iterator[dict]: Decoded rows.
+        """
+        locations = [
+            table_index.locations[pk] for pk in pks if pk in table_index.locations
+        ]
+        if not in_order:
+            locations.sort()
+
+        return self._read_locations(open(table_path, "rb"), locations, raw_filters)
+
+    @staticmethod
+    def _read_locations(table_file, locations, raw_filters):
+        """
+        Decode the records found at the given locations of an open data file.
+
+        Args:
+            table_file (BinaryIO): Data file, closed once read.
+            locations (list): `(offset, length)` of the records, in reading order.
+            raw_filters (list[bytes]): Needles every returned line must hold.
+
+        Yields:
+            dict: Decoded rows.
+        """
+        with table_file:
+            for offset, length in locations:
+                table_file.seek(offset)
+                line = table_file.read(length)
+                if all(needle in line for needle in raw_filters):
+                    yield json.loads(line)
+
+    def _scan_rows(self, table_path, table_index, raw_filters=()):
+        """
+        Iterate over the live rows of a table by scanning its data file.
+
+        Superseded row versions and tombstones are recognised from the row
+        locations and skipped without being decoded. The caller must hold the
+        table lock during this call only.
+
+        Args:
+            table_path (str): Path to the table data file.
+            table_index (TableIndex): Indexes of the table.
+            raw_filters (list[bytes], optional): Needles every returned line must hold.
+
+        Returns:
+            Iterator[dict]: Live rows, in file order.
+        """
+        return self._read_live_lines(
+            open(table_path, "rb"), table_index.offset_pks(), raw_filters
+        )
+
+    @staticmethod
+    def _read_live_lines(table_file, offset_pks, raw_filters):
+        """
+        Decode the live records of an open data file.
+
+        Args:
+            table_file (BinaryIO): Data file, closed once read.
+            offset_pks (dict): Offsets of the live records.
+            raw_filters (list[bytes]): Needles every returned line must hold.
+
+        Yields:
+            dict: Live rows, in file order.
+        """
+        with table_file:
+            offset = 0
+            for line in table_file:
+                if offset in offset_pks and all(
+                    needle in line for needle in raw_filters
+                ):
+                    yield json.loads(line)
+                offset += len(line)
+
+    def _append_rows(self, table_path, rows):
+        """
+        Append encoded records to the end of a table data file in one write.
+        The caller must hold the table lock in write mode.
+
+        The records are first written to the write-ahead log of the database;
+        the write is only durable once `wait_durable` returned for the returned
+        log sequence number.
+
+        Args:
+            table_path (str): Path to the table data file.
+            rows (list): Rows or tombstones to append.
+
+        Returns:
+            tuple: `(offset, length)` of each appended record, and the log
+                sequence number of the write.
+        """
+        (locations,), lsn = self.append_many([(table_path, rows)])
+        return locations, lsn
+
+    def append_many(self, batches):
+        """
+        Append records to several tables of a database as one atomic write:
+        the appends share a single write-ahead log record, so after a crash
+        they are either all replayed or none is. Tables held by the table
+        cache get the records applied to their cached rows, and the cached
+        results of every table written become stale. The caller must hold
+        the lock of every table in write mode.
+
+        Args:
+            batches (list): `(table_path, rows)` pairs, tables of the same database.
+
+        Returns:
+            tuple: The `(offset, length)` of each appended record, per batch,
+                and the log sequence number of the write.
+        """
+        encoded = [
+            (table_path, [(json.dumps(row) + "\n").encode() for row in rows])
+            for table_path, rows in batches
+        ]
+        wal = self.get_wal(os.path.dirname(batches[0][0]))
+
+        if self._table_cache is not None:
+            stamps = [
+                self._table_cache.stamp_of(table_path) for table_path, _ in batches
+            ]
+
+        with wal.writing(), ExitStack() as stack:
+            appends = []
+            for table_path, lines in encoded:
+                table_file = stack.enter_context(open(table_path, "ab"))
+                offset = table_file.seek(0, os.SEEK_END)
+                appends.append((table_file, offset, b"".join(lines)))
+
+            lsn = wal.log(
+                [
+                    (table_path, offset, data)
+                    for (table_path, _), (_, offset, data) in zip(encoded, appends)
+                ]
+            )
+            for table_file, _, data in appends:
+                table_file.write(data)
+
+        if self._table_cache is not None:
+            for (table_path, rows), (_, lines), stamp in zip(batches, encoded, stamps):
+                self._table_cache.apply(
+                    table_path, rows, [len(line) for line in lines], stamp
+                )
+
+        if self._result_cache is not None:
+            for table_path, _ in batches:
+                self._result_cache.bump(table_path)
+
+        wal.checkpoint_if_full()
+
+        all_locations = []
+        for (_, lines), (_, offset, _) in zip(encoded, appends):
+            locations = []
+            for line in lines:
+                locations.append((offset, len(line)))
+                offset += len(line)
+            all_locations.append(locations)
+
+        return all_locations, lsn
+
+    def wait_durable(self, table_path, lsn):
+        """
+        Wait until a write is durable, as required by the WAL durability mode.
+
+        Called once the table lock is released, so concurrent writers can
+        share the same fsync.
+
+        Args:
+            table_path (str): Path to the table data file.
+            lsn (int): Log sequence number returned by `_append_rows`.
+        """
+        self.get_wal(os.path.dirname(table_path)).commit(lsn)
+
+    def drop_table(self, database, table):
+        """
+        Remove a table and its associated schema.
+
+        Args:
+            database (str): Database name.
+            table (str): Table name.
+
+        Returns:
+            bool: True on successful deletion.
+        """
+        db_path = self.is_db_exist(database)
+        if not db_path:
+            raise DatabaseNotExist(database)
+
+        table_path = self.is_table_exist(db_path, table)
+        if not table_path:
+            raise TableDoesNotExist(table)
+
+        os.remove(table_path)
+        # Logged appends would not match a table re-created under this name.
+        self.get_wal(db_path).checkpoint()
+        self._table_changed(table_path)
+        schema.Schema().remove(database=database, table=table)
+        schema.SchemaRegistry().invalidate(database=database, table=table)
+        self.drop_table_index(database, table)
+
+        index_path = self.get_index_path(table_path)
+        if os.path.exists(index_path):
+            os.remove(index_path)
+
+        return True
+
+    def update(self, query, database, table, update_data):
+        """
+        Update matching rows with new data.
+
+        Rows are matched, checked and rewritten under the table write lock, so
+        concurrent updates of the same rows are applied one after the other
+        and none is lost.
+
+        Uniqueness is checked in the same single pass over the matched rows:
+        each new unique value is looked up in the table indexes (ignoring the
+        row's own entry) and in the values already given to the previous rows
+        of the update, so setting a unique field on several rows is rejected.
+        Nothing is written when a row fails.
+
+        Args:
+            query (dict): Query filter to find target rows.
+            database (str): Database name.
+            table (str): Table name.
+            update_data (dict): Data to update in matched rows.
+
+        Returns:
+            int: Number of rows updated.
+
+        Raises:
+            CommonPYDBException: If trying to update the primary key.
+            UniqueValueFound: If new values violate unique constraints.
+            DataIsNotValid: If updated data fails schema validation.
+        """
+        db_path = self.is_db_exist(database)
+        if not db_path:
+            raise DatabaseNotExist(database)
+
+        table_path = self.is_table_exist(db_path, table)
+        if not table_path:
+            raise TableDoesNotExist(table)
+
+        if "pk" in update_data:
+            raise CommonPYDBException(
                 code=codes.UPDATE_NOT_ALLOWED_ON_PK,
                 message=err_msg.UPDATE_NOT_ALLOWED_ON_PK,
                 ref_data={
@@ -407,63 +1795,92 @@ class Storage(metaclass=SingletonMeta):
             )
 
         updated_data_lines = []
+        replaced_rows = []
 
-        TableSchema = schema.Schema().get_schema(database=database, table=table)
-        table_schema = TableSchema()
-
-        unique_fields = getattr(table_schema, "get_unique", [])
-        validate_unique_fields = []
+        table_schema = schema.SchemaRegistry().get_instance(
+            database=database, table=table
+        )
+        validator = schema.SchemaRegistry().get_validator(
+            database=database, table=table
+        )
 
-        if unique_fields and callable(unique_fields):
-            for field in unique_fields():
-                if field in update_data:
-                    validate_unique_fields.append(field)
+        validate_unique_fields = [
+            field
+            for field in self.get_unique_fields(table_schema)
+            if field in update_data
+        ]
+        table_index = self.get_table_index(
+            database,
+            table,
+            table_path,
+            table_schema,
+            load_values=bool(validate_unique_fields)
+            or not TableIndex.is_pk_lookup(query),
+        )
 
-        with open(table_path, "r") as table_file:
-            lines = table_file.readlines()
+        batch_values = {field: set() for field in validate_unique_fields}
+        lsn = None
 
-            for index, line in enumerate(lines):
-                if not line:
-                    continue
+        with table_index.lock.write():
+            for json_data in self.matching_rows(table_path, table_index, query):
+                if validate_unique_fields:
+                    conflict = table_index.find_unique_conflict(
+                        update_data,
+                        fields=validate_unique_fields,
+                        exclude_pk=json_data["pk"],
+                    ) or batch_conflict(batch_values, update_data)
+                    if conflict:
+                        raise UniqueValueFound(field=conflict[0], value=conflict[1])
 
-                json_data = json.loads(line)
-                if not self.query(json_data, query):
-                    continue
+                    claim_values(batch_values, update_data)
 
-                if validate_unique_fields:
-                    for field in validate_unique_fields:
-                        data = self.read(
-                            table=table,
-                            database=database,
-                            query={field: update_data[field]},
-                        )
-                        if data:
-                            for row in data:
-                                if row["pk"] != json_data["pk"]:
-                                    raise UniqueValueFound(
-                                        field=field, value=row[field]
-                                    )
+                old_data = json_data
+                json_data = {**old_data, **update_data}
+                self.check_updated_row(table_schema, validator, json_data)
 
-                json_data.update(update_data)
+                updated_data_lines.append(json_data)
+                replaced_rows.append((old_data, json_data))
 
-                table_schema_obj = schema.Schema().get_schema(
-                    database=database, table=table
-                )()
+            if updated_data_lines:
+                locations, lsn = self._append_rows(table_path, updated_data_lines)
 
-                try:
-                    table_schema_obj.load(json_data, partial=True)
-                except Exception as e:
-                    raise DataIsNotValid(e.messages) from e
+                for old_data, json_data in replaced_rows:
+                    table_index.remove(old_data)
+                    table_index.add(json_data)
 
-                updated_data_lines.append(json_data)
-                lines[index] = json.dumps(json_data) + "\n"
+                table_index.locations.apply(
+                    [
+                        (json_data["pk"], offset, length, False)
+                        for json_data, (offset, length) in zip(
+                            updated_data_lines, locations
+                        )
+                    ]
+                )
 
-        if updated_data_lines:
-            with open(table_path, "w") as table_file:
-                table_file.writelines(lines)
+        if lsn is not None:
+            self.wait_durable(table_path, lsn)
 
         return len(updated_data_lines)
 
+    @staticmethod
+    def check_updated_row(table_schema, validator, json_data):
+        """
+        Validate a row once the new values of an update are merged into it.
+
+        Args:
+            table_schema (marshmallow.Schema): Schema instance of the table.
+            validator (callable or None): Fast-path validator of the table.
+            json_data (dict): Updated row.
+
+        Raises:
+            DataIsNotValid: If the updated row fails schema validation.
+        """
+        if validator is None or validator(json_data) is None:
+            try:
+                table_schema.load(json_data, partial=True)
+            except Exception as e:
+                raise DataIsNotValid(e.messages) from e
+
     def delete(self, database, table, query):
         """
         Delete rows matching a query from the table.
@@ -484,22 +1901,218 @@ class Storage(metaclass=SingletonMeta):
         if not table_path:
             raise TableDoesNotExist(table)
 
-        new_data = []
-        with open(table_path, "r") as table_file:
-            lines = table_file.readlines()
+        table_index = self.get_table_index(
+            database,
+            table,
+            table_path,
+            schema.SchemaRegistry().get_instance(database=database, table=table),
+            load_values=not TableIndex.is_pk_lookup(query),
+        )
+
+        lsn = None
 
-            for line in lines:
-                if not line:
-                    continue
+        with table_index.lock.write():
+            deleted_rows = list(self.matching_rows(table_path, table_index, query))
 
-                json_data = json.loads(line)
-                if self.query(json_data, query):
-                    continue
+            if deleted_rows:
+                tombstones = [
+                    {"pk": json_data["pk"], TOMBSTONE_KEY: True}
+                    for json_data in deleted_rows
+                ]
+                locations, lsn = self._append_rows(table_path, tombstones)
+
+                for json_data in deleted_rows:
+                    table_index.remove(json_data)
+
+                table_index.locations.apply(
+                    [
+                        (json_data["pk"], offset, length, True)
+                        for json_data, (offset, length) in zip(
+                            deleted_rows, locations
+                        )
+                    ]
+                )
+
+            remaining = len(table_index.locations)
+
+        if lsn is not None:
+            self.wait_durable(table_path, lsn)
+
+        return remaining
+
+    def loaded_tables(self):
+        """
+        List the tables whose indexes are currently loaded.
+
+        Returns:
+            list: `(database, table)` pairs.
+        """
+        return list(self._indexes)
+
+    def garbage_stats(self, database, table):
+        """
+        Measure how much of a table data file is taken by dead records.
 
-                new_data.append(line)
+        Args:
+            database (str): Database name.
+            table (str): Table name.
+
+        Returns:
+            tuple: `(file_size, live_bytes)` of the table, or None if its
+            indexes are not loaded.
+        """
+        table_index = self._indexes.get((database, table))
+        if table_index is None:
+            return None
 
-        if new_data:
-            with open(table_path, "w") as table_file:
-                table_file.writelines(new_data)
+        table_path = table_index.locations.data_path
+        with table_index.lock.read():
+            if not os.path.exists(table_path):
+                return None
+            return os.path.getsize(table_path), table_index.locations.live_bytes
+
+    def compact_table(self, database, table):
+        """
+        Rewrite a table data file with only its live rows and swap it in atomically.
+
+        Live rows are copied from a snapshot of the row locations without
+        holding the table lock, so reads and writes keep being served. Records
+        appended meanwhile are then replayed into the new file under the write
+        lock, right before it replaces the old one with `os.replace`. Readers that
+        already opened the old file keep reading it consistently.
+
+        Compactions of the same table (e.g. COMPACT_TABLE and the background
+        compactor) run one after the other, each into its own temporary file.
+
+        Args:
+            database (str): Database name.
+            table (str): Table name.
+
+        Returns:
+            dict: Compaction report with the sizes before and after, the bytes
+            reclaimed and the time taken in seconds.
+
+        Raises:
+            DatabaseNotExist: If the database doesn't exist.
+            TableDoesNotExist: If the table doesn't exist.
+        """
+        db_path = self.is_db_exist(database)
+        if not db_path:
+            raise DatabaseNotExist(database)
+
+        table_path = self.is_table_exist(db_path, table)
+        if not table_path:
+            raise TableDoesNotExist(table)
+
+        with self._compaction_lock(table_path):
+            return self._compact(database, table, db_path, table_path)
+
+    def _compaction_lock(self, table_path):
+        """
+        Return the lock serializing the compactions of a table.
+
+        Args:
+            table_path (str): Path to the table data file.
+
+        Returns:
+            threading.Lock: Compaction lock of the table.
+        """
+        with self._indexes_lock:
+            return self._compaction_locks.setdefault(table_path, threading.Lock())
+
+    def _compact(self, database, table, db_path, table_path):
+        """
+        Compact a table; see `compact_table`. The caller must hold the
+        compaction lock of the table.
+
+        Args:
+            database (str): Database name.
+            table (str): Table name.
+            db_path (str): Path to the database folder.
+            table_path (str): Path to the table data file.
+
+        Returns:
+            dict: Compaction report.
+        """
+        table_index = self.get_table_index(
+            database,
+            table,
+            table_path,
+            schema.SchemaRegistry().get_instance(database=database, table=table),
+            load_values=False,
+        )
+
+        started_at = time.perf_counter()
+
+        with table_index.lock.read():
+            snapshot = sorted(
+                table_index.locations.items(), key=lambda item: item[1][0]
+            )
+            size_before = os.path.getsize(table_path)
+
+        fd, compact_path = tempfile.mkstemp(
+            dir=db_path, prefix=f"{table}.", suffix=".compact"
+        )
+        locations = {}
+        offset = 0
+
+        try:
+            with open(table_path, "rb") as src, os.fdopen(fd, "wb") as dst:
+                os.fchmod(fd, os.fstat(src.fileno()).st_mode & 0o777)
+
+                for pk, (old_offset, length) in snapshot:
+                    src.seek(old_offset)
+                    dst.write(src.read(length))
+                    locations[pk] = (offset, length)
+                    offset += length
+
+                with table_index.lock.write():
+                    src.seek(size_before)
+                    for line in src:
+                        if not line.strip():
+                            continue
+
+                        json_data = json.loads(line)
+                        if json_data.get(TOMBSTONE_KEY):
+                            locations.pop(json_data["pk"], None)
+                            continue
+
+                        dst.write(line)
+                        locations[json_data["pk"]] = (offset, len(line))
+                        offset += len(line)
+
+                    size_before = src.tell()
+                    dst.flush()
+                    os.fsync(dst.fileno())
+
+                    # Logged appends point into the old file: make them obsolete
+                    # before the swap, so a crash right after it never replays
+                    # them into the compacted file.
+                    self.get_wal(db_path).checkpoint()
+
+                    os.replace(compact_path, table_path)
+                    table_index.locations.rewrite(locations, offset)
+                    if self._table_cache is not None:
+                        self._table_cache.restamp(table_path)
+        except BaseException:
+            with suppress(FileNotFoundError):
+                os.remove(compact_path)
+            raise
+
+        report = {
+            "database": database,
+            "table": table,
+            "size_before": size_before,
+            "size_after": offset,
+            "bytes_reclaimed": size_before - offset,
+            "duration": round(time.perf_counter() - started_at, 6),
+        }
+
+        log_msg(
+            logging.INFO,
+            f"COMPACTED {database}.{table}:",
+            f"{report['bytes_reclaimed']} bytes reclaimed",
+            f"in {report['duration']}s",
+        )
 
-        return len(new_data)
+        return report
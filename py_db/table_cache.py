@@ -0,0 +1,279 @@
+"""
+# File: table_cache.py
+# Description: Memory-resident cache of decoded table rows, so reads of small,
+# hot tables skip opening the data file and decoding its lines. Entries are
+# kept up to date by the write paths and checked against the data file's
+# mtime and size, which detects edits made outside the server (the table is
+# then re-indexed before it is cached again).
+"""
+
+import os
+import json
+import threading
+from collections import OrderedDict
+
+from .index import TOMBSTONE_KEY
+
+
+class CachedTable:
+    """
+    Decoded live rows of one table.
+
+    Attributes:
+        rows (dict): pk -> row, in file order of the live row versions.
+        lengths (dict): pk -> length of the row record in the data file.
+        nbytes (int): Total length of the cached records.
+        stamp (tuple): `(mtime_ns, size)` of the data file the rows describe.
+    """
+
+    def __init__(self, stamp):
+        """
+        Initialize an empty entry.
+
+        Args:
+            stamp (tuple): `(mtime_ns, size)` of the data file.
+        """
+        self.rows = {}
+        self.lengths = {}
+        self.nbytes = 0
+        self.stamp = stamp
+
+    def put(self, row, length):
+        """
+        Record the latest version of a row, or its tombstone.
+
+        Args:
+            row (dict): Row or tombstone.
+            length (int): Length of its record in the data file.
+        """
+        pk = row["pk"]
+
+        self.rows.pop(pk, None)
+        self.nbytes -= self.lengths.pop(pk, 0)
+
+        if not row.get(TOMBSTONE_KEY):
+            self.rows[pk] = row
+            self.lengths[pk] = length
+            self.nbytes += length
+
+
+class TableCache:
+    """
+    Least-recently-used cache of decoded table rows, bounded by a memory budget.
+
+    The budget counts the bytes the cached rows take in their data files, a
+    proxy for the memory of the decoded rows. A table whose live rows alone
+    exceed the budget is never cached.
+
+    All methods taking a table path must be called under the table lock: in
+    read mode for `get`, `is_stale` and `load`, in write mode for the others.
+
+    An entry whose data file changed behind the server's back is stale: it
+    is no longer served, but kept until the server re-indexed the table
+    (see `Storage.get_table_index`) and dropped it, since the row locations
+    it would be reloaded from no longer describe the file.
+
+    Attributes:
+        max_bytes (int): Memory budget, in data file bytes.
+    """
+
+    def __init__(self, max_bytes=16777216):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_bytes (int): Memory budget, in data file bytes.
+        """
+        self.max_bytes = max_bytes
+
+        self._tables = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def stamp_of(table_path):
+        """
+        Read the stamp identifying the current content of a data file.
+
+        Args:
+            table_path (str): Path to the table data file.
+
+        Returns:
+            tuple or None: `(mtime_ns, size)`, or None if the file is missing.
+        """
+        try:
+            stat = os.stat(table_path)
+        except FileNotFoundError:
+            return None
+
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, table_path):
+        """
+        Return the cached rows of a table, if cached and still up to date.
+
+        Args:
+            table_path (str): Path to the table data file.
+
+        Returns:
+            dict or None: pk -> row, in file order, or None.
+        """
+        with self._lock:
+            cached = self._tables.get(table_path)
+            if cached is None:
+                return None
+
+        if cached.stamp != self.stamp_of(table_path):
+            return None
+
+        with self._lock:
+            if table_path in self._tables:
+                self._tables.move_to_end(table_path)
+
+        return cached.rows
+
+    def is_stale(self, table_path):
+        """
+        Check whether a table has an entry whose data file changed behind
+        the server's back.
+
+        Args:
+            table_path (str): Path to the table data file.
+
+        Returns:
+            bool: True if the entry is stale.
+        """
+        with self._lock:
+            cached = self._tables.get(table_path)
+
+        return cached is not None and cached.stamp != self.stamp_of(table_path)
+
+    def load(self, table_path, locations):
+        """
+        Decode the live rows of a table into the cache, if they fit the budget.
+        Must not be called for a stale table.
+
+        Args:
+            table_path (str): Path to the table data file.
+            locations (PrimaryKeyIndex): Row locations of the table.
+
+        Returns:
+            dict or None: pk -> row, in file order, or None if the table is
+                too large to be cached.
+        """
+        if locations.live_bytes > self.max_bytes:
+            return None
+
+        stamp = self.stamp_of(table_path)
+        if stamp is None:
+            return None
+
+        cached = CachedTable(stamp)
+        live_offsets = {location[0] for _, location in locations.items()}
+
+        with open(table_path, "rb") as table_file:
+            offset = 0
+            for line in table_file:
+                if offset in live_offsets:
+                    cached.put(json.loads(line), len(line))
+                offset += len(line)
+
+        self._store(table_path, cached)
+
+        return cached.rows
+
+    def apply(self, table_path, rows, lengths, stamp):
+        """
+        Apply appended rows and tombstones to the cached entry of a table.
+
+        Args:
+            table_path (str): Path to the table data file.
+            rows (list): Appended rows and tombstones, in file order.
+            lengths (list): Length of each appended record.
+            stamp (tuple or None): Stamp of the data file before the append;
+                the entry is dropped if it does not describe that file.
+        """
+        with self._lock:
+            cached = self._tables.get(table_path)
+
+        if cached is None:
+            return
+
+        if cached.stamp != stamp:
+            self.discard(table_path)
+            return
+
+        previous = cached.nbytes
+        for row, length in zip(rows, lengths):
+            cached.put(row, length)
+        cached.stamp = self.stamp_of(table_path)
+
+        with self._lock:
+            if self._tables.get(table_path) is cached:
+                self._nbytes += cached.nbytes - previous
+                self._evict(keep=table_path)
+
+    def restamp(self, table_path):
+        """
+        Record that a data file was rewritten without changing its live rows
+        (e.g. by a compaction).
+
+        Args:
+            table_path (str): Path to the table data file.
+        """
+        with self._lock:
+            cached = self._tables.get(table_path)
+
+        if cached is not None:
+            cached.stamp = self.stamp_of(table_path)
+
+    def discard(self, table_path):
+        """
+        Drop the entry of a table.
+
+        Args:
+            table_path (str): Path to the table data file.
+        """
+        with self._lock:
+            cached = self._tables.pop(table_path, None)
+            if cached is not None:
+                self._nbytes -= cached.nbytes
+
+    def _store(self, table_path, cached):
+        """
+        Insert or replace the entry of a table, then evict the least recently
+        used entries until the cache fits its budget.
+
+        Args:
+            table_path (str): Path to the table data file.
+            cached (CachedTable): Entry to store.
+        """
+        with self._lock:
+            previous = self._tables.pop(table_path, None)
+            if previous is not None:
+                self._nbytes -= previous.nbytes
+
+            self._tables[table_path] = cached
+            self._nbytes += cached.nbytes
+            self._evict(keep=table_path)
+
+    def _evict(self, keep):
+        """
+        Evict least recently used entries until the cache fits its budget.
+        The entry just used is only evicted if it does not fit on its own.
+        The caller must hold the cache lock.
+
+        Args:
+            keep (str): Path of the table just used.
+        """
+        while self._nbytes > self.max_bytes and len(self._tables) > 1:
+            table_path, cached = next(iter(self._tables.items()))
+            if table_path == keep:
+                self._tables.move_to_end(table_path)
+                continue
+
+            del self._tables[table_path]
+            self._nbytes -= cached.nbytes
+
+        if self._nbytes > self.max_bytes and keep in self._tables:
+            self._nbytes -= self._tables.pop(keep).nbytes
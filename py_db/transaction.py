@@ -0,0 +1,878 @@
+"""
+# File: transaction.py
+# Description: Multi-statement transactions opened with BEGIN on a connection.
+# The writes of a transaction are buffered in a workspace and applied to the
+# tables in one atomic write at COMMIT; its reads see the database as it was
+# at BEGIN, plus its own writes (snapshot isolation).
+"""
+
+import os
+import json
+from contextlib import ExitStack
+from itertools import chain
+
+from exc import (
+    DatabaseNotExist,
+    TableDoesNotExist,
+    TableSchemaNotExist,
+    UniqueValueFound,
+    DataIsNotValid,
+    CommonPYDBException,
+    err_msg,
+    codes,
+)
+
+from .schema_gen import schema
+from .query import compile_query
+from .index import (
+    TableIndex,
+    TOMBSTONE_KEY,
+    index_key,
+    batch_conflict,
+    claim_values,
+)
+from .storage import Storage
+
+
+class TableSnapshot:
+    """
+    A table data file as it was when a transaction began.
+
+    BEGIN only records the size and inode of the file. It is opened the
+    first time the transaction uses the table, then kept open: later writes
+    are appended past `size`, and a compaction or a DROP_TABLE replaces or
+    unlinks the file without touching the open one, so its first `size`
+    bytes hold the table as of the snapshot. A file replaced before it was
+    opened no longer holds them.
+
+    Attributes:
+        table_path (str): Path to the table data file.
+        table_file (BinaryIO or None): Data file, once opened.
+        size (int): Size of the data file at the snapshot.
+        inode (int): Inode of the data file at the snapshot.
+    """
+
+    def __init__(self, table_path, stat):
+        """
+        Record the state of a table data file.
+
+        Args:
+            table_path (str): Path to the table data file.
+            stat (os.stat_result): Status of the file at the snapshot.
+        """
+        self.table_path = table_path
+        self.table_file = None
+        self.size = stat.st_size
+        self.inode = stat.st_ino
+
+        self._rows = None
+
+    def open(self):
+        """
+        Open the data file of the snapshot, if not open yet. No lock is
+        needed: the file is append-only, so while it is the same file (same
+        inode) its first `size` bytes are the snapshot.
+
+        Returns:
+            bool: False if the file was replaced or removed since the
+                snapshot, whose rows can then no longer be read.
+        """
+        if self.table_file is not None:
+            return True
+
+        try:
+            table_file = open(self.table_path, "rb")
+        except FileNotFoundError:
+            return False
+
+        if os.fstat(table_file.fileno()).st_ino != self.inode:
+            table_file.close()
+            return False
+
+        self.table_file = table_file
+        return True
+
+    def is_current(self):
+        """
+        Check whether the table is still exactly as in the snapshot, in
+        which case its indexes describe the snapshot too. The answer only
+        holds while the caller holds the table lock.
+
+        Returns:
+            bool: True if nothing was written to the table since the snapshot.
+        """
+        try:
+            stat = os.stat(self.table_path)
+        except FileNotFoundError:
+            return False
+
+        return stat.st_ino == self.inode and stat.st_size == self.size
+
+    def rows(self):
+        """
+        Decode the live rows of the snapshot. The file is scanned on the
+        first call only, the snapshot being immutable.
+
+        Returns:
+            dict: pk -> row, in file order of the live row versions.
+        """
+        if self._rows is None:
+            rows = {}
+            offset = 0
+
+            self.table_file.seek(0)
+            for line in self.table_file:
+                if offset >= self.size:
+                    break
+                offset += len(line)
+
+                if not line.strip():
+                    continue
+
+                json_data = json.loads(line)
+                rows.pop(json_data["pk"], None)
+                if not json_data.get(TOMBSTONE_KEY):
+                    rows[json_data["pk"]] = json_data
+
+            self._rows = rows
+
+        return self._rows
+
+    def close(self):
+        """
+        Close the data file, if open.
+        """
+        if self.table_file is not None:
+            self.table_file.close()
+
+
+class Transaction:
+    """
+    A transaction of one connection on one database.
+
+    Exposes the row operations of `Storage` (insert, bulk insert, update,
+    delete, read, stream and aggregate), so `PyDB` runs the actions of a
+    transaction unchanged.
+
+    Isolation: BEGIN records the size and inode of every table of the
+    database while the writes to the database are paused (see
+    `WriteAheadLog.paused`), which gives a single snapshot point, consistent
+    across tables: reads only see that snapshot and the writes of the
+    transaction. BEGIN takes no table lock and opens no file; a table file is
+    opened the first time the transaction uses it. If it was compacted or
+    dropped in between, the snapshot is lost and the transaction fails with
+    `TRANSACTION_CONFLICT`. While a table is untouched since BEGIN its
+    indexes are used as usual; otherwise the snapshot is scanned (once, then
+    kept in memory).
+
+    Writes only go to the workspace: `{table: {pk: [old, new]}}`, where `old`
+    is the row as the transaction first saw it (None for a row it inserted)
+    and `new` the row to write (None for a delete). Uniqueness is checked
+    when each statement runs, and again at COMMIT.
+
+    COMMIT takes the write locks of the written tables, checks that no row
+    written by the transaction was changed by another writer since BEGIN
+    (first committer wins), then appends every row with a single write-ahead
+    log record, so the transaction is applied entirely or not at all, even
+    after a crash.
+
+    Attributes:
+        database (str): Name of the database the transaction runs on.
+    """
+
+    def __init__(self, database):
+        """
+        Begin a transaction by taking a snapshot of the database.
+
+        Args:
+            database (str): Database name.
+
+        Raises:
+            DatabaseNotExist: If the database doesn't exist.
+        """
+        self.database = database
+
+        self._storage = Storage()
+        self._db_path = self._storage.is_db_exist(database)
+        if not self._db_path:
+            raise DatabaseNotExist(database)
+
+        self._snapshots = {}
+        self._workspace = {}
+        # Unique values held by the workspace: table -> field -> key -> pk.
+        self._claimed = {}
+
+        self._take_snapshot()
+
+    def _take_snapshot(self):
+        """
+        Record the state of every table of the database, with the writes to
+        the database paused so that no write is seen only in part.
+        """
+        with self._storage.get_wal(self._db_path).paused():
+            for file_name in sorted(os.listdir(self._db_path)):
+                table, ext = os.path.splitext(file_name)
+                if ext != ".data":
+                    continue
+
+                table_path = os.path.join(self._db_path, file_name)
+                try:
+                    self._snapshots[table] = TableSnapshot(
+                        table_path, os.stat(table_path)
+                    )
+                except FileNotFoundError:
+                    continue
+
+    def _snapshot(self, table):
+        """
+        Return the snapshot of a table, opening its data file the first time
+        the transaction uses the table.
+
+        Args:
+            table (str): Table name.
+
+        Returns:
+            TableSnapshot: Snapshot of the table.
+
+        Raises:
+            TableDoesNotExist: If the table did not exist at BEGIN.
+            CommonPYDBException: If the table file was replaced since BEGIN
+                (`TRANSACTION_CONFLICT`).
+        """
+        snapshot = self._snapshots.get(table)
+        if snapshot is None:
+            raise TableDoesNotExist(table)
+
+        if not snapshot.open():
+            raise self._conflict(table)
+
+        return snapshot
+
+    def _table_index(self, table, load_values=True):
+        """
+        Return the current indexes of a table.
+
+        Args:
+            table (str): Table name.
+            load_values (bool): Whether the value indexes are needed.
+
+        Returns:
+            TableIndex: Indexes of the table.
+        """
+        return self._storage.get_table_index(
+            self.database,
+            table,
+            self._snapshot(table).table_path,
+            schema.SchemaRegistry().get_instance(database=self.database, table=table),
+            load_values=load_values,
+        )
+
+    def _base_rows(self, table, query, matches):
+        """
+        Iterate over the rows of the snapshot of a table matching a query,
+        through the table indexes when the table is unchanged since BEGIN.
+
+        Args:
+            table (str): Table name.
+            query (dict): Query filters.
+            matches (callable): Compiled query.
+
+        Returns:
+            Iterator[dict]: Matching rows of the snapshot.
+        """
+        snapshot = self._snapshot(table)
+
+        if snapshot.is_current():
+            try:
+                table_index = self._table_index(
+                    table, load_values=not TableIndex.is_pk_lookup(query)
+                )
+            except TableSchemaNotExist:
+                table_index = None
+
+            if table_index is not None:
+                with table_index.lock.read():
+                    if snapshot.is_current():
+                        return self._storage.matching_rows(
+                            snapshot.table_path, table_index, query
+                        )
+
+        return filter(matches, snapshot.rows().values())
+
+    def _visible_rows(self, table, query):
+        """
+        Iterate over the rows of a table matching a query, as seen by the
+        transaction: the snapshot with the workspace applied on top.
+
+        Rows written by the transaction come after the others, like rows
+        appended to the data file.
+
+        Args:
+            table (str): Table name.
+            query (dict): Query filters.
+
+        Returns:
+            Iterator[dict]: Matching rows.
+        """
+        matches = compile_query(query)
+        rows = self._base_rows(table, query, matches)
+
+        changes = self._workspace.get(table)
+        if not changes:
+            return rows
+
+        return chain(
+            (row for row in rows if row["pk"] not in changes),
+            (
+                new
+                for _, new in list(changes.values())
+                if new is not None and matches(new)
+            ),
+        )
+
+    def _live_count(self, table):
+        """
+        Count the rows of a table as seen by the transaction.
+
+        Args:
+            table (str): Table name.
+
+        Returns:
+            int: Number of rows.
+        """
+        snapshot = self._snapshot(table)
+        count = None
+
+        if snapshot.is_current():
+            table_index = self._table_index(table, load_values=False)
+            with table_index.lock.read():
+                if snapshot.is_current():
+                    count = len(table_index.locations)
+
+        if count is None:
+            count = len(snapshot.rows())
+
+        for old, new in self._workspace.get(table, {}).values():
+            count += (new is not None) - (old is not None)
+
+        return count
+
+    def _unique_conflict(self, table, table_index, row, fields=None, exclude_pk=None):
+        """
+        Find the first unique value of a row already used by another row,
+        either committed (rows rewritten by the transaction aside) or in the
+        workspace.
+
+        Args:
+            table (str): Table name.
+            table_index (TableIndex): Indexes of the table, values loaded.
+            row (dict): Candidate row values.
+            fields (list, optional): Unique fields to check, defaults to all.
+            exclude_pk (str, optional): pk of the row being updated, if any.
+
+        Returns:
+            tuple or None: `(field, value)` of the conflict, else None.
+        """
+        changes = self._workspace.get(table, {})
+
+        with table_index.lock.read():
+            conflict = table_index.find_unique_conflict(
+                row, fields=fields, exclude_pk=exclude_pk, exclude_pks=changes.keys()
+            )
+        if conflict:
+            return conflict
+
+        claimed = self._claimed.get(table, {})
+        for field in fields or table_index.unique_fields:
+            if field not in row:
+                continue
+
+            owner = claimed.get(field, {}).get(index_key(row[field]))
+            if owner is not None and owner != exclude_pk:
+                return field, row[field]
+
+        return None
+
+    def _write(self, table, table_index, old, new):
+        """
+        Record the new version of a row (None to delete it) in the workspace.
+
+        Args:
+            table (str): Table name.
+            table_index (TableIndex): Indexes of the table.
+            old (dict or None): Row as currently seen by the transaction.
+            new (dict or None): Row to write, None for a delete.
+        """
+        pk = (new or old)["pk"]
+        changes = self._workspace.setdefault(table, {})
+        claimed = self._claimed.setdefault(
+            table, {field: {} for field in table_index.unique_fields}
+        )
+
+        change = changes.get(pk)
+        if change is None:
+            changes[pk] = [old, new]
+        else:
+            if change[1] is not None:
+                for field, values in claimed.items():
+                    if field in change[1]:
+                        values.pop(index_key(change[1][field]), None)
+            change[1] = new
+
+        if new is not None:
+            for field, values in claimed.items():
+                if field in new:
+                    values[index_key(new[field])] = pk
+
+    def insert_data(self, database, table, data):
+        """
+        Validate a row and add it to the workspace.
+
+        Args:
+            database (str): Database name (the transaction's).
+            table (str): Table name.
+            data (dict): Record data to insert.
+
+        Returns:
+            dict: Validated data, as it will be written.
+
+        Raises:
+            TableDoesNotExist: If the table did not exist at BEGIN.
+            DataIsNotValid: If the data does not match the table schema.
+            UniqueValueFound: If a unique value is already used.
+        """
+        self._snapshot(table)
+        data = self._storage.validate_row(self.database, table, data)
+
+        table_index = self._table_index(table)
+        conflict = self._unique_conflict(table, table_index, data)
+        if conflict:
+            raise UniqueValueFound(field=conflict[0], value=conflict[1])
+
+        self._write(table, table_index, None, data)
+
+        return data
+
+    def bulk_insert(self, database, table, rows, continue_on_error=False):
+        """
+        Validate a batch of rows and add them to the workspace, with the
+        same all-or-nothing rules as `Storage.bulk_insert`.
+
+        Args:
+            database (str): Database name (the transaction's).
+            table (str): Table name.
+            rows (list): Records to insert.
+            continue_on_error (bool): Insert the valid rows even if some fail.
+
+        Returns:
+            dict: `count` of inserted rows, their `pks` (in batch order) and
+                the `errors` of the rejected rows (with their `index`).
+
+        Raises:
+            CommonPYDBException: If `rows` is not a list of records, or if a
+                row is rejected and `continue_on_error` is False.
+            TableDoesNotExist: If the table did not exist at BEGIN.
+        """
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise CommonPYDBException(
+                code=codes.INVALID_DATA,
+                message=err_msg.INVALID_BULK_PAYLOAD,
+            )
+
+        self._snapshot(table)
+        table_index = self._table_index(table)
+
+        accepted = []
+        errors = []
+        batch_values = {field: set() for field in table_index.unique_fields}
+
+        for position, data in enumerate(rows):
+            try:
+                data = self._storage.validate_row(self.database, table, data)
+            except DataIsNotValid as exc:
+                errors.append(self._storage.bulk_error(position, exc))
+                continue
+
+            conflict = self._unique_conflict(
+                table, table_index, data
+            ) or batch_conflict(batch_values, data)
+
+            if conflict:
+                errors.append(
+                    self._storage.bulk_error(
+                        position,
+                        UniqueValueFound(field=conflict[0], value=conflict[1]),
+                    )
+                )
+                continue
+
+            claim_values(batch_values, data)
+            accepted.append(data)
+
+        if errors and not continue_on_error:
+            raise self._storage.bulk_failed(errors)
+
+        for data in accepted:
+            self._write(table, table_index, None, data)
+
+        return {
+            "count": len(accepted),
+            "pks": [data["pk"] for data in accepted],
+            "errors": errors,
+        }
+
+    def update(self, query, database, table, update_data):
+        """
+        Add the updated versions of the matching rows to the workspace.
+        Nothing is recorded when a row fails.
+
+        Args:
+            query (dict): Query filter to find target rows.
+            database (str): Database name (the transaction's).
+            table (str): Table name.
+            update_data (dict): Data to update in matched rows.
+
+        Returns:
+            int: Number of rows updated.
+
+        Raises:
+            CommonPYDBException: If trying to update the primary key.
+            UniqueValueFound: If new values violate unique constraints.
+            DataIsNotValid: If updated data fails schema validation.
+        """
+        if "pk" in update_data:
+            raise CommonPYDBException(
+                code=codes.UPDATE_NOT_ALLOWED_ON_PK,
+                message=err_msg.UPDATE_NOT_ALLOWED_ON_PK,
+                ref_data={
+                    "table": table,
+                    "database": self.database,
+                },
+            )
+
+        registry = schema.SchemaRegistry()
+        table_schema = registry.get_instance(database=self.database, table=table)
+        validator = registry.get_validator(database=self.database, table=table)
+
+        table_index = self._table_index(table)
+        validate_unique_fields = [
+            field for field in table_index.unique_fields if field in update_data
+        ]
+        batch_values = {field: set() for field in validate_unique_fields}
+
+        replaced_rows = []
+        for json_data in self._visible_rows(table, query):
+            if validate_unique_fields:
+                conflict = self._unique_conflict(
+                    table,
+                    table_index,
+                    update_data,
+                    fields=validate_unique_fields,
+                    exclude_pk=json_data["pk"],
+                ) or batch_conflict(batch_values, update_data)
+                if conflict:
+                    raise UniqueValueFound(field=conflict[0], value=conflict[1])
+
+                claim_values(batch_values, update_data)
+
+            new_data = {**json_data, **update_data}
+            self._storage.check_updated_row(table_schema, validator, new_data)
+            replaced_rows.append((json_data, new_data))
+
+        for json_data, new_data in replaced_rows:
+            self._write(table, table_index, json_data, new_data)
+
+        return len(replaced_rows)
+
+    def delete(self, database, table, query):
+        """
+        Record the deletion of the matching rows in the workspace.
+
+        Args:
+            database (str): Database name (the transaction's).
+            table (str): Table name.
+            query (dict): Filter to identify rows to delete.
+
+        Returns:
+            int: Number of remaining rows, as seen by the transaction.
+        """
+        table_index = self._table_index(table, load_values=False)
+
+        for json_data in list(self._visible_rows(table, query)):
+            self._write(table, table_index, json_data, None)
+
+        return self._live_count(table)
+
+    def read(
+        self, database, table, query, limit=None, skip=0, fields=None, sort=None
+    ):
+        """
+        Read the rows of a table matching a query, as seen by the transaction.
+
+        Args:
+            database (str): Database name (the transaction's).
+            table (str): Table name.
+            query (dict): Query filters.
+            limit (int, optional): Maximum number of rows to return.
+            skip (int, optional): Number of matching rows to skip first.
+            fields (list, optional): Keys to keep in each returned row.
+            sort (list, optional): Ordering as `[field, 1 | -1]` pairs.
+
+        Returns:
+            list: List of matching rows.
+        """
+        return list(
+            self.stream(
+                database=database,
+                table=table,
+                query=query,
+                limit=limit,
+                skip=skip,
+                fields=fields,
+                sort=sort,
+            )
+        )
+
+    def stream(
+        self, database, table, query, limit=None, skip=0, fields=None, sort=None
+    ):
+        """
+        Lazily iterate over the rows of a table matching a query, as seen by
+        the transaction. Options behave as in `Storage.stream`.
+
+        Args:
+            database (str): Database name (the transaction's).
+            table (str): Table name.
+            query (dict): Query filters.
+            limit (int, optional): Maximum number of rows to return.
+            skip (int, optional): Number of matching rows to skip first.
+            fields (list, optional): Keys to keep in each returned row.
+            sort (list, optional): Ordering as `[field, 1 | -1]` pairs.
+
+        Returns:
+            Iterator[dict]: Matching rows.
+
+        Raises:
+            CommonPYDBException: If an option is malformed.
+        """
+        self._storage.validate_read_options(limit, skip, fields, sort)
+
+        return self._storage.page_rows(
+            self._visible_rows(table, query), limit, skip, fields, sort=sort
+        )
+
+    def aggregate(self, database, table, query, aggregates, group_by=None):
+        """
+        Compute aggregates over the rows matching a query, as seen by the
+        transaction. The spec is the one of `Storage.aggregate`.
+
+        Args:
+            database (str): Database name (the transaction's).
+            table (str): Table name.
+            query (dict): Query filters.
+            aggregates (dict): Output name -> `{operator: field}`.
+            group_by (list, optional): Fields to group the rows by.
+
+        Returns:
+            list: One dict per group with its aggregate values.
+
+        Raises:
+            CommonPYDBException: If `aggregates` or `group_by` is malformed.
+        """
+        metrics = self._storage.parse_aggregates(aggregates, group_by)
+
+        return self._storage.aggregate_rows(
+            self._visible_rows(table, query), metrics, group_by or []
+        )
+
+    def commit(self):
+        """
+        Apply the workspace to the tables atomically, then end the transaction
+        (whatever the outcome).
+
+        Returns:
+            int: Number of rows written (inserted, updated or deleted).
+
+        Raises:
+            CommonPYDBException: If a row written by the transaction was
+                changed by another writer since BEGIN (`TRANSACTION_CONFLICT`).
+            UniqueValueFound: If a unique value was taken meanwhile.
+        """
+        try:
+            return self._apply()
+        finally:
+            self.close()
+
+    def _apply(self):
+        """
+        Check the workspace against the current tables and write it with a
+        single write-ahead log record.
+
+        Returns:
+            int: Number of rows written.
+        """
+        prepared = []
+
+        for table in sorted(self._workspace):
+            changes = [
+                (pk, old, new)
+                for pk, (old, new) in self._workspace[table].items()
+                if old is not None or new is not None
+            ]
+            if not changes:
+                continue
+
+            if not self._storage.is_table_exist(self._db_path, table):
+                raise self._conflict(table)
+
+            prepared.append((table, self._table_index(table), changes))
+
+        if not prepared:
+            return 0
+
+        with ExitStack() as stack:
+            for _, table_index, _ in prepared:
+                stack.enter_context(table_index.lock.write())
+
+            for table, table_index, changes in prepared:
+                self._check_conflicts(table, table_index, changes)
+                self._check_unique(table_index, changes)
+
+            locations, lsn = self._storage.append_many(
+                [
+                    (
+                        self._snapshots[table].table_path,
+                        [
+                            new if new is not None else {"pk": pk, TOMBSTONE_KEY: True}
+                            for pk, _, new in changes
+                        ],
+                    )
+                    for table, _, changes in prepared
+                ]
+            )
+
+            for (_, table_index, changes), table_locations in zip(prepared, locations):
+                for _, old, new in changes:
+                    if old is not None:
+                        table_index.remove(old)
+                    if new is not None and table_index.values_loaded:
+                        table_index.add_values(new)
+
+                table_index.locations.apply(
+                    [
+                        (pk, offset, length, new is None)
+                        for (pk, _, new), (offset, length) in zip(
+                            changes, table_locations
+                        )
+                    ]
+                )
+
+        self._storage.wait_durable(self._snapshots[prepared[0][0]].table_path, lsn)
+
+        return sum(len(changes) for _, _, changes in prepared)
+
+    def _check_conflicts(self, table, table_index, changes):
+        """
+        Check that the rows written by the transaction were not changed by
+        another writer since BEGIN. The caller holds the table write lock.
+
+        While the data file is the snapshot's one, a row is unchanged if its
+        current version lies within the snapshot; after a compaction the
+        current version is compared with the one seen by the transaction.
+
+        Args:
+            table (str): Table name.
+            table_index (TableIndex): Indexes of the table.
+            changes (list): `(pk, old, new)` of the rows written.
+
+        Raises:
+            CommonPYDBException: On the first changed row.
+        """
+        snapshot = self._snapshots[table]
+        try:
+            same_file = os.stat(snapshot.table_path).st_ino == snapshot.inode
+        except FileNotFoundError:
+            raise self._conflict(table) from None
+
+        with open(snapshot.table_path, "rb") as table_file:
+            for pk, old, _ in changes:
+                location = table_index.locations.get(pk)
+
+                if old is None:
+                    if location is not None:
+                        raise self._conflict(table, pk)
+                    continue
+
+                if location is None:
+                    raise self._conflict(table, pk)
+
+                if same_file:
+                    if location[0] >= snapshot.size:
+                        raise self._conflict(table, pk)
+                    continue
+
+                table_file.seek(location[0])
+                if json.loads(table_file.read(location[1])) != old:
+                    raise self._conflict(table, pk)
+
+    def _check_unique(self, table_index, changes):
+        """
+        Check the unique values of the rows written by the transaction
+        against the table and against each other. The caller holds the table
+        write lock.
+
+        Args:
+            table_index (TableIndex): Indexes of the table, values loaded.
+            changes (list): `(pk, old, new)` of the rows written.
+
+        Raises:
+            UniqueValueFound: On the first value already used.
+        """
+        written_pks = {pk for pk, _, _ in changes}
+        batch_values = {field: set() for field in table_index.unique_fields}
+
+        for _, _, new in changes:
+            if new is None:
+                continue
+
+            conflict = table_index.find_unique_conflict(
+                new, exclude_pks=written_pks
+            ) or batch_conflict(batch_values, new)
+            if conflict:
+                raise UniqueValueFound(field=conflict[0], value=conflict[1])
+
+            claim_values(batch_values, new)
+
+    def _conflict(self, table, pk=None):
+        """
+        Build the error raised when COMMIT finds a concurrent change.
+
+        Args:
+            table (str): Table name.
+            pk (str, optional): pk of the changed row.
+
+        Returns:
+            CommonPYDBException: Error to raise.
+        """
+        return CommonPYDBException(
+            code=codes.TRANSACTION_CONFLICT,
+            message=err_msg.TRANSACTION_CONFLICT.format(table=table),
+            ref_data={"table": table, "pk": pk},
+        )
+
+    def rollback(self):
+        """
+        Discard the workspace and end the transaction.
+        """
+        self.close()
+
+    def close(self):
+        """
+        Release the snapshot files and forget the workspace.
+        """
+        for snapshot in self._snapshots.values():
+            snapshot.close()
+
+        self._snapshots = {}
+        self._workspace = {}
+        self._claimed = {}
@@ -0,0 +1,344 @@
+"""
+# File: wal.py
+# Description: Write-ahead log of a database folder. Every append to a table
+# data file is first recorded in `<database>/wal.log`, so a crash in the
+# middle of a write can be repaired at startup by replaying the log.
+"""
+
+import os
+import json
+import time
+import zlib
+import threading
+from contextlib import contextmanager
+
+from utils import log_msg, logging
+
+DURABILITY_MODES = ("none", "batch", "always")
+
+
+class WriteAheadLog:
+    """
+    Write-ahead log shared by the tables of a database.
+
+    Each record holds the bytes appended to one or more tables (several for
+    a transaction commit, which is replayed as a whole) and the offsets they
+    were appended at, so replaying a record is idempotent: bytes already in
+    the table are left alone, missing or torn ones are rewritten.
+
+    Durability modes:
+    - `none`: records are written but never fsynced (protects against
+      process crashes, not against power loss).
+    - `batch`: a write waits until its record is fsynced, and concurrent
+      writers share one fsync (group commit).
+    - `always`: every record is fsynced on its own before the write returns.
+
+    The log is truncated by a checkpoint, which fsyncs the tables written
+    since the previous one; it runs when the log grows past `max_size`.
+
+    Attributes:
+        path (str): Path to the log file.
+        durability (str): Durability mode.
+        group_commit_delay (float): Seconds the fsync leader waits for more
+            records to join the group (`batch` mode).
+        max_size (int): Log size (in bytes) triggering a checkpoint.
+    """
+
+    FILE_NAME = "wal.log"
+
+    def __init__(
+        self, db_path, durability="batch", group_commit_delay=0.0, max_size=67108864
+    ):
+        """
+        Open (or create) the log of a database.
+
+        Args:
+            db_path (str): Path to the database folder.
+            durability (str): One of `DURABILITY_MODES`.
+            group_commit_delay (float): Seconds to gather writers before an fsync.
+            max_size (int): Log size (in bytes) triggering a checkpoint.
+        """
+        self.path = os.path.join(db_path, self.FILE_NAME)
+        self.durability = durability
+        self.group_commit_delay = group_commit_delay
+        self.max_size = max_size
+
+        self._db_path = db_path
+        self._file = open(self.path, "ab")
+        self._size = self._file.tell()
+        self._dirty_tables = set()
+
+        # Guards writes to the log file and the lsn counters.
+        self._lock = threading.Lock()
+        self._written_lsn = 0
+        self._synced_lsn = 0
+
+        self._sync_condition = threading.Condition()
+        self._syncing = False
+
+        self._writers_condition = threading.Condition()
+        self._writers = 0
+        self._paused = False
+
+    @contextmanager
+    def writing(self):
+        """
+        Mark a write in progress (from its record to its table append) for
+        the duration of the block, so a checkpoint never truncates a record
+        whose bytes are not in the table yet.
+        """
+        with self._writers_condition:
+            while self._paused:
+                self._writers_condition.wait()
+            self._writers += 1
+
+        try:
+            yield
+        finally:
+            with self._writers_condition:
+                self._writers -= 1
+                if not self._writers:
+                    self._writers_condition.notify_all()
+
+    def log(self, appends):
+        """
+        Record, as a single record, bytes about to be appended to tables.
+
+        Must be called inside `writing`, before the bytes are appended.
+
+        Args:
+            appends (list): `(table_path, offset, data)` of each append, where
+                `data` holds the appended bytes (encoded JSON lines) and
+                `offset` where they are appended.
+
+        Returns:
+            int: Log sequence number of the record, to pass to `commit`.
+        """
+        with self._lock:
+            lsn = self._written_lsn + 1
+            record = json.dumps(
+                {
+                    "lsn": lsn,
+                    "appends": [
+                        {
+                            "table": os.path.basename(table_path),
+                            "offset": offset,
+                            "crc": zlib.crc32(data),
+                            "data": data.decode(),
+                        }
+                        for table_path, offset, data in appends
+                    ],
+                }
+            )
+            line = (record + "\n").encode()
+
+            self._file.write(line)
+            self._file.flush()
+            if self.durability == "always":
+                os.fsync(self._file.fileno())
+
+            self._size += len(line)
+            self._written_lsn = lsn
+            self._dirty_tables.update(table_path for table_path, _, _ in appends)
+
+        if self.durability == "always":
+            with self._sync_condition:
+                self._synced_lsn = max(self._synced_lsn, lsn)
+
+        return lsn
+
+    def commit(self, lsn):
+        """
+        Wait until a record is durable, as required by the durability mode.
+
+        In `batch` mode the first waiting writer becomes the leader and
+        fsyncs the log for every record written so far; the others wait for
+        that fsync instead of issuing their own.
+
+        Args:
+            lsn (int): Log sequence number returned by `log`.
+        """
+        if self.durability != "batch":
+            return
+
+        with self._sync_condition:
+            while self._synced_lsn < lsn:
+                if self._syncing:
+                    self._sync_condition.wait()
+                    continue
+
+                self._syncing = True
+                self._sync_condition.release()
+                try:
+                    if self.group_commit_delay:
+                        time.sleep(self.group_commit_delay)
+
+                    with self._lock:
+                        target = self._written_lsn
+                        fileno = self._file.fileno()
+                    os.fsync(fileno)
+                finally:
+                    self._sync_condition.acquire()
+                    self._syncing = False
+                    self._sync_condition.notify_all()
+
+                self._synced_lsn = max(self._synced_lsn, target)
+
+    def checkpoint_if_full(self):
+        """
+        Run a checkpoint if the log grew past `max_size`.
+        """
+        if self._size >= self.max_size:
+            self.checkpoint()
+
+    @contextmanager
+    def paused(self):
+        """
+        Wait for the writes in progress and hold new ones for the duration of
+        the block. Every append to the tables of the database goes through
+        `writing`, so meanwhile the tables only hold complete writes (those of
+        a multi-table record included) and do not change.
+        """
+        with self._writers_condition:
+            while self._paused:
+                self._writers_condition.wait()
+
+            self._paused = True
+            while self._writers:
+                self._writers_condition.wait()
+
+        try:
+            yield
+        finally:
+            with self._writers_condition:
+                self._paused = False
+                self._writers_condition.notify_all()
+
+    def checkpoint(self):
+        """
+        Make the tables written since the last checkpoint durable and empty
+        the log. Waits for the writes in progress and holds new ones meanwhile.
+        """
+        with self.paused():
+            with self._lock:
+                for table_path in self._dirty_tables:
+                    try:
+                        with open(table_path, "rb") as table_file:
+                            os.fsync(table_file.fileno())
+                    except FileNotFoundError:
+                        continue
+
+                self._file.seek(0)
+                self._file.truncate()
+                os.fsync(self._file.fileno())
+
+                self._size = 0
+                self._dirty_tables.clear()
+                written_lsn = self._written_lsn
+
+            with self._sync_condition:
+                self._synced_lsn = max(self._synced_lsn, written_lsn)
+                self._sync_condition.notify_all()
+
+    def replay(self):
+        """
+        Reapply the logged appends missing from the tables, then checkpoint.
+
+        Records are checked in order against the table files: bytes already
+        at their offset are skipped, and a table whose last record was torn
+        is truncated to the record offset and the bytes are written again.
+        A record that does not match its table (see `_apply`) is skipped. A
+        trailing record that was only partially written (or fails its
+        checksum) was never committed and is ignored.
+
+        Returns:
+            int: Number of table appends reapplied.
+        """
+        applied = 0
+
+        with open(self.path, "rb") as log_file:
+            for line in log_file:
+                try:
+                    appends = [
+                        (
+                            os.path.join(self._db_path, append["table"]),
+                            append["offset"],
+                            append["data"].encode(),
+                            append["crc"],
+                        )
+                        for append in json.loads(line)["appends"]
+                    ]
+                    if any(zlib.crc32(data) != crc for _, _, data, crc in appends):
+                        raise ValueError("checksum mismatch")
+                except (ValueError, KeyError, TypeError):
+                    log_msg(
+                        logging.WARNING, f"WAL TRUNCATED RECORD IGNORED: {self.path}"
+                    )
+                    break
+
+                for table_path, offset, data, _ in appends:
+                    if self._apply(table_path, offset, data):
+                        applied += 1
+                    self._dirty_tables.add(table_path)
+
+        self.checkpoint()
+
+        return applied
+
+    @staticmethod
+    def _apply(table_path, offset, data):
+        """
+        Write a logged append into its table unless it is already there.
+
+        Only a torn tail is repaired: the table must end within the logged
+        bytes, and the offset must start a record. Any other mismatch means
+        the record describes another version of the file (e.g. one replaced
+        since), so it is skipped rather than overwriting valid rows.
+
+        Args:
+            table_path (str): Path to the table data file.
+            offset (int): Offset the bytes were appended at.
+            data (bytes): Appended bytes.
+
+        Returns:
+            bool: True if the bytes had to be written.
+        """
+        if not os.path.exists(table_path):
+            return False
+
+        with open(table_path, "r+b") as table_file:
+            size = table_file.seek(0, os.SEEK_END)
+            if size < offset:
+                log_msg(
+                    logging.WARNING, f"WAL RECORD PAST END OF TABLE: {table_path}"
+                )
+                return False
+
+            table_file.seek(offset)
+            if table_file.read(len(data)) == data:
+                return False
+
+            if offset:
+                table_file.seek(offset - 1)
+                at_record_start = table_file.read(1) == b"\n"
+            else:
+                at_record_start = True
+
+            if size > offset + len(data) or not at_record_start:
+                log_msg(
+                    logging.WARNING,
+                    f"WAL RECORD DOES NOT MATCH TABLE, SKIPPED: {table_path}",
+                )
+                return False
+
+            table_file.seek(offset)
+            table_file.truncate()
+            table_file.write(data)
+
+        return True
+
+    def close(self):
+        """
+        Close the log file.
+        """
+        self._file.close()
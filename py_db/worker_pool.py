@@ -0,0 +1,150 @@
+"""
+# File: worker_pool.py
+# Description: Fixed pool of worker threads running the database work of the
+# server, with a bounded queue of admitted requests. When the queue is full,
+# new requests are rejected at once with a "server busy" error instead of
+# piling up.
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+from env import environment
+from exc import CommonPYDBException, codes, err_msg
+from utils import log_msg, logging
+
+
+class WorkerPool:
+    """
+    Runs tasks on a fixed number of threads, in submission order.
+
+    A request is admitted when its first task is submitted: if `queue_size`
+    tasks are already waiting, it is rejected with `SERVER_BUSY`. The next
+    tasks of an admitted request (e.g. the following chunks of a streamed
+    SELECT) are never rejected, and are queued behind the tasks submitted
+    meanwhile, so a long request shares the workers with the other
+    connections instead of holding one until it is done.
+
+    Attributes:
+        workers (int): Number of worker threads.
+        queue_size (int): Number of waiting tasks above which requests are rejected.
+        rejected (int): Number of requests rejected so far.
+    """
+
+    def __init__(self, workers=16, queue_size=256):
+        """
+        Initialize the pool (call `start` to run the workers).
+
+        Args:
+            workers (int): Number of worker threads.
+            queue_size (int): Number of waiting tasks above which requests are rejected.
+        """
+        self.workers = workers
+        self.queue_size = queue_size
+        self.rejected = 0
+
+        self._tasks = deque()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._stopped = False
+
+    def start(self):
+        """
+        Start the worker threads.
+        """
+        for number in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"py_db_worker_{number}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """
+        Ask the workers to stop once the waiting tasks are done.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def submit(self, fn, *args, admit=True):
+        """
+        Queue a task.
+
+        Args:
+            fn (callable): Function to run.
+            *args: Arguments of the function.
+            admit (bool): Whether the task starts a new request, which is
+                rejected when the queue is full. Tasks continuing an
+                admitted request pass False.
+
+        Returns:
+            Future: Future of the task result.
+
+        Raises:
+            CommonPYDBException: If the request is rejected because the server is busy.
+        """
+        future = Future()
+
+        with self._condition:
+            if admit and len(self._tasks) >= self.queue_size:
+                self.rejected += 1
+                raise CommonPYDBException(
+                    code=codes.SERVER_BUSY,
+                    message=err_msg.SERVER_BUSY,
+                    ref_data={"queue_size": self.queue_size},
+                )
+
+            self._tasks.append((future, fn, args))
+            self._condition.notify()
+
+        return future
+
+    def _work(self):
+        """
+        Run queued tasks until the pool is stopped.
+        """
+        while True:
+            with self._condition:
+                while not self._tasks and not self._stopped:
+                    self._condition.wait()
+
+                if not self._tasks:
+                    return
+
+                future, fn, args = self._tasks.popleft()
+
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                result = fn(*args)
+            except BaseException as exc:  # pylint: disable=broad-except
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+
+def start_worker_pool():
+    """
+    Start the worker pool configured in the `WORKER_POOL` environment entry.
+
+    Returns:
+        WorkerPool: The running pool.
+    """
+    config: dict = environment["WORKER_POOL"]
+
+    worker_pool = WorkerPool(
+        workers=config.get("WORKERS", 16),
+        queue_size=config.get("QUEUE_SIZE", 256),
+    )
+    worker_pool.start()
+
+    log_msg(
+        logging.DEBUG,
+        f"WORKER POOL RUNNING {worker_pool.workers} WORKERS, "
+        f"QUEUE SIZE {worker_pool.queue_size}",
+    )
+
+    return worker_pool
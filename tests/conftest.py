@@ -0,0 +1,116 @@
+"""
+# File: tests/conftest.py
+# Description: Shared fixtures. The storage engine works on the `py_db.user`
+# schema of the repository, with its data kept in a temporary folder.
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# Schemas of created tables are written relative to the working directory.
+os.chdir(ROOT_DIR)
+
+TEMP_DIR = tempfile.mkdtemp(prefix="py_db_tests_")
+ENV_FILE = os.path.join(TEMP_DIR, "env.json")
+
+with open(ENV_FILE, "w", encoding="UTF-8") as env_file:
+    json.dump(
+        {
+            "DATA_FOLDER": os.path.join(TEMP_DIR, "data"),
+            "LOGGER": {"LEVEL": "ERROR", "LOG_TO": ["console"]},
+        },
+        env_file,
+    )
+
+# `arg_pars` parses the command line on import: hide the pytest arguments.
+sys.argv = [sys.argv[0], "-e", ENV_FILE]
+
+from env import environment  # noqa: E402
+
+environment.setup()
+
+from py_db.storage import Storage  # noqa: E402
+
+DATABASE = "py_db"
+TABLE = "user"
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def storage():
+    """
+    Storage engine with an empty `py_db.user` table.
+    """
+    storage_engine = Storage()
+
+    db_path = storage_engine.get_db_path(DATABASE)
+    os.makedirs(db_path, exist_ok=True)
+    table_path = storage_engine.get_table_path(db_path, TABLE)
+
+    storage_engine.get_wal(db_path).checkpoint()
+    for path in (table_path, storage_engine.get_index_path(table_path)):
+        if os.path.exists(path):
+            os.remove(path)
+
+    with open(table_path, "w"):
+        pass
+    storage_engine.drop_table_index(DATABASE, TABLE)
+
+    return storage_engine
+
+
+@pytest.fixture
+def table_path(storage):
+    """
+    Path to the data file of the `py_db.user` table.
+    """
+    return storage.get_table_path(storage.get_db_path(DATABASE), TABLE)
+
+
+@pytest.fixture
+def make_table(storage):
+    """
+    Factory creating tables in `py_db` from a schema definition. The tables
+    (and their schema files) are dropped after the test.
+    """
+    tables = []
+
+    def create(table, schema_def):
+        storage.create_table(DATABASE, table, schema_def)
+        tables.append(table)
+
+    yield create
+
+    for table in tables:
+        storage.drop_table(DATABASE, table)
+
+
+def make_row(number, **fields):
+    """
+    Build a valid `user` row with a unique first name.
+
+    Args:
+        number (int): Number the first name is derived from.
+        **fields: Fields overriding the defaults.
+
+    Returns:
+        dict: Row data.
+    """
+    return {
+        "first_name": "user" + "".join(chr(97 + int(digit)) for digit in str(number)),
+        "age": 20 + number % 50,
+        "join_date": "2025-07-07T18:21:47",
+        **fields,
+    }
@@ -0,0 +1,93 @@
+"""
+# File: tests/test_compaction.py
+# Description: Tombstones and compaction of table data files.
+"""
+
+import os
+import json
+import threading
+
+from py_db.index import TOMBSTONE_KEY
+from conftest import DATABASE, TABLE, make_row
+
+
+def names(rows):
+    return sorted(row["first_name"] for row in rows)
+
+
+def fill(storage, count=200):
+    storage.bulk_insert(DATABASE, TABLE, [make_row(number) for number in range(count)])
+    storage.delete(DATABASE, TABLE, {"age": {"$lt": 45}})
+
+    return names(storage.read(DATABASE, TABLE, {}))
+
+
+def read_lines(table_path):
+    with open(table_path, "rb") as table_file:
+        return [json.loads(line) for line in table_file]
+
+
+def test_writes_append_versions_and_tombstones(storage, table_path):
+    rows = [storage.insert_data(DATABASE, TABLE, make_row(number)) for number in (1, 2)]
+    storage.update({"first_name": rows[0]["first_name"]}, DATABASE, TABLE, {"age": 70})
+    storage.delete(DATABASE, TABLE, {"first_name": rows[1]["first_name"]})
+
+    lines = read_lines(table_path)
+    assert lines[:2] == rows
+    assert lines[2] == {**rows[0], "age": 70}
+    assert lines[3] == {"pk": rows[1]["pk"], TOMBSTONE_KEY: True}
+
+    assert storage.read(DATABASE, TABLE, {}) == [lines[2]]
+    storage.drop_table_index(DATABASE, TABLE)
+    assert storage.read(DATABASE, TABLE, {}) == [lines[2]]
+
+
+def test_compaction_keeps_live_rows_only(storage, table_path):
+    expected = fill(storage)
+    size, live_bytes = storage.garbage_stats(DATABASE, TABLE)
+    assert live_bytes < size
+
+    storage.compact_table(DATABASE, TABLE)
+
+    rows = read_lines(table_path)
+    assert names(rows) == expected
+    assert not [row for row in rows if TOMBSTONE_KEY in row]
+    assert storage.garbage_stats(DATABASE, TABLE) == (
+        os.path.getsize(table_path),
+        os.path.getsize(table_path),
+    )
+
+    # The index was rewritten with the new offsets.
+    assert names(storage.read(DATABASE, TABLE, {"age": {"$gte": 45}})) == expected
+    storage.insert_data(DATABASE, TABLE, make_row(999))
+    storage.drop_table_index(DATABASE, TABLE)
+    assert len(storage.read(DATABASE, TABLE, {})) == len(expected) + 1
+
+
+def test_concurrent_compactions(storage, table_path):
+    expected = fill(storage)
+    barrier = threading.Barrier(4)
+    errors = []
+
+    def compact():
+        barrier.wait()
+        try:
+            storage.compact_table(DATABASE, TABLE)
+        except Exception as exc:  # pylint: disable=broad-except
+            errors.append(exc)
+
+    threads = [threading.Thread(target=compact) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+
+    assert names(read_lines(table_path)) == expected
+
+    db_path = os.path.dirname(table_path)
+    assert not [name for name in os.listdir(db_path) if name.endswith(".compact")]
+
+    storage.drop_table_index(DATABASE, TABLE)
+    assert names(storage.read(DATABASE, TABLE, {})) == expected
@@ -0,0 +1,154 @@
+"""
+# File: tests/test_con_mgt.py
+# Description: Framing loop of the threaded connection handler.
+"""
+
+import json
+import time
+import types
+import socket
+import threading
+
+import pytest
+
+from exc import codes
+from py_db.auth import authentication
+from py_db.con_mgt import DELIMITER, ConnectionHandler, parse_header, encode_frame
+from py_db.worker_pool import WorkerPool
+
+TOKEN = "test-token"
+
+
+def ping(request_id):
+    return {"action": "PING", "auth": {"token": TOKEN}, "request_id": request_id}
+
+
+def frame(request):
+    return encode_frame(json.dumps(request))
+
+
+class Client:
+    """Client end of a connection served by `ConnectionHandler` in a thread."""
+
+    def __init__(self, worker_pool):
+        self.socket, server_socket = socket.socketpair()
+        self.stream = self.socket.makefile("rb")
+
+        server = types.SimpleNamespace(worker_pool=worker_pool)
+        self.thread = threading.Thread(
+            target=ConnectionHandler, args=(server_socket, ("test", 0), server)
+        )
+        self.thread.start()
+
+    def read_response(self):
+        """Read one response frame, or return None at end of stream."""
+        header = self.stream.readline()
+        if not header:
+            return None
+
+        query_length, error = parse_header(header.decode())
+        assert error is None
+        assert self.stream.readline() == b"\r\n"
+        return json.loads(self.stream.read(query_length))
+
+    def close(self):
+        self.stream.close()
+        self.socket.close()
+        self.thread.join(timeout=5)
+        assert not self.thread.is_alive()
+
+
+@pytest.fixture
+def worker_pool():
+    pool = WorkerPool(workers=2, queue_size=8)
+    pool.start()
+    yield pool
+    pool.stop()
+
+
+@pytest.fixture
+def client(worker_pool, monkeypatch):
+    monkeypatch.setitem(authentication._token_user_map, TOKEN, {})
+
+    client = Client(worker_pool)
+    yield client
+    client.close()
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("QUERY_LENGTH: 12", 12),
+        ("X-CLIENT: test\r\nQUERY_LENGTH:7", 7),
+        ("QUERY_LENGTH: twelve", codes.QUERY_LENGTH),
+        ("LENGTH: 12", codes.QUERY_LENGTH),
+    ],
+)
+def test_parse_header(header, expected):
+    query_length, error = parse_header(header)
+
+    if error is None:
+        assert query_length == expected
+    else:
+        assert query_length is None
+        assert error.to_dict()["payload"]["code"] == expected
+
+
+def test_pipelined_frames_answered_in_order(client):
+    client.socket.sendall(b"".join(frame(ping(number)) for number in range(5)))
+
+    responses = [client.read_response() for _ in range(5)]
+    assert [response["request_id"] for response in responses] == list(range(5))
+    assert {response["payload"]["message"] for response in responses} == {"PONG"}
+
+
+def test_frames_split_across_reads(client):
+    # Body larger than the receive buffer, delimiter split between two sends.
+    data = frame(ping("x" * (3 * ConnectionHandler.RECV_SIZE)))
+    split = data.index(DELIMITER) + 2
+
+    client.socket.sendall(data[:split])
+    time.sleep(0.05)
+    client.socket.sendall(data[split:] + frame(ping("next"))[:10])
+    time.sleep(0.05)
+    client.socket.sendall(frame(ping("next"))[10:])
+
+    assert client.read_response()["request_id"] == "x" * (
+        3 * ConnectionHandler.RECV_SIZE
+    )
+    assert client.read_response()["request_id"] == "next"
+
+
+def test_errors_keep_connection_open(client):
+    client.socket.sendall(frame({"action": "PING", "request_id": 1}) + frame(ping(2)))
+
+    error = client.read_response()
+    assert error["action_type"] == "ERROR"
+    assert error["request_id"] == 1
+    assert client.read_response()["payload"]["message"] == "PONG"
+
+
+def test_invalid_header_closes_connection(client):
+    client.socket.sendall(b"QUERY_LENGTH: many" + DELIMITER + b"{}")
+
+    error = client.read_response()
+    assert error["payload"]["code"] == codes.QUERY_LENGTH
+    assert client.read_response() is None
+
+
+def test_busy_server_sheds_requests(monkeypatch):
+    monkeypatch.setitem(authentication._token_user_map, TOKEN, {})
+
+    # No room in the queue: every new request is rejected.
+    pool = WorkerPool(workers=1, queue_size=0)
+    client = Client(pool)
+    try:
+        client.socket.sendall(frame(ping(1)) + frame(ping(2)))
+
+        for request_id in (1, 2):
+            response = client.read_response()
+            assert response["request_id"] == request_id
+            assert response["payload"]["code"] == codes.SERVER_BUSY
+        assert pool.rejected == 2
+    finally:
+        client.close()
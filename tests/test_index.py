@@ -0,0 +1,169 @@
+"""
+# File: tests/test_index.py
+# Description: Value indexes kept up to date by writes, and the persisted
+# primary-key index repaired at load.
+"""
+
+import json
+import uuid
+
+import pytest
+
+from exc import UniqueValueFound
+from py_db.index import TOMBSTONE_KEY, PrimaryKeyIndex
+from py_db.schema_gen.schema import SchemaRegistry
+from conftest import DATABASE, TABLE, make_row
+
+ITEM = "item"
+
+
+def item(code, kind, price):
+    return {"code": code, "kind": kind, "price": price}
+
+
+@pytest.fixture
+def items(storage, make_table):
+    make_table(
+        ITEM,
+        {
+            "code": {"type": "str", "required": True, "unique": True},
+            "kind": {"type": "str", "required": True, "index": True},
+            "price": {"type": "int", "required": True, "index": True},
+        },
+    )
+    rows = [
+        storage.insert_data(DATABASE, ITEM, data)
+        for data in (
+            item("a1", "tool", 10),
+            item("a2", "tool", 30),
+            item("b1", "food", 20),
+        )
+    ]
+    return {row["code"]: row["pk"] for row in rows}
+
+
+def item_index(storage):
+    table_path = storage.get_table_path(storage.get_db_path(DATABASE), ITEM)
+    return storage.get_table_index(
+        DATABASE,
+        ITEM,
+        table_path,
+        SchemaRegistry().get_instance(database=DATABASE, table=ITEM),
+    )
+
+
+def codes(rows):
+    return sorted(row["code"] for row in rows)
+
+
+def test_indexes_follow_writes(storage, items):
+    table_index = item_index(storage)
+    assert table_index.hash["kind"].lookup("tool") == {items["a1"], items["a2"]}
+    assert table_index.sorted["price"].pks() == [items["a1"], items["b1"], items["a2"]]
+
+    storage.update({"code": "a2"}, DATABASE, ITEM, {"kind": "food", "price": 5})
+    storage.delete(DATABASE, ITEM, {"code": "b1"})
+    storage.insert_data(DATABASE, ITEM, item("c1", "tool", 15))
+
+    table_index = item_index(storage)
+    c1 = storage.read(DATABASE, ITEM, {"code": "c1"})[0]["pk"]
+    assert table_index.hash["kind"].lookup("tool") == {items["a1"], c1}
+    assert table_index.hash["kind"].lookup("food") == {items["a2"]}
+    assert table_index.unique["code"].lookup("b1") == set()
+    assert table_index.sorted["price"].pks() == [items["a2"], items["a1"], c1]
+    assert table_index.sorted["price"].range({"$gte": 10, "$lt": 15}) == {
+        items["a1"]
+    }
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ({"kind": "tool"}, ["a1", "a2"]),
+        ({"kind": {"$in": ["food", "none"]}}, ["b1"]),
+        ({"price": {"$gt": 10}}, ["a2", "b1"]),
+        ({"price": {"$lte": 20}, "kind": "tool"}, ["a1"]),
+        ({"$or": [{"price": {"$lt": 15}}, {"kind": "food"}]}, ["a1", "b1"]),
+    ],
+)
+def test_indexed_reads_match_scan(storage, items, query, expected):
+    assert codes(storage.read(DATABASE, ITEM, query)) == expected
+
+    rows = storage.read(DATABASE, ITEM, {})
+    assert codes(row for row in rows if storage.query(row, query)) == expected
+
+
+def test_unique_conflict_after_update(storage, items):
+    storage.update({"code": "a1"}, DATABASE, ITEM, {"code": "a9"})
+
+    storage.insert_data(DATABASE, ITEM, item("a1", "tool", 1))
+    with pytest.raises(UniqueValueFound):
+        storage.insert_data(DATABASE, ITEM, item("a9", "tool", 1))
+
+
+def load_locations(table_path, storage):
+    locations = PrimaryKeyIndex(table_path, storage.get_index_path(table_path))
+    return locations, locations.load()
+
+
+def test_index_loaded_when_up_to_date(storage, table_path):
+    storage.insert_data(DATABASE, TABLE, make_row(1))
+
+    locations, status = load_locations(table_path, storage)
+    assert status == "loaded"
+    assert len(locations) == 1
+
+
+def test_index_repaired_from_tail(storage, table_path):
+    rows = [storage.insert_data(DATABASE, TABLE, make_row(number)) for number in (1, 2)]
+    storage.delete(DATABASE, TABLE, {"first_name": rows[0]["first_name"]})
+
+    # Rows appended while the index was not written, e.g. a crash.
+    appended = {"pk": str(uuid.uuid4()), **make_row(3)}
+    with open(table_path, "a") as table_file:
+        table_file.write(json.dumps(appended) + "\n")
+        table_file.write(json.dumps({"pk": rows[1]["pk"], TOMBSTONE_KEY: True}) + "\n")
+
+    locations, status = load_locations(table_path, storage)
+    assert status == "repaired"
+    assert set(pk for pk, _ in locations.items()) == {appended["pk"]}
+
+    # The repaired index now covers the whole file.
+    assert load_locations(table_path, storage)[1] == "loaded"
+
+    storage.drop_table_index(DATABASE, TABLE)
+    assert storage.read(DATABASE, TABLE, {}) == [appended]
+
+
+@pytest.mark.parametrize(
+    "damage",
+    [
+        lambda text: "",
+        lambda text: "garbage\n" + text,
+        lambda text: text + "pk x 1\n",
+    ],
+)
+def test_unusable_index_rebuilt(storage, table_path, damage):
+    rows = [storage.insert_data(DATABASE, TABLE, make_row(number)) for number in (1, 2)]
+
+    index_path = storage.get_index_path(table_path)
+    with open(index_path) as index_file:
+        text = index_file.read()
+    with open(index_path, "w") as index_file:
+        index_file.write(damage(text))
+
+    locations, status = load_locations(table_path, storage)
+    assert status == "rebuilt"
+    assert set(pk for pk, _ in locations.items()) == {row["pk"] for row in rows}
+
+
+def test_index_rebuilt_after_external_rewrite(storage, table_path):
+    rows = [storage.insert_data(DATABASE, TABLE, make_row(number)) for number in (1, 2)]
+
+    # Rewritten without its index, like a compaction done by hand.
+    with open(table_path, "w") as table_file:
+        table_file.write(json.dumps(rows[1]) + "\n")
+
+    locations, status = load_locations(table_path, storage)
+    assert status == "rebuilt"
+    assert locations[rows[1]["pk"]] == (0, len(json.dumps(rows[1])) + 1)
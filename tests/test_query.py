@@ -0,0 +1,141 @@
+"""
+# File: tests/test_query.py
+# Description: Query evaluation, raw-line pre-filtering, paging, sorting and
+# aggregation of SELECT.
+"""
+
+import json
+import uuid
+
+import pytest
+
+from exc import CommonPYDBException, codes
+from conftest import DATABASE, TABLE, make_row
+
+
+def append_raw(table_path, row, ensure_ascii=True):
+    """Append a row written outside the server, return it with its pk."""
+    row = {"pk": str(uuid.uuid4()), **row}
+    with open(table_path, "ab") as table_file:
+        table_file.write((json.dumps(row, ensure_ascii=ensure_ascii) + "\n").encode())
+    return row
+
+
+def test_non_ascii_equality(storage, table_path):
+    storage.insert_data(DATABASE, TABLE, make_row(1))
+    literal = append_raw(
+        table_path, make_row(2, first_name="José", city="Zürich"), ensure_ascii=False
+    )
+    escaped = append_raw(table_path, make_row(3, first_name="Zoë", city="Zürich"))
+    storage.drop_table_index(DATABASE, TABLE)
+
+    assert storage.read(DATABASE, TABLE, {"first_name": "José"}) == [literal]
+    assert storage.read(DATABASE, TABLE, {"first_name": "Zoë"}) == [escaped]
+    assert storage.read(DATABASE, TABLE, {"city": {"$eq": "Zürich"}}) == [
+        literal,
+        escaped,
+    ]
+
+
+def test_ascii_equality_prefiltered(storage):
+    for number in range(5):
+        storage.insert_data(DATABASE, TABLE, make_row(number))
+
+    first_name = make_row(3)["first_name"]
+    assert storage._raw_filters({"first_name": first_name}) == [
+        f'"{first_name}"'.encode()
+    ]
+    rows = storage.read(DATABASE, TABLE, {"$and": [{"first_name": first_name}]})
+    assert [row["first_name"] for row in rows] == [first_name]
+
+
+@pytest.fixture
+def users(storage):
+    # Ages 20..29 inserted out of order, only even ones have a salary.
+    numbers = [7, 2, 9, 0, 5, 3, 8, 1, 6, 4]
+    for number in numbers:
+        fields = {"salary": float(number * 100)} if number % 2 == 0 else {}
+        storage.insert_data(
+            DATABASE, TABLE, make_row(number, is_active=number < 5, **fields)
+        )
+    return storage
+
+
+def ages(rows):
+    return [row["age"] for row in rows]
+
+
+def test_sort_limit_skip(users):
+    rows = users.read(DATABASE, TABLE, {}, sort=[["age", -1]], skip=2, limit=3)
+    assert ages(rows) == [27, 26, 25]
+
+    rows = users.read(DATABASE, TABLE, {"age": {"$lt": 25}}, sort=[["age", 1]])
+    assert ages(rows) == [20, 21, 22, 23, 24]
+
+    # Rows without the field come first in ascending order.
+    rows = users.read(DATABASE, TABLE, {}, sort=[["salary", 1], ["age", -1]])
+    assert ages(rows)[:5] == [29, 27, 25, 23, 21]
+    assert [row["salary"] for row in rows[5:]] == [0.0, 200.0, 400.0, 600.0, 800.0]
+
+    assert len(users.read(DATABASE, TABLE, {}, limit=0)) == 0
+    assert len(users.read(DATABASE, TABLE, {}, skip=8)) == 2
+
+
+def test_projection(users):
+    rows = users.read(
+        DATABASE, TABLE, {"age": 23}, fields=["first_name", "age", "missing"]
+    )
+    assert rows == [{"first_name": make_row(3)["first_name"], "age": 23}]
+
+
+def test_aggregate(users):
+    (totals,) = users.aggregate(
+        DATABASE,
+        TABLE,
+        {},
+        {
+            "users": {"$count": "*"},
+            "paid": {"$count": "salary"},
+            "total_salary": {"$sum": "salary"},
+            "avg_age": {"$avg": "age"},
+            "youngest": {"$min": "age"},
+            "oldest": {"$max": "age"},
+        },
+    )
+    assert totals == {
+        "users": 10,
+        "paid": 5,
+        "total_salary": 2000.0,
+        "avg_age": 24.5,
+        "youngest": 20,
+        "oldest": 29,
+    }
+
+    groups = users.aggregate(
+        DATABASE,
+        TABLE,
+        {"age": {"$gte": 22}},
+        {"users": {"$count": "*"}, "oldest": {"$max": "age"}},
+        group_by=["is_active"],
+    )
+    assert sorted(groups, key=lambda group: group["is_active"]) == [
+        {"is_active": False, "users": 5, "oldest": 29},
+        {"is_active": True, "users": 3, "oldest": 24},
+    ]
+
+
+@pytest.mark.parametrize(
+    "aggregates, group_by",
+    [
+        ({}, None),
+        ({"total": {"$sum": "*"}}, None),
+        ({"total": {"$median": "age"}}, None),
+        ({"total": {"$sum": "age", "$max": "age"}}, None),
+        ({"users": {"$count": "*"}}, "is_active"),
+    ],
+)
+def test_invalid_aggregate_rejected(users, aggregates, group_by):
+    with pytest.raises(CommonPYDBException) as exc_info:
+        users.aggregate(DATABASE, TABLE, {}, aggregates, group_by=group_by)
+
+    assert exc_info.value.code == codes.INVALID_QUERY_OPTION
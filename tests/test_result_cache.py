@@ -0,0 +1,50 @@
+"""
+# File: tests/test_result_cache.py
+# Description: SELECT results served from the result cache.
+"""
+
+import pytest
+
+from exc import CommonPYDBException, codes
+from py_db.result_cache import ResultCache
+from conftest import DATABASE, TABLE, make_row
+
+
+@pytest.fixture
+def cached_storage(storage, monkeypatch):
+    monkeypatch.setattr(storage, "_result_cache", ResultCache())
+    storage.insert_data(DATABASE, TABLE, make_row(1))
+    storage.insert_data(DATABASE, TABLE, make_row(2))
+    return storage
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"limit": [1]},
+        {"limit": True},
+        {"limit": 1.0},
+        {"skip": -1},
+        {"fields": "first_name"},
+        {"sort": [["age", 2]]},
+    ],
+)
+def test_invalid_options_rejected(cached_storage, options):
+    # A cached valid read must not answer an invalid one with an equal key.
+    cached_storage.read(DATABASE, TABLE, {}, limit=1, skip=0)
+
+    with pytest.raises(CommonPYDBException) as exc_info:
+        cached_storage.read(DATABASE, TABLE, {}, **options)
+
+    assert exc_info.value.code == codes.INVALID_QUERY_OPTION
+
+
+def test_cached_result_invalidated_by_write(cached_storage):
+    assert len(cached_storage.read(DATABASE, TABLE, {})) == 2
+    assert len(cached_storage.read(DATABASE, TABLE, {})) == 2
+    assert cached_storage.result_cache_stats()["hits"] == 1
+
+    cached_storage.insert_data(DATABASE, TABLE, make_row(3))
+
+    assert len(cached_storage.read(DATABASE, TABLE, {})) == 3
+    assert cached_storage.result_cache_stats()["hits"] == 1
@@ -0,0 +1,63 @@
+"""
+# File: tests/test_table_cache.py
+# Description: Reads served from the table cache.
+"""
+
+import json
+import uuid
+
+import pytest
+
+from py_db.table_cache import TableCache
+from conftest import DATABASE, TABLE, make_row
+
+
+def names(rows):
+    return sorted(row["first_name"] for row in rows)
+
+
+def encode(row):
+    return (json.dumps({"pk": str(uuid.uuid4()), **row}) + "\n").encode()
+
+
+@pytest.fixture
+def cached_storage(storage, monkeypatch):
+    monkeypatch.setattr(storage, "_table_cache", TableCache())
+    storage.insert_data(DATABASE, TABLE, make_row(1))
+    storage.insert_data(DATABASE, TABLE, make_row(2))
+    assert len(storage.read(DATABASE, TABLE, {})) == 2
+    return storage
+
+
+def test_writes_update_cached_rows(cached_storage):
+    first_name = make_row(1)["first_name"]
+    cached_storage.update({"first_name": first_name}, DATABASE, TABLE, {"age": 70})
+    cached_storage.insert_data(DATABASE, TABLE, make_row(3))
+    cached_storage.delete(DATABASE, TABLE, {"first_name": make_row(2)["first_name"]})
+
+    rows = cached_storage.read(DATABASE, TABLE, {})
+    assert names(rows) == names([make_row(1), make_row(3)])
+    updated = cached_storage.read(DATABASE, TABLE, {"first_name": first_name})
+    assert updated[0]["age"] == 70
+
+
+def test_external_append_reloaded(cached_storage, table_path):
+    with open(table_path, "ab") as table_file:
+        table_file.write(encode(make_row(3)))
+
+    rows = cached_storage.read(DATABASE, TABLE, {})
+    assert names(rows) == names([make_row(1), make_row(2), make_row(3)])
+
+    first_name = make_row(3)["first_name"]
+    assert len(cached_storage.read(DATABASE, TABLE, {"first_name": first_name})) == 1
+
+
+def test_external_rewrite_reloaded(cached_storage, table_path):
+    with open(table_path, "wb") as table_file:
+        table_file.write(b"".join(encode(make_row(number)) for number in (4, 5, 6)))
+
+    rows = cached_storage.read(DATABASE, TABLE, {})
+    assert names(rows) == names([make_row(4), make_row(5), make_row(6)])
+    assert not cached_storage.read(
+        DATABASE, TABLE, {"first_name": make_row(1)["first_name"]}
+    )
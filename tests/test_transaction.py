@@ -0,0 +1,116 @@
+"""
+# File: tests/test_transaction.py
+# Description: Isolation and commit conflicts of transactions.
+"""
+
+import os
+
+import pytest
+
+from exc import CommonPYDBException, codes
+from py_db.transaction import Transaction
+from conftest import DATABASE, TABLE, make_row
+
+
+def names(rows):
+    return sorted(row["first_name"] for row in rows)
+
+
+def test_reads_see_snapshot_and_own_writes(storage):
+    storage.insert_data(DATABASE, TABLE, make_row(1))
+    storage.insert_data(DATABASE, TABLE, make_row(2))
+
+    transaction = Transaction(DATABASE)
+    # Committed before the first read, but after BEGIN.
+    storage.insert_data(DATABASE, TABLE, make_row(3))
+    assert len(transaction.read(DATABASE, TABLE, {})) == 2
+
+    storage.update(
+        {"first_name": make_row(1)["first_name"]}, DATABASE, TABLE, {"age": 77}
+    )
+    transaction.insert_data(DATABASE, TABLE, make_row(5))
+
+    rows = transaction.read(DATABASE, TABLE, {})
+    assert names(rows) == names(make_row(number) for number in (1, 2, 5))
+    assert not transaction.read(DATABASE, TABLE, {"age": 77})
+    assert len(storage.read(DATABASE, TABLE, {})) == 3
+
+    transaction.rollback()
+
+
+def test_tables_share_snapshot_point(storage, make_table):
+    make_table(
+        "account",
+        {
+            "owner": {"type": "str", "required": True, "unique": True},
+            "balance": {"type": "int", "required": True},
+        },
+    )
+    storage.insert_data(DATABASE, TABLE, make_row(1))
+
+    reader = Transaction(DATABASE)
+    assert len(reader.read(DATABASE, TABLE, {})) == 1
+
+    writer = Transaction(DATABASE)
+    writer.insert_data(DATABASE, TABLE, make_row(2))
+    writer.insert_data(DATABASE, "account", {"owner": "userb", "balance": 10})
+    assert writer.commit() == 2
+
+    # Both writes are after the snapshot point of the reader.
+    assert reader.read(DATABASE, "account", {}) == []
+    assert len(reader.read(DATABASE, TABLE, {})) == 1
+
+    reader.rollback()
+
+
+def test_compaction_before_first_use_conflicts(storage):
+    storage.insert_data(DATABASE, TABLE, make_row(1))
+    storage.delete(DATABASE, TABLE, {"first_name": make_row(1)["first_name"]})
+
+    transaction = Transaction(DATABASE)
+    storage.compact_table(DATABASE, TABLE)
+
+    with pytest.raises(CommonPYDBException) as exc_info:
+        transaction.read(DATABASE, TABLE, {})
+
+    assert exc_info.value.code == codes.TRANSACTION_CONFLICT
+    transaction.rollback()
+
+
+def test_commit_conflict_writes_nothing(storage, table_path):
+    storage.insert_data(DATABASE, TABLE, make_row(1))
+    storage.insert_data(DATABASE, TABLE, make_row(2))
+    query = {"first_name": make_row(1)["first_name"]}
+
+    transaction = Transaction(DATABASE)
+    transaction.update(query, DATABASE, TABLE, {"age": 60})
+    transaction.insert_data(DATABASE, TABLE, make_row(3))
+
+    storage.update(query, DATABASE, TABLE, {"age": 55})
+    size = os.path.getsize(table_path)
+
+    with pytest.raises(CommonPYDBException) as exc_info:
+        transaction.commit()
+
+    assert exc_info.value.code == codes.TRANSACTION_CONFLICT
+    assert os.path.getsize(table_path) == size
+    assert storage.read(DATABASE, TABLE, query)[0]["age"] == 55
+    assert len(storage.read(DATABASE, TABLE, {})) == 2
+
+
+def test_commit_applies_workspace(storage):
+    storage.insert_data(DATABASE, TABLE, make_row(1))
+    storage.insert_data(DATABASE, TABLE, make_row(2))
+
+    transaction = Transaction(DATABASE)
+    transaction.update(
+        {"first_name": make_row(1)["first_name"]}, DATABASE, TABLE, {"age": 60}
+    )
+    transaction.delete(DATABASE, TABLE, {"first_name": make_row(2)["first_name"]})
+    transaction.insert_data(DATABASE, TABLE, make_row(3))
+
+    assert transaction.commit() == 3
+
+    rows = storage.read(DATABASE, TABLE, {})
+    assert names(rows) == names(make_row(number) for number in (1, 3))
+    assert storage.read(DATABASE, TABLE, {"age": 60})
@@ -0,0 +1,134 @@
+"""
+# File: tests/test_validator.py
+# Description: The fast-path row validator against Marshmallow.
+"""
+
+import pytest
+from marshmallow import ValidationError
+
+from exc import DataIsNotValid
+from py_db.schema_gen.schema import SchemaRegistry
+from conftest import DATABASE
+
+TABLE = "measure"
+PK = "0b7e9c3a-54f1-4d2c-9a8e-2f6d1c4b7a90"
+
+SCHEMA_DEF = {
+    "name": {
+        "type": "str",
+        "required": True,
+        "unique": True,
+        "min_length": 2,
+        "max_length": 10,
+        "pattern": "^[a-z]+$",
+    },
+    "score": {"type": "int", "required": True, "min": 0, "max": 100},
+    "ratio": {"type": "float", "min": 0.0, "max": 1.0},
+    "active": {"type": "bool", "default": True},
+    "level": {"type": "str", "enum": ["low", "high"], "default": "low"},
+    "born": {"type": "date"},
+    "seen": {"type": "datetime", "allow_none": True},
+}
+
+
+def row(**fields):
+    return {"name": "alpha", "score": 5, "pk": PK, **fields}
+
+
+# Rows the fast path must accept on its own.
+VALID = [
+    row(),
+    row(ratio=0.5, active=False, level="high"),
+    row(ratio=1, born="2000-01-02", seen="2025-07-07T18:21:47"),
+    row(seen=None, score=0),
+    row(pk=PK.upper()),
+    row(pk=PK.replace("-", "")),
+]
+
+# Rows Marshmallow accepts after converting a value.
+COERCIBLE = [
+    row(score="5"),
+    row(score=5.0),
+    row(ratio="0.5"),
+    row(active="true"),
+    row(active=1),
+    row(seen="2025-07-07 18:21:47"),
+    row(seen="2025-07-07T18:21:47.000000"),
+]
+
+INVALID = [
+    {"score": 5},
+    row(name="a"),
+    row(name="Alpha"),
+    row(name="abcdefghijk"),
+    row(score=101),
+    row(score=-1),
+    row(score=None),
+    row(score="five"),
+    row(ratio=1.5),
+    row(ratio=float("nan")),
+    row(level="mid"),
+    row(born="2000-13-01"),
+    row(seen="yesterday"),
+    row(pk="not-a-uuid"),
+    row(extra=1),
+]
+
+
+@pytest.fixture
+def measure(storage, make_table):
+    make_table(TABLE, dict(SCHEMA_DEF))
+
+    registry = SchemaRegistry()
+    return (
+        registry.get_instance(database=DATABASE, table=TABLE),
+        registry.get_validator(database=DATABASE, table=TABLE),
+    )
+
+
+def marshmallow_row(table_schema, data):
+    return table_schema.dump(table_schema.load(data))
+
+
+@pytest.mark.parametrize("data", VALID)
+def test_fast_path_matches_marshmallow(storage, measure, data):
+    table_schema, validator = measure
+
+    fast_row = validator(data)
+
+    assert fast_row is not None
+    assert fast_row == marshmallow_row(table_schema, data)
+    assert list(fast_row) == list(marshmallow_row(table_schema, data))
+
+
+def test_fast_path_fills_defaults(storage, measure):
+    table_schema, validator = measure
+    data = {"name": "alpha", "score": 5}
+
+    fast_row = validator(data)
+    expected = marshmallow_row(table_schema, data)
+
+    # `pk` is generated on each call.
+    assert fast_row.pop("pk") != expected.pop("pk")
+    assert fast_row == expected
+
+
+@pytest.mark.parametrize("data", COERCIBLE)
+def test_coercible_rows_use_marshmallow(storage, measure, data):
+    table_schema, validator = measure
+
+    assert validator(data) is None
+    assert storage.validate_row(DATABASE, TABLE, data) == marshmallow_row(
+        table_schema, data
+    )
+
+
+@pytest.mark.parametrize("data", INVALID)
+def test_invalid_rows_rejected(storage, measure, data):
+    table_schema, validator = measure
+
+    assert validator(data) is None
+    with pytest.raises(ValidationError):
+        table_schema.load(data)
+    with pytest.raises(DataIsNotValid):
+        storage.validate_row(DATABASE, TABLE, data)
@@ -0,0 +1,83 @@
+"""
+# File: tests/test_wal.py
+# Description: Replay of the write-ahead log against the table files.
+"""
+
+import os
+import json
+
+import pytest
+
+import py_db.storage
+from conftest import DATABASE, TABLE, make_row
+
+
+def read_bytes(path):
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def test_replay_repairs_torn_tail(storage, table_path):
+    storage.insert_data(DATABASE, TABLE, make_row(1))
+    storage.insert_data(DATABASE, TABLE, make_row(2))
+    content = read_bytes(table_path)
+
+    with open(table_path, "r+b") as table_file:
+        table_file.truncate(len(content) - 10)
+
+    assert storage.get_wal(os.path.dirname(table_path)).replay() == 1
+    assert read_bytes(table_path) == content
+
+
+def test_replay_skips_applied_records(storage, table_path):
+    storage.insert_data(DATABASE, TABLE, make_row(1))
+    storage.insert_data(DATABASE, TABLE, make_row(2))
+    content = read_bytes(table_path)
+
+    assert storage.get_wal(os.path.dirname(table_path)).replay() == 0
+    assert read_bytes(table_path) == content
+
+
+def test_replay_skips_foreign_records(storage, table_path):
+    storage.insert_data(DATABASE, TABLE, make_row(1))
+    storage.insert_data(DATABASE, TABLE, make_row(2))
+
+    # The table was replaced by another file the logged offsets do not describe.
+    foreign = b"".join(
+        (json.dumps(make_row(number)) + "\n").encode() for number in range(10, 15)
+    )
+    with open(table_path, "wb") as table_file:
+        table_file.write(foreign)
+
+    assert storage.get_wal(os.path.dirname(table_path)).replay() == 0
+    assert read_bytes(table_path) == foreign
+
+
+def test_compaction_crash_after_swap(storage, table_path, monkeypatch):
+    for number in range(10):
+        storage.insert_data(DATABASE, TABLE, make_row(number))
+    storage.delete(DATABASE, TABLE, {"first_name": make_row(0)["first_name"]})
+    storage.get_wal(os.path.dirname(table_path)).checkpoint()
+
+    # Logged appends at offsets of the file about to be compacted.
+    for number in range(10, 15):
+        storage.insert_data(DATABASE, TABLE, make_row(number))
+
+    replace = os.replace
+
+    def replace_then_crash(src, dst):
+        replace(src, dst)
+        raise OSError("crash")
+
+    monkeypatch.setattr(py_db.storage.os, "replace", replace_then_crash)
+    with pytest.raises(OSError):
+        storage.compact_table(DATABASE, TABLE)
+    monkeypatch.undo()
+
+    assert storage.get_wal(os.path.dirname(table_path)).replay() == 0
+
+    with open(table_path, "rb") as table_file:
+        rows = [json.loads(line) for line in table_file]
+    assert sorted(row["first_name"] for row in rows) == sorted(
+        make_row(number)["first_name"] for number in range(1, 15)
+    )
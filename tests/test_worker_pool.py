@@ -0,0 +1,75 @@
+"""
+# File: tests/test_worker_pool.py
+# Description: Load shedding of the worker pool.
+"""
+
+import threading
+
+import pytest
+
+from exc import CommonPYDBException, codes
+from py_db.worker_pool import WorkerPool
+
+
+@pytest.fixture
+def busy_pool():
+    """
+    Pool whose single worker is held by a task until `release` is set, with
+    a full queue.
+    """
+    pool = WorkerPool(workers=1, queue_size=2)
+    pool.start()
+
+    started = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        started.set()
+        release.wait()
+        return "held"
+
+    futures = [pool.submit(hold)]
+    started.wait()
+    futures += [pool.submit(str, number) for number in range(pool.queue_size)]
+
+    yield pool, release, futures
+
+    release.set()
+    pool.stop()
+
+
+def test_full_queue_rejects_new_requests(busy_pool):
+    pool, release, futures = busy_pool
+
+    with pytest.raises(CommonPYDBException) as exc_info:
+        pool.submit(str, "rejected")
+
+    assert exc_info.value.code == codes.SERVER_BUSY
+    assert exc_info.value.ref_data == {"queue_size": 2}
+    assert pool.rejected == 1
+
+    # Following tasks of an admitted request are always queued.
+    futures.append(pool.submit(str, "admitted", admit=False))
+
+    release.set()
+    assert [future.result(timeout=5) for future in futures] == [
+        "held",
+        "0",
+        "1",
+        "admitted",
+    ]
+
+    # Once drained, the pool admits requests again.
+    assert pool.submit(str, "again").result(timeout=5) == "again"
+
+
+def test_task_exception_reaches_future():
+    pool = WorkerPool(workers=1, queue_size=1)
+    pool.start()
+
+    future = pool.submit(int, "not a number")
+    with pytest.raises(ValueError):
+        future.result(timeout=5)
+
+    assert pool.submit(int, "7").result(timeout=5) == 7
+    pool.stop()
@@ -1,9 +1,7 @@
 import logging
-from . import msg
 from .log import log_msg
 
 __all__ = [
-    "msg",
     "log_msg",
     "logging",
 ]